@@ -0,0 +1,272 @@
+# bench_shm_ring.py
+# 프로세스 간 ShmRing push/pop 비용 측정: v1(24B 단일 헤더) vs 현재 ShmRing (헤더 ShmRing.VERSION)
+#   ring 모드의 현재 링은 캐시라인 분리에 더해 정책/seq 스탬프/카운터까지 포함한 비용이다.
+#   헤더 배치만의 효과는 --mode header 가 v1 / v2(head·tail 만 분리) / 현재 오프셋으로 따로 잰다.
+#
+#   python bench_shm_ring.py                 # ring 모드, 기본 200k 레코드
+#   python bench_shm_ring.py --mode header   # 헤더 word 만 주고받는 false-sharing 마이크로벤치
+#   python bench_shm_ring.py --ghz 3.6       # cycles 환산용 클럭 (기본: /proc/cpuinfo 추정)
+#   python bench_shm_ring.py --mode alloc    # 레코드 쓰기 경로별 메시지당 할당 바이트 (tracemalloc)
+#
+# cycles 는 TSC 가 아니라 (ns * GHz) 환산값이다. 생산자/소비자는 각각 별도 프로세스에서
+# 자기 루프 시간을 재고, 결과는 op 당 평균으로 출력한다.
+import os, time, struct, argparse, tracemalloc
+import numpy as np
+from multiprocessing import Process, Queue, shared_memory, set_start_method
+
+from shm_ring import ShmRing
+from layouts import TRADE_DTYPE, PRIVATE_EXEC_DTYPE, ORDER_FLAG_DTYPE
+
+
+class ShmRingV1:
+    """벤치 비교용: 헤더 v2 이전 레이아웃 그대로 ([int64 head][int64 tail][int64 cap] 24B)"""
+    HEADER_FMT = "<qqq"
+    HEADER_SIZE = struct.calcsize(HEADER_FMT)
+
+    def __init__(self, name, item_dtype, capacity, create):
+        self.item_dtype = np.dtype(item_dtype)
+        self.item_size = self.item_dtype.itemsize
+        self.capacity = int(capacity)
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, name=name,
+                                                  size=self.HEADER_SIZE + self.capacity * self.item_size)
+            struct.pack_into(self.HEADER_FMT, self.shm.buf, 0, 0, 0, self.capacity)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+            self.capacity = struct.unpack_from(self.HEADER_FMT, self.shm.buf, 0)[2]
+        self.buf = self.shm.buf
+        self.data_mv = memoryview(self.buf)[self.HEADER_SIZE:self.HEADER_SIZE + self.capacity * self.item_size]
+        self.arr = np.ndarray((self.capacity,), dtype=self.item_dtype, buffer=self.data_mv)
+
+    def _get_head_tail(self):
+        return struct.unpack_from(self.HEADER_FMT, self.buf, 0)[:2]
+
+    def _set_head(self, v):
+        struct.pack_into("<q", self.buf, 0, v)
+
+    def _set_tail(self, v):
+        struct.pack_into("<q", self.buf, 8, v)
+
+    def push(self, rec):
+        head, tail = self._get_head_tail()
+        nxt = (head + 1) % self.capacity
+        if nxt == tail:
+            tail = (tail + 1) % self.capacity
+            self._set_tail(tail)
+        self.arr[head] = rec
+        self._set_head(nxt)
+
+    def pop_many(self, maxn):
+        head, tail = self._get_head_tail()
+        if head == tail:
+            return None
+        left = (head - tail) if head > tail else (self.capacity - tail)
+        n = min(maxn, left)
+        view = self.arr[tail:tail + n]
+        self._set_tail((tail + n) % self.capacity)
+        return view
+
+    def __len__(self):
+        head, tail = self._get_head_tail()
+        return (head - tail) % self.capacity
+
+    def close(self):
+        del self.arr
+        self.data_mv.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+CUR = f"v{ShmRing.VERSION}"
+RINGS = {"v1": ShmRingV1, CUR: ShmRing}
+
+# header 모드: (head, tail) 바이트 오프셋
+HDR_OFFSETS = {
+    "v1": (0, 8),                                   # 같은 캐시라인
+    "v2": (64, 128),                                # [meta][head][tail] 라인 하나씩
+    CUR: (ShmRing.OFF_HEAD, ShmRing.OFF_TAIL),      # [meta][wake][prod][cons]...
+}
+
+
+def _guess_ghz():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("cpu MHz"):
+                    return float(line.split(":")[1]) / 1000.0
+    except OSError:
+        pass
+    return 3.0
+
+
+# ---------- ring 모드: 실제 push / pop_many 경로 ----------
+def _producer(kind, name, n, out):
+    ring = RINGS[kind](name, TRADE_DTYPE, 0, create=False)
+    cap = ring.capacity
+    rec = (0, 100.0, 1.0, 0, 0, 0)
+    t0 = time.perf_counter_ns()
+    for i in range(n):
+        while len(ring) >= cap - 1:   # 벤치에서는 덮어쓰기 없이 빈자리 대기
+            pass
+        ring.push(rec)
+    out.put(("push", time.perf_counter_ns() - t0))
+    ring.close()
+
+
+def _consumer(kind, name, n, batch, out):
+    ring = RINGS[kind](name, TRADE_DTYPE, 0, create=False)
+    got = pops = 0
+    t0 = time.perf_counter_ns()
+    while got < n:
+        v = ring.pop_many(batch)
+        if v is not None:
+            got += len(v)
+            pops += 1
+    out.put(("pop", time.perf_counter_ns() - t0, pops))
+    del v
+    ring.close()
+
+
+def bench_ring(kind, n, cap, batch):
+    name = f"BENCH_{kind}_{os.getpid()}"
+    owner = RINGS[kind](name, TRADE_DTYPE, cap, create=True)
+    out = Queue()
+    ps = [Process(target=_consumer, args=(kind, name, n, batch, out)),
+          Process(target=_producer, args=(kind, name, n, out))]
+    for p in ps: p.start()
+    res = {}
+    for _ in ps:
+        r = out.get()
+        res[r[0]] = r[1:]
+    for p in ps: p.join()
+    owner.close(); owner.unlink()
+    push_ns = res["push"][0] / n
+    pop_ns, pops = res["pop"]
+    return push_ns, pop_ns / n, pop_ns / max(pops, 1)
+
+
+# ---------- header 모드: head/tail word 만 쓰는 false-sharing 측정 ----------
+def _hdr_writer(name, off, n, out, who):
+    shm = shared_memory.SharedMemory(name=name, create=False)
+    hdr = shm.buf[:256].cast("q")
+    i = off // 8
+    t0 = time.perf_counter_ns()
+    for k in range(n):
+        hdr[i] = k
+    out.put((who, time.perf_counter_ns() - t0))
+    hdr.release(); shm.close()
+
+
+def bench_header(kind, n):
+    off_h, off_t = HDR_OFFSETS[kind]
+    name = f"BENCH_HDR_{kind}_{os.getpid()}"
+    shm = shared_memory.SharedMemory(create=True, size=256, name=name)
+    out = Queue()
+    ps = [Process(target=_hdr_writer, args=(name, off_h, n, out, "push")),
+          Process(target=_hdr_writer, args=(name, off_t, n, out, "pop"))]
+    for p in ps: p.start()
+    res = dict(out.get() for _ in ps)
+    for p in ps: p.join()
+    shm.close(); shm.unlink()
+    return res["push"] / n, res["pop"] / n
+
+
+# ---------- alloc 모드: np.zeros 임시 레코드 + push vs claim → 제자리 쓰기 → publish ----------
+# 레코드 값은 미리 만든 tuple (JSON 파싱 등 경로 밖 할당은 빼고 레코드 쓰기만 잰다)
+ALLOC_PATHS = {
+    "private_exec": (PRIVATE_EXEC_DTYPE,
+                     (1700000000000, 12345, "1234567890", 1, 2, 1.0, 0.5, 0.5, 101.5, 101.5, 1700000000000000000)),
+    "order_flag":   (ORDER_FLAG_DTYPE,
+                     (1700000000000, "SOLUSDT", 1, 101.5, 101.6, 1.0, 0.01, 12345)),
+}
+
+
+def _write_zeros(ring, dt, row):
+    # 이전 방식: 메시지마다 0-d 레코드 할당 → 필드별 대입 → push 가 링으로 복사
+    rec = np.zeros((), dtype=dt)
+    for f, v in zip(dt.names, row):
+        rec[f] = v
+    ring.push(rec)
+
+
+def _write_claim(ring, dt, row):
+    i = ring.claim()
+    if i >= 0:
+        ring.arr[i] = row
+    ring.publish()
+
+
+def _alloc_per_msg(fn, ring, dt, row, n):
+    """메시지 1건 동안 tracemalloc peak 증가분 평균 (B) + 할당이 있었던 메시지 비율 + ns/msg"""
+    for _ in range(1000):
+        fn(ring, dt, row)                       # 캐시/프리리스트 워밍업
+    tracemalloc.start()
+    tot = hit = 0
+    for _ in range(n):
+        cur, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(ring, dt, row)
+        peak = tracemalloc.get_traced_memory()[1] - cur
+        tot += peak
+        hit += peak > 0
+    tracemalloc.stop()
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        fn(ring, dt, row)
+    return tot / n, hit / n, (time.perf_counter_ns() - t0) / n
+
+
+def bench_alloc(n, cap):
+    kinds = [("shm_ring", ShmRing)]
+    try:
+        from shm_ring_fast import ShmRing as FastRing
+        kinds.append(("shm_ring_fast", FastRing))
+    except ImportError:
+        print("  (shm_ring_fast 미빌드 → 파이썬 구현만)")
+    for path, (dt, row) in ALLOC_PATHS.items():
+        for kname, cls in kinds:
+            name = f"BENCH_ALLOC_{os.getpid()}"
+            ring = cls(name, dt, cap, create=True)
+            for label, fn in (("np.zeros+push", _write_zeros), ("claim+publish", _write_claim)):
+                b, hit, ns = _alloc_per_msg(fn, ring, dt, row, n)
+                print(f"  {path:12s} {kname:13s} {label:14s}: {b:7.1f} B/msg "
+                      f"(할당 있는 msg {hit*100:5.1f}%) | {ns:7.1f} ns/msg")
+            ring.close(); ring.unlink()
+    print("  * 파이썬에서 호출한 claim 의 잔여 바이트는 인덱스/헤더 int 박싱과 str→UCS4 변환분이다.")
+    print("    Ordersystem/전략 봇은 claim_ptr 로 struct 를 직접 채우므로 레코드 쓰기 할당 0.")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=("ring", "header", "alloc"), default="ring")
+    ap.add_argument("-n", type=int, default=200_000)
+    ap.add_argument("--cap", type=int, default=4096)
+    ap.add_argument("--batch", type=int, default=1, help="pop_many maxn (1 = 레코드당 pop)")
+    ap.add_argument("--ghz", type=float, default=0.0)
+    a = ap.parse_args()
+    ghz = a.ghz or _guess_ghz()
+
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+
+    print(f"mode={a.mode} n={a.n} cap={a.cap} batch={a.batch} clock={ghz:.2f}GHz")
+    if a.mode == "alloc":
+        bench_alloc(a.n, a.cap)
+        return
+    for kind in (RINGS if a.mode == "ring" else HDR_OFFSETS):
+        if a.mode == "ring":
+            push_ns, pop_ns, call_ns = bench_ring(kind, a.n, a.cap, a.batch)
+            print(f"  {kind}: push {push_ns:8.1f} ns ({push_ns*ghz:7.0f} cyc) | "
+                  f"pop/rec {pop_ns:8.1f} ns ({pop_ns*ghz:7.0f} cyc) | pop_many call {call_ns:8.1f} ns")
+        else:
+            h_ns, t_ns = bench_header(kind, a.n)
+            print(f"  {kind}: head store {h_ns:6.1f} ns ({h_ns*ghz:5.0f} cyc) | "
+                  f"tail store {t_ns:6.1f} ns ({t_ns*ghz:5.0f} cyc)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 #!/usr/bin/python
 import json
-import math
 import threading
 import time
 import traceback
-from threading import Timer
+from bisect import bisect_left
 from zlib import crc32
 
 import websocket
@@ -40,8 +39,10 @@ class BitgetWsClient:
         self.__listener = handle
         self.__error_listener = handel_error
         self.__url = url
-        self.__scribe_map = {}
-        self.__allbooks_map = {}
+        self.__scribe_map = {}      # (instType, channel, instId) -> listener
+        self.__channel_map = {}     # (instType, channel, instId) -> SubscribeReq
+        self.__allbooks_map = {}    # (instType, channel, instId) -> BooksInfo
+        self.__keepalive_stop = None
 
     def build(self):
         self.__ws_client = self.__init_client()
@@ -114,12 +115,18 @@ class BitgetWsClient:
             print(ex)
 
     def __keep_connected(self, interval):
-        try:
-            __timer_thread = Timer(interval, self.__keep_connected, (interval,))
-            __timer_thread.start()
-            self.__ws_client.send("ping")
-        except Exception as ex:
-            print(ex)
+        # one keepalive thread per connection, stopped in __close (no new Timer per ping)
+        stop = threading.Event()
+        self.__keepalive_stop = stop
+
+        def _run():
+            while not stop.wait(interval):
+                try:
+                    self.__ws_client.send("ping")
+                except Exception as ex:
+                    print(ex)
+
+        threading.Thread(target=_run, daemon=True).start()
 
     def send_message(self, op, args):
         message = json.dumps(BaseWsReq(op, args), default=lambda o: o.__dict__)
@@ -128,25 +135,22 @@ class BitgetWsClient:
 
     def subscribe(self, channels, listener=None):
 
-        if listener:
-            for chanel in channels:
-                chanel.inst_type = str(chanel.inst_type)
-                self.__scribe_map[chanel] = listener
-
         for channel in channels:
+            channel.inst_type = str(channel.inst_type)
+            self.__channel_map[channel.key()] = channel
+            if listener:
+                self.__scribe_map[channel.key()] = listener
             self.__all_suribe.add(channel)
 
         self.send_message(WS_OP_SUBSCRIBE, channels)
 
     def unsubscribe(self, channels):
         try:
-            for chanel in channels:
-                if chanel in self.__scribe_map:
-                    del self.__scribe_map[chanel]
-
             for channel in channels:
-                if chanel in self.__all_suribe:
-                    self.__all_suribe.remove(channel)
+                self.__scribe_map.pop(channel.key(), None)
+                self.__channel_map.pop(channel.key(), None)
+                self.__allbooks_map.pop(channel.key(), None)
+                self.__all_suribe.discard(channel)
 
             self.send_message(WS_OP_UNSUBSCRIBE, channels)
         except Exception as e:
@@ -174,10 +178,11 @@ class BitgetWsClient:
             return
         listenner = None
         if "data" in json_obj:
-            if not self.__check_sum(json_obj):
+            key = self.__route_key(json_obj.get('arg'))
+            if not self.__check_sum(json_obj, key):
                 return
 
-            listenner = self.get_listener(json_obj)
+            listenner = self.__scribe_map.get(key)
 
         if listenner:
             listenner(message)
@@ -185,25 +190,18 @@ class BitgetWsClient:
 
         self.__listener(message)
 
-    def __dict_books_info(self, dict):
-        return BooksInfo(dict['asks'], dict['bids'], dict['checksum'])
-
-    def __dict_to_subscribe_req(self, dict):
-        if "instId" in dict:
-            instId = dict['instId']
-        else:
-            instId = dict['coin']
-        return SubscribeReq(dict['instType'], dict['channel'], instId)
+    @staticmethod
+    def __route_key(arg):
+        # same tuple as SubscribeReq.key(), read straight from the parsed 'arg'
+        if not arg:
+            return None
+        inst_id = arg.get('instId')
+        if inst_id is None:
+            inst_id = arg.get('coin')
+        return arg.get('instType'), arg.get('channel'), inst_id
 
     def get_listener(self, json_obj):
-        try:
-            if json_obj.get('arg'):
-                json_str = str(json_obj.get('arg')).replace("\'", "\"")
-                subscribe_req = json.loads(json_str, object_hook=self.__dict_to_subscribe_req)
-                return self.__scribe_map.get(subscribe_req)
-        except Exception as e:
-            print(json_obj.get('arg'), e)
-            pass
+        return self.__scribe_map.get(self.__route_key(json_obj.get('arg')))
 
     def __on_error(self, ws, msg):
         print("error:", msg)
@@ -229,39 +227,35 @@ class BitgetWsClient:
     def __close(self):
         self.__login_status = False
         self.__connection = False
+        if self.__keepalive_stop is not None:
+            self.__keepalive_stop.set()
         self.__ws_client.close()
 
-    def __check_sum(self, json_obj):
+    def __check_sum(self, json_obj, key):
         # noinspection PyBroadException
         try:
-            if "arg" not in json_obj or "action" not in json_obj:
+            if key is None or key[1] != "books" or "action" not in json_obj:
                 return True
-            arg = str(json_obj.get('arg')).replace("\'", "\"")
-            action = str(json_obj.get('action')).replace("\'", "\"")
-            data = str(json_obj.get('data')).replace("\'", "\"")
-
-            subscribe_req = json.loads(arg, object_hook=self.__dict_to_subscribe_req)
-
-            if subscribe_req.channel != "books":
-                return True
-
-            books_info = json.loads(data, object_hook=self.__dict_books_info)[0]
+            action = json_obj.get('action')
+            d = json_obj.get('data')[0]
 
             if action == "snapshot":
-                self.__allbooks_map[subscribe_req] = books_info
+                # only the resident book owns the sorted sides and the checksum buffer
+                self.__allbooks_map[key] = BooksInfo(d['asks'], d['bids'], d['checksum'])
                 return True
             if action == "update":
-                all_books = self.__allbooks_map[subscribe_req]
+                all_books = self.__allbooks_map.get(key)
                 if all_books is None:
                     return False
 
-                all_books = all_books.merge(books_info)
-                check_sum = all_books.check_sum(books_info.checksum)
-                if not check_sum:
+                # update payloads stay plain level lists, applied in place
+                all_books.merge(d['asks'], d['bids'])
+                if not all_books.check_sum(d['checksum']):
+                    subscribe_req = self.__channel_map.get(key) or SubscribeReq(*key)
+                    listener = self.__scribe_map.get(key)
                     self.unsubscribe([subscribe_req])
-                    self.subscribe([subscribe_req])
+                    self.subscribe([subscribe_req], listener)
                     return False
-                self.__allbooks_map[subscribe_req] = all_books
         except Exception as e:
             msg = traceback.format_exc()
             print(msg)
@@ -269,57 +263,92 @@ class BitgetWsClient:
         return True
 
 
-class BooksInfo:
-    def __init__(self, asks, bids, checksum):
-        self.asks = asks
-        self.bids = bids
-        self.checksum = checksum
-
-    def merge(self, book_info):
-        self.asks = self.innerMerge(self.asks, book_info.asks, False)
-        self.bids = self.innerMerge(self.bids, book_info.bids, True)
-        return self
-
-    def innerMerge(self, all_list, update_list, is_reverse):
-        price_and_value = {}
-        for v in all_list:
-            price_and_value[v[0]] = v
-
-        for v in update_list:
-            if v[1] == "0":
-                del price_and_value[v[0]]
+class BookSide:
+    """
+    One side of the merged book as parallel arrays sorted best-first.
+    keys are float prices (negated for bids) searched with bisect;
+    px/sz keep the exchange strings as bytes for the checksum.
+    """
+
+    def __init__(self, levels, is_bid):
+        self.is_bid = is_bid
+        self.keys = []
+        self.px = []
+        self.sz = []
+        self.update(levels)
+
+    def update(self, levels):
+        keys, px, sz = self.keys, self.px, self.sz
+        sign = -1.0 if self.is_bid else 1.0
+        for v in levels:
+            k = sign * float(v[0])
+            i = bisect_left(keys, k)
+            found = i < len(keys) and keys[i] == k
+            if float(v[1]) == 0.0:
+                if found:
+                    del keys[i], px[i], sz[i]
                 continue
-            price_and_value[v[0]] = v
-
-        keys = sorted(price_and_value.keys(), reverse=is_reverse)
+            if found:
+                sz[i] = v[1].encode()
+            else:
+                keys.insert(i, k)
+                px.insert(i, v[0].encode())
+                sz.insert(i, v[1].encode())
 
-        result = []
+    def __len__(self):
+        return len(self.keys)
 
-        for i in keys:
-            result.append(price_and_value[i])
+    def levels(self):
+        return [[p.decode(), s.decode()] for p, s in zip(self.px, self.sz)]
 
-        return result
 
-    def check_sum(self, new_check_sum):
-        crc32str = ''
-        for x in range(25):
-            if self.bids[x] is not None:
-                crc32str = crc32str + self.bids[x][0] + ":" + self.bids[x][1] + ":"
+class BooksInfo:
+    """
+    The resident merged book for one subscription, built once from a snapshot.
+    Updates are merged from their raw level lists; no per-update objects.
+    """
+    CHECKSUM_DEPTH = 25
 
-            if self.asks[x] is not None:
-                crc32str = crc32str + self.asks[x][0] + ":" + self.asks[x][1] + ":"
+    def __init__(self, asks, bids, checksum):
+        self.checksum = checksum
+        self.ask_side = BookSide(asks, False)
+        self.bid_side = BookSide(bids, True)
+        self.__buf = bytearray(4096)
+
+    def merge(self, asks, bids):
+        # asks/bids: level lists from an update payload
+        self.ask_side.update(asks)
+        self.bid_side.update(bids)
+        return self
 
-        crc32str = crc32str[0:len(crc32str) - 1]
-        print(crc32str)
-        merge_num = crc32(bytes(crc32str, encoding="utf8"))
-        print("start checknum mergeVal:" + str(merge_num) + ",checkVal:" + str(new_check_sum)+",checkSin:"+str(self.__signed_int(merge_num)))
-        return self.__signed_int(merge_num) == new_check_sum
+    def check_sum(self, new_check_sum):
+        # "bid0px:bid0sz:ask0px:ask0sz:bid1px:..." over the top 25 levels, written into a reused buffer
+        buf = self.__buf
+        n = 0
+        b, a = self.bid_side, self.ask_side
+        for x in range(self.CHECKSUM_DEPTH):
+            for side in (b, a):
+                if x < len(side):
+                    p, s = side.px[x], side.sz[x]
+                    end = n + len(p) + len(s) + 2
+                    if end > len(buf):
+                        buf.extend(bytes(end))
+                    buf[n:n + len(p)] = p
+                    n += len(p)
+                    buf[n] = 58  # ':'
+                    buf[n + 1:n + 1 + len(s)] = s
+                    n += len(s) + 1
+                    buf[n] = 58
+                    n += 1
+        with memoryview(buf) as mv:
+            merge_num = crc32(mv[:max(n - 1, 0)])
+        ok = self.__signed_int(merge_num) == int(new_check_sum)
+        if not ok:
+            print("checksum mismatch mergeVal:" + str(self.__signed_int(merge_num)) + ",checkVal:" + str(new_check_sum))
+        return ok
 
     def __signed_int(self, checknum):
-        int_max = math.pow(2, 31) - 1
-        if checknum > int_max:
-            return checknum - int_max * 2 - 2
-        return checknum
+        return checknum - (1 << 32) if checknum >= (1 << 31) else checknum
 
 class SubscribeReq:
 
@@ -333,7 +362,10 @@ class SubscribeReq:
         return self.__dict__ == other.__dict__
 
     def __hash__(self) -> int:
-        return hash(self.inst_type + self.channel + self.inst_id)
+        return hash(self.key())
+
+    def key(self):
+        return self.inst_type, self.channel, self.inst_id
 
 
 class BaseWsReq:
@@ -0,0 +1,298 @@
+# bitget_ws_loop.py
+# Bitget WS 연결 여러 개를 프로세스당 스레드 하나(selectors)로 구동
+#   앱 핑("ping" 문자열)/pong 타임아웃/무수신 타임아웃/재연결 백오프 = 루프의 타이머 → 하트비트 스레드 없음
+#   연결마다 콜백: on_open(conn), on_message(conn, msg, recv_ns), on_close(conn)
+#   (msg = 파싱된 JSON dict, 문자열/이벤트 pong 은 루프가 먹는다)
+import json, selectors, socket, threading, time
+from collections import deque
+from websocket import WebSocket, ABNF
+
+from shm_status import ST_CONNECTING, ST_CLOSED, ST_ERROR, ST_IDLE_RESTART
+
+PING_INTERVAL   = 25    # Bitget: 30초 동안 ping 이 없으면 서버가 끊음
+PONG_TIMEOUT    = 60    # 마지막 pong 이후 이 시간이 지나면 재연결
+CONNECT_TIMEOUT = 10    # 핸드셰이크 + 부분 프레임 수신 상한 (소켓 timeout)
+BACKOFF_MIN, BACKOFF_MAX = 0.5, 12
+
+
+class _NoStatus:
+    """상태 슬롯이 없는 연결용 (Ordersystem 송신 연결 등)"""
+    def tick(self, exch_ts, recv_ns=0): pass
+    def state(self, st): pass
+    def error(self, code=0): pass
+
+
+class BgConn:
+    """
+    연결 1개 (루프 스레드가 소유). send/send_json 은 아무 스레드에서나 호출 가능
+    (WebSocket(enable_multithread=True) 의 송신 락). 끊겨 있으면 False.
+    """
+
+    def __init__(self, loop, url, on_open, on_message, on_close, st, idle_s):
+        self.loop = loop
+        self.url = url
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_close = on_close
+        self.st = st if st is not None else _NoStatus()
+        self.idle_s = float(idle_s or 0)
+        self.ws = None
+        self.live = False
+        self.connecting = False
+        self.retry_at = 0.0         # monotonic, 재연결 예정 시각
+        self.backoff = BACKOFF_MIN
+        self.last_rx = self.last_pong = self.next_ping = 0.0
+
+    def send(self, text) -> bool:
+        ws = self.ws
+        if ws is None or not self.live:
+            return False
+        ws.send(text)
+        return True
+
+    def send_json(self, obj) -> bool:
+        return self.send(json.dumps(obj))
+
+
+class BitgetLoop:
+    """
+    프로세스당 하나: add() 로 연결을 등록하고 run_forever() (또는 start() 로 데몬 스레드 1개).
+    수신/타이머/콜백은 전부 루프 스레드 → 콜백 안에서 락 불필요.
+    TLS 핸드셰이크만 짧은 연결 스레드에서 하고 끝나면 call_soon 으로 루프에 넘긴다
+    (재연결 중에도 같은 루프의 다른 연결 수신이 밀리지 않게).
+    """
+
+    def __init__(self, ping_s: float = PING_INTERVAL, pong_timeout_s: float = PONG_TIMEOUT,
+                 connect_timeout_s: float = CONNECT_TIMEOUT):
+        self.ping_s = float(ping_s)
+        self.pong_timeout_s = float(pong_timeout_s)
+        self.connect_timeout_s = float(connect_timeout_s)
+        self.sel = selectors.DefaultSelector()
+        self.conns = []
+        self.running = False
+        self._calls = deque()
+        self._rd, self._wr = socket.socketpair()
+        self._rd.setblocking(False)
+        self._wr.setblocking(False)
+        self.sel.register(self._rd, selectors.EVENT_READ, None)
+
+    def add(self, url, on_open=None, on_message=None, on_close=None, st=None, idle_s=0) -> BgConn:
+        c = BgConn(self, url, on_open, on_message, on_close, st, idle_s)
+        self.conns.append(c)
+        return c
+
+    # ---------- 다른 스레드 → 루프 ----------
+    def call_soon(self, fn, *args):
+        self._calls.append((fn, args))
+        try:
+            self._wr.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass            # 이미 깨울 바이트가 쌓여 있음
+
+    def stop(self):
+        self.call_soon(self._stop)
+
+    def _stop(self):
+        self.running = False
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, daemon=True)
+        t.start()
+        return t
+
+    # ---------- 메인 루프 ----------
+    def run_forever(self):
+        self.running = True
+        while self.running:
+            timeout = self._timers(time.monotonic())
+            for key, _ in self.sel.select(timeout):
+                c = key.data
+                if c is None:
+                    self._drain_calls()
+                elif c.ws is not None:
+                    self._read(c)
+        for c in self.conns:
+            if c.ws is not None:
+                self._drop(c, ST_CLOSED, retry=False)
+
+    def _drain_calls(self):
+        try:
+            while self._rd.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while self._calls:
+            fn, args = self._calls.popleft()
+            fn(*args)
+
+    def _timers(self, now: float) -> float:
+        """재연결/핑/pong·무수신 타임아웃 처리 → 다음 마감까지 남은 초 (select timeout)"""
+        nxt = now + self.ping_s
+        for c in self.conns:
+            if c.ws is None:
+                if not c.connecting:
+                    if now >= c.retry_at:
+                        self._connect(c)
+                    else:
+                        nxt = min(nxt, c.retry_at)
+                continue
+            if now - c.last_pong > self.pong_timeout_s:
+                self._drop(c, ST_ERROR)
+                continue
+            if c.idle_s and now - c.last_rx > c.idle_s:
+                self._drop(c, ST_IDLE_RESTART)
+                continue
+            if now >= c.next_ping:
+                try:
+                    c.ws.send("ping")       # Bitget 는 문자열 ping 에만 "pong" 응답
+                except Exception:
+                    self._drop(c, ST_ERROR)
+                    continue
+                c.next_ping = now + self.ping_s
+            nxt = min(nxt, c.next_ping, c.last_pong + self.pong_timeout_s)
+            if c.idle_s:
+                nxt = min(nxt, c.last_rx + c.idle_s)
+        return max(0.0, nxt - time.monotonic())
+
+    # ---------- 연결 ----------
+    def _connect(self, c: BgConn):
+        c.connecting = True
+        c.st.state(ST_CONNECTING)
+
+        def _handshake():
+            ws = WebSocket(enable_multithread=True)
+            try:
+                ws.connect(c.url, timeout=self.connect_timeout_s)
+            except Exception:
+                self.call_soon(self._connect_failed, c)
+                return
+            self.call_soon(self._opened, c, ws)
+
+        threading.Thread(target=_handshake, daemon=True).start()
+
+    def _connect_failed(self, c: BgConn):
+        c.connecting = False
+        c.st.state(ST_ERROR)
+        c.st.error()
+        self._schedule_retry(c)
+
+    def _opened(self, c: BgConn, ws):
+        c.connecting = False
+        if not self.running:
+            ws.abort()
+            return
+        now = time.monotonic()
+        c.ws = ws
+        c.live = True
+        c.backoff = BACKOFF_MIN             # 연결 성공 → 백오프 리셋
+        c.last_rx = c.last_pong = now
+        c.next_ping = now + self.ping_s
+        self.sel.register(ws.sock, selectors.EVENT_READ, c)
+        if c.on_open is not None:
+            try:
+                c.on_open(c)
+            except Exception:
+                c.st.error()
+
+    def _schedule_retry(self, c: BgConn):
+        c.retry_at = time.monotonic() + c.backoff
+        c.backoff = min(c.backoff * 2, BACKOFF_MAX)
+
+    def _drop(self, c: BgConn, state: int, retry: bool = True):
+        ws, c.ws, c.live = c.ws, None, False
+        try:
+            self.sel.unregister(ws.sock)
+        except Exception:
+            pass
+        try:
+            ws.abort()
+        except Exception:
+            pass
+        try:
+            ws.shutdown()
+        except Exception:
+            pass
+        c.st.state(state)
+        if c.on_close is not None:
+            try:
+                c.on_close(c)
+            except Exception:
+                c.st.error()
+        if retry:
+            self._schedule_retry(c)
+
+    # ---------- 수신 ----------
+    def _read(self, c: BgConn):
+        ws = c.ws
+        sock = ws.sock
+        try:
+            while True:
+                recv_ns = time.time_ns()    # 프레임 수신 직후 (파싱 전)
+                op, data = ws.recv_data(control_frame=True)
+                if op == ABNF.OPCODE_CLOSE:
+                    self._drop(c, ST_CLOSED)
+                    return
+                if op == ABNF.OPCODE_TEXT or op == ABNF.OPCODE_BINARY:
+                    self._dispatch(c, data, recv_ns)
+                    if c.ws is not ws:      # 콜백이 연결을 닫음
+                        return
+                # TLS 레코드에 이미 복호화된 바이트가 남아 있으면 select 가 다시 깨우지 않는다
+                pending = getattr(sock, "pending", None)
+                if pending is None or not pending():
+                    return
+        except Exception:
+            if c.ws is ws:
+                self._drop(c, ST_ERROR)
+
+    def _dispatch(self, c: BgConn, data, recv_ns: int):
+        now = time.monotonic()
+        c.last_rx = now
+        if data == b"pong":
+            c.last_pong = now
+            return
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            c.st.error()
+            return
+        if not isinstance(msg, dict):
+            return
+        if msg.get("event") == "pong":
+            c.last_pong = now
+            return
+        if c.on_message is not None:
+            try:
+                c.on_message(c, msg, recv_ns)
+            except Exception:
+                c.st.error()
+
+
+class RingSink:
+    """
+    한 WS 메시지의 rows → 링 슬롯에 제자리 쓰기 (ShmRing.claim), 메시지 끝에서 publish 1회
+      i = sink.claim(); fill(sink.arr, i, ...)   또는  sink.put((필드 순서 tuple))
+      ... 메시지 끝에서 sink.flush()  (처리 중 예외면 sink.discard() → 반쯤 쓴 슬롯은 안 나감)
+    레코드당 임시 배열/복사 없음. 링 생산자는 하나 (루프 스레드).
+    """
+    __slots__ = ("ring", "arr")
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.arr = ring.arr
+
+    def claim(self) -> int:
+        """다음 슬롯 인덱스 (-1 = 링 정책상 버림)"""
+        return self.ring.claim()
+
+    def put(self, row) -> bool:
+        i = self.ring.claim()
+        if i < 0:
+            return False
+        self.arr[i] = row
+        return True
+
+    def flush(self) -> int:
+        return self.ring.publish()
+
+    def discard(self) -> int:
+        return self.ring.discard()
@@ -1,129 +1,200 @@
 # bitget_ws_workers.py
-import time, json, numpy as np
-from websocket import WebSocketApp
-from shm_ring import ShmRing
-from layouts import BOOK_DTYPE
-import threading
+import time, numpy as np
+from shm_registry import attach_ring
+from shm_snapshot import ShmSnapshot
+from shm_status import status_slot, ST_STARTING, ST_LIVE
+from collections import deque
+from layouts import TRADE_DTYPE, TICKER_DTYPE, depth_dtype, symbol_table
+from book_features import fill_depth, parse_levels
+from bitget_ws_loop import BitgetLoop, RingSink
 
 # PUB_URL = "wss://ws.bitget.com/v2/ws/public"
 PUB_URL = "wss://wspap.bitget.com/v2/ws/public"
 
 def _now_ms(): return int(time.time()*1000)
 
-HEARTBEAT_INTERVAL = 30  
-HEARTBEAT_TIMEOUT  = 70 
 
-def bitget_futures_book_ws_worker(cfg, shm_name_books: str, capacity: int, shared):
-    instId = str(cfg.get("bitget_symbol"))
-    ring = ShmRing(shm_name_books, BOOK_DTYPE, capacity, create=False)
-    shared["bg_books_state"] = "starting"
-
-    last_pong = {"ts": _now_ms()}  # 최근 pong 시각
+def public_connection(loop, url, args, handle, st, idle_s: float = 0):
+    """
+    loop 에 Bitget public WS 연결 1개 등록: 열리면 args 구독,
+    "data" 리스트 메시지마다 handle(data, recv_ns, msg). 핑/퐁/재연결은 BitgetLoop 가.
+    """
+    def on_open(conn):
+        conn.send_json({"op": "subscribe", "args": args})
+        st.state(ST_LIVE)
 
-    # ----- backoff generator (로컬) -----
-    def _backoff_gen():
-        t = 0.5
-        while True:
-            yield t
-            t = min(t * 2, 12)
+    def on_message(conn, md, recv_ns):
+        data = md.get("data")
+        if isinstance(data, list):
+            handle(data, recv_ns, md)
 
-    bo = _backoff_gen()
+    return loop.add(url, on_open=on_open, on_message=on_message, st=st, idle_s=idle_s)
 
-    def reset_backoff():
-        nonlocal bo
-        bo = _backoff_gen()
 
-    # ------------------------------------
+def run_public(cfg, args, handle, st):
+    """bg_redundancy 개 연결(bg_pub_urls 순환)로 같은 구독 — 모든 연결이 이 스레드의 루프 하나에서"""
+    urls = list(cfg.get("bg_pub_urls") or [PUB_URL])
+    red = max(1, int(cfg.get("bg_redundancy", 1)))
+    loop = BitgetLoop(ping_s=float(cfg.get("bg_ping_s", 25)), pong_timeout_s=float(cfg.get("bg_pong_timeout_s", 60)))
+    idle_s = float(cfg.get("bg_idle_s", 0))     # 0 = 무수신 재연결 끔 (pong 타임아웃만)
+    for r in range(red):
+        public_connection(loop, urls[r % len(urls)], args, handle, st, idle_s)
+    loop.run_forever()
 
-    def on_open(ws):
-        try:
-            reset_backoff()  # 연결 성공 시 백오프 리셋
-            sub = {
-                "op": "subscribe",
-                "args": [{"instType": "USDT-FUTURES", "channel": "books1", "instId": instId}],
-            }
-            ws.send(json.dumps(sub))
-            shared["bg_trade_state"] = "subscribed"
-            last_pong["ts"] = _now_ms()  # 오픈 시 초기화
-        except Exception:
-            shared["bg_trade_state"] = "open_err"
 
-    def on_message(ws, message):
+def bitget_futures_book_ws_worker(cfg, ring_key: str):
+    instId = str(cfg.get("bitget_symbol"))
+    levels = int(cfg.get("depth_levels", 5))
+    DEPTH_DTYPE = depth_dtype(levels)
+    # books5 / books15 는 매 push 가 상위 5/15 레벨 스냅샷
+    channel = "books5" if levels <= 5 else "books15"
+    ring = attach_ring(cfg, ring_key, DEPTH_DTYPE, producer=True)
+    snap = ShmSnapshot(cfg["snap_ob_bg"], DEPTH_DTYPE, create=False)  # 상위 N 최신값 (seqlock)
+    sink = RingSink(ring)                     # 한 메시지의 rows → 슬롯에 제자리, publish 1회
+    st = status_slot(cfg, ring_key)
+    st.state(ST_STARTING)
+
+    # hot-hot: bg_redundancy 개 연결(bg_pub_urls 순환)이 같은 채널을 받고, 먼저 온 row 만 링에.
+    # 중복 판정 키 = row 의 seq (없으면 ts) — 이미 넘긴 키 이하면 다른 연결이 먼저 준 것.
+    # 모든 연결이 BitgetLoop 스레드 하나에서 콜백되므로 락 없이 dedup + push (링 생산자는 하나).
+    last_key = -1
+
+    def handle(data, recv_ns, _msg):
+        nonlocal last_key
+        ts = 0
+        last = None
         try:
-            # Bitget는 'pong'을 문자열로 주거나 {"event":"pong"} 형식으로 줄 수 있음
-            if message == "pong":
-                last_pong["ts"] = _now_ms()
-                return
-
-            md = json.loads(message) if isinstance(message, (str, bytes)) else (message or {})
-            if isinstance(md, dict) and md.get("event") == "pong":
-                last_pong["ts"] = _now_ms()
-                return
-
-            data = md.get("data")
-            if not isinstance(data, list):
-                return
-
             for d in data:
                 asks = d.get("asks") or []
                 bids = d.get("bids") or []
 
                 if not asks or not bids:
                     continue
-                    # 문자열로 오는 경우가 많음 -> float 캐스팅
-                a0 = asks[0];
-                b0 = bids[0];
-                ask = float(a0[0]);
-                ask_qty = float(a0[1]);
-                bid = float(b0[0]);
-                bid_qty = float(b0[1]);
-
-                ts = int(d.get("ts"))
-
-                ring.push((ts, bid, bid_qty, ask, ask_qty))
-                shared["last_bg_books_ts"] = ts
-                shared["last_bg_books_px"] = (ask + bid) * 0.5
-        except Exception as e:
-            shared["bg_trade_last_err"] = str(e)
-
-    def on_close(ws,*a): shared["bg_books_state"]="closed"
-    def on_err(ws,err):  shared["bg_books_state"]="error"
-
-    def heartbeater(ws):
-        while True:
-            time.sleep(HEARTBEAT_INTERVAL)
-            try:
-                # Bitget 요구: 문자열 "ping" 전송
-                ws.send("ping")
-            except Exception:
-                return  # 연결이 죽었으면 스레드 종료
-            # pong 타임아웃 체크 -> 재연결 유도
-            if _now_ms() - last_pong["ts"] > HEARTBEAT_TIMEOUT*1000:
-                try: ws.close()  # run_forever 루프에서 재연결
-                except: pass
-                return
-
-    while True:
-        try:
-            ws = WebSocketApp(
-                PUB_URL,
-                on_open=on_open,
-                on_message=on_message,
-                on_error=on_err,
-                on_close=on_close
-            )
-            shared["bg_books_state"]="connecting"
-            t = threading.Thread(target=heartbeater, args=(ws,), daemon=True)
-            t.start()
-            # run_forever의 ping_interval은 제어프레임용(프로토콜 핑). 앱 핑은 heartbeater에서 처리.
-            ws.run_forever(ping_interval=0, ping_timeout=None)
+
+                # 파싱/검증을 슬롯 claim 전에 (문자열 → float). 깨진 row 는 링에 안 넣는다
+                try:
+                    row_ts = int(d.get("ts"))
+                    key = int(d.get("seq") or 0) or row_ts
+                    b = parse_levels(bids, levels)
+                    a = parse_levels(asks, levels)
+                except (TypeError, ValueError):
+                    st.error()
+                    continue
+                if key <= last_key:
+                    continue
+                last_key = key
+                ts = row_ts
+                i = sink.claim()
+                if i < 0:
+                    continue
+                fill_depth(sink.arr, i, ts, b, a, recv_ns)
+                last = sink.arr[i]
         except Exception:
-            shared["bg_books_state"]="crashed"
-        # 실패/종료 후 지수 백오프 슬립
-        try:
-            time.sleep(next(bo))
-        except StopIteration:
-            # 이 경우는 없지만 방지용
-            bo = _backoff_gen()
-            time.sleep(next(bo))
+            sink.discard()          # claim 한 슬롯이 반쯤 쓴 채로 다음 flush 에 나가지 않게
+            raise
+        sink.flush()
+
+        if last is not None:
+            # 마지막 row 가 최신
+            snap.write(last)
+            st.tick(ts, recv_ns)
+
+    run_public(cfg, [{"instType": "USDT-FUTURES", "channel": channel, "instId": instId}], handle, st)
+
 
+def _trade_order(d):
+    """체결 row 정렬 키 (ts, tradeId). 숫자가 아닌 값이 있으면 (0, 0) (어차피 handle 에서 버림)"""
+    try:
+        return int(d.get("ts") or 0), int(d.get("tradeId") or 0)
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+def bitget_futures_trade_ws_worker(cfg, ring_key: str):
+    """
+    Bitget 선물 public trade 채널 → TRADE_DTYPE 링 (Binance 체결 링과 같은 레이아웃)
+    한 메시지의 rows 는 RingSink 슬롯에 claim 해서 쓰고 메시지 끝에 publish 1회.
+    구독 직후 snapshot(최근 체결들)과 재연결/중복 연결로 같은 체결이 다시 오므로
+    최근 tradeId 집합으로 중복 제거 (row 를 다 파싱한 뒤에 — 깨진 row 가 id 를 선점하지 않게).
+    """
+    instId = str(cfg.get("bitget_symbol"))
+    ring = attach_ring(cfg, ring_key, TRADE_DTYPE, producer=True)
+    sink = RingSink(ring)
+    st = status_slot(cfg, ring_key)
+    st.state(ST_STARTING)
+
+    seen = set()
+    order = deque()                              # seen 삽입 순서 (오래된 것부터 버림)
+    keep = int(cfg.get("bg_trade_dedup", 4096))
+
+    def handle(data, recv_ns, _msg):
+        ts = 0
+        try:
+            # snapshot 은 최신순으로 옴 → 시간순으로 넣는다 (같은 ms 는 tradeId 순 → 링 순서가 결정적)
+            for d in sorted(data, key=_trade_order):
+                try:
+                    tid = int(d.get("tradeId") or 0)
+                    row = (int(d.get("ts") or 0), float(d.get("price") or 0), float(d.get("size") or 0),
+                           1 if (d.get("side") or "").lower() == "sell" else 0, tid, recv_ns)
+                except (TypeError, ValueError):
+                    st.error()
+                    continue
+                if not tid or tid in seen:           # id 없는 row 는 중복 판정 불가 → 버림
+                    continue
+                seen.add(tid); order.append(tid)
+                if len(order) > keep:
+                    seen.discard(order.popleft())
+                ts = row[0]
+                sink.put(row)
+        except Exception:
+            sink.discard()
+            raise
+        sink.flush()
+        if ts:
+            st.tick(ts, recv_ns)
+
+    run_public(cfg, [{"instType": "USDT-FUTURES", "channel": "trade", "instId": instId}], handle, st)
+
+
+def ticker_snap_name(cfg, inst_id: str) -> str:
+    """심볼별 ticker seqlock 스냅샷 이름 (run_lowlat 이 생성, 워커가 write, 전략/리스크가 read)"""
+    return f"{cfg['snap_tk_bg']}_{inst_id.upper()}"
+
+
+def bitget_ticker_symbols(cfg) -> list:
+    return [str(s).upper() for s in (cfg.get("bg_ticker_symbols") or [cfg.get("bitget_symbol")])]
+
+
+def bitget_futures_ticker_ws_worker(cfg, status_key: str):
+    """
+    Bitget 선물 ticker 채널 → 심볼별 TICKER_DTYPE seqlock 스냅샷 (최신값만 의미 있음 → 링 없음)
+    마크/인덱스/펀딩비/다음 펀딩 시각/미결제약정. 독자는 ShmSnapshot.read() 로 O(1), REST 없음.
+    """
+    syms = bitget_ticker_symbols(cfg)
+    snaps = {s: ShmSnapshot(ticker_snap_name(cfg, s), TICKER_DTYPE, create=False) for s in syms}
+    symbols = symbol_table(cfg)
+    rec = np.zeros(1, dtype=TICKER_DTYPE)
+    st = status_slot(cfg, status_key)
+    st.state(ST_STARTING)
+
+    def handle(data, recv_ns, _msg):
+        ts = 0
+        for d in data:
+            snap = snaps.get((d.get("instId") or d.get("symbol") or "").upper())
+            if snap is None:
+                continue
+            ts = int(d.get("ts") or 0)
+            r = rec[0]
+            r["ts"] = ts
+            r["recv_ns"] = recv_ns
+            r["mark_px"] = float(d.get("markPrice") or 0)
+            r["index_px"] = float(d.get("indexPrice") or 0)
+            r["funding_rate"] = float(d.get("fundingRate") or 0)
+            r["next_funding_ms"] = int(d.get("nextFundingTime") or 0)
+            r["open_interest"] = float(d.get("holdingAmount") or 0)
+            r["symbol"] = symbols.id((d.get("instId") or "").upper())
+            snap.write(r)
+        if ts:
+            st.tick(ts, recv_ns)
+
+    run_public(cfg, [{"instType": "USDT-FUTURES", "channel": "ticker", "instId": s} for s in syms], handle, st)
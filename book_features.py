@@ -0,0 +1,64 @@
+# book_features.py
+# layouts.depth_dtype(N) 레코드 채우기 + 레벨 축 벡터 피처
+import numpy as np
+
+
+def parse_levels(levels, n: int):
+    """
+    거래소 [[px, qty], ...] (문자열 가능) 상위 n 개 → float64 (k, 2) 배열.
+    숫자가 아니거나 [px, qty] 모양이 아니면 ValueError (링 슬롯을 잡기 전에 검증용)
+    """
+    a = np.asarray(levels[:n], dtype=np.float64)
+    if a.ndim != 2 or a.shape[1] < 2:
+        if a.size:
+            raise ValueError(f"레벨 모양 {a.shape}")
+        return a.reshape(0, 2)
+    return a[:, :2]
+
+
+def fill_depth(arr, i: int, ts: int, bids, asks, recv_ns: int = 0):
+    """
+    arr[i] (depth_dtype 배열) 에 거래소 [[px, qty], ...] 레벨을 채움 (문자열 가능).
+    레벨 수가 N 보다 적으면 나머지는 0, nb/na 에 실제 개수.
+    bids/asks 가 parse_levels 결과면 다시 변환하지 않는다.
+    """
+    n = arr.dtype["bid_px"].shape[0]
+    b = parse_levels(bids, n)
+    a = parse_levels(asks, n)
+    nb, na = len(b), len(a)
+    rec = arr[i:i+1]
+    rec["ts"] = ts
+    rec["recv_ns"] = recv_ns
+    rec["nb"] = nb
+    rec["na"] = na
+    bp = rec["bid_px"][0]; bq = rec["bid_qty"][0]
+    ap = rec["ask_px"][0]; aq = rec["ask_qty"][0]
+    bp[:nb] = b[:, 0]; bq[:nb] = b[:, 1]; bp[nb:] = 0.0; bq[nb:] = 0.0
+    ap[:na] = a[:, 0]; aq[:na] = a[:, 1]; ap[na:] = 0.0; aq[na:] = 0.0
+
+
+def depth_imbalance(recs, levels: int = 0):
+    """
+    상위 levels 개 레벨(0 = 전부) 수량 임밸런스 (B - A) / (B + A) ∈ [-1, 1]
+    recs: depth 레코드 1개 또는 배열 → 스칼라 또는 레코드별 배열
+    """
+    bq = np.asarray(recs["bid_qty"])
+    aq = np.asarray(recs["ask_qty"])
+    if levels:
+        bq = bq[..., :levels]
+        aq = aq[..., :levels]
+    B = bq.sum(axis=-1)
+    A = aq.sum(axis=-1)
+    tot = B + A
+    return np.divide(B - A, tot, out=np.zeros_like(tot), where=tot > 0)
+
+
+def microprice(recs):
+    """L1 수량 가중 중간가: (bid * askQ + ask * bidQ) / (bidQ + askQ)"""
+    bp = np.asarray(recs["bid_px"])[..., 0]
+    ap = np.asarray(recs["ask_px"])[..., 0]
+    bq = np.asarray(recs["bid_qty"])[..., 0]
+    aq = np.asarray(recs["ask_qty"])[..., 0]
+    tot = bq + aq
+    mid = 0.5 * (bp + ap)
+    return np.where(tot > 0, (bp * aq + ap * bq) / np.where(tot > 0, tot, 1.0), mid)
@@ -0,0 +1,112 @@
+# gen_layouts_c.py
+# layouts.py 의 *_DTYPE → layouts_c.pxd (cdef packed struct + 두 구간 peek 접근자) 생성
+#   python gen_layouts_c.py          # 재생성
+#   python gen_layouts_c.py --check  # layouts_c.pxd 가 layouts.py 와 어긋나면 exit 1 (setup.py 가 빌드 전에 호출)
+import os
+import sys
+import numpy as np
+
+import layouts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PXD_PATH = os.path.join(BASE_DIR, "layouts_c.pxd")
+
+# numpy kind+size → C 타입
+_C_TYPES = {
+    ("i", 1): "int8_t",  ("i", 2): "int16_t",  ("i", 4): "int32_t",  ("i", 8): "int64_t",
+    ("u", 1): "uint8_t", ("u", 2): "uint16_t", ("u", 4): "uint32_t", ("u", 8): "uint64_t",
+    ("f", 4): "float",   ("f", 8): "double",
+    ("b", 1): "uint8_t",
+}
+
+
+def struct_name(dtype_name: str) -> str:
+    """ORDER_FLAG_V2_DTYPE → order_flag_v2_t"""
+    return dtype_name[:-len("_DTYPE")].lower() + "_t"
+
+
+def record_dtypes():
+    """layouts.py 에 정의된 순서대로 (이름, dtype)"""
+    return [(k, v) for k, v in vars(layouts).items()
+            if k.endswith("_DTYPE") and isinstance(v, np.dtype) and v.names]
+
+
+def _c_field(name: str, dt: np.dtype) -> str:
+    if dt.kind == "U":
+        return f"Py_UCS4 {name}[{dt.itemsize // 4}]"       # numpy U<n> = UCS4 n글자
+    if dt.kind in "SV":
+        return f"char    {name}[{dt.itemsize}]"
+    if dt.byteorder == ">":
+        raise ValueError(f"{name}: big-endian 필드는 미러 불가")
+    return f"{_C_TYPES[(dt.kind, dt.itemsize)]:<7} {name}"
+
+
+def emit_struct(dtype_name: str, dt: np.dtype) -> list:
+    """필드 오프셋 그대로 packed struct (정렬 dtype 의 빈 곳은 _pad 배열로 채움)"""
+    name = struct_name(dtype_name)
+    out = [f"cdef packed struct {name}:  # {dtype_name}, {dt.itemsize}B"]
+    off = npad = 0
+    for f, (fdt, foff) in sorted(((f, dt.fields[f][:2]) for f in dt.names), key=lambda x: x[1][1]):
+        if foff > off:
+            out.append(f"    char    _pad{npad}[{foff - off}]")
+            npad += 1
+        out.append("    " + _c_field(f, fdt))
+        off = foff + fdt.itemsize
+    if dt.itemsize > off:
+        out.append(f"    char    _pad{npad}[{dt.itemsize - off}]")
+    out.append("")
+    return out
+
+
+def emit_accessor(dtype_name: str) -> list:
+    name = struct_name(dtype_name)
+    fn = name[:-2] + "_at"
+    return [
+        f"cdef inline const {name}* {fn}(const void* seg1, Py_ssize_t n1,",
+        f"                                 const void* seg2, Py_ssize_t i) noexcept nogil:",
+        f"    return <const {name}*>seg1 + i if i < n1 else <const {name}*>seg2 + (i - n1)",
+        "",
+    ]
+
+
+def render() -> str:
+    dts = record_dtypes()
+    out = [
+        "# layouts_c.pxd",
+        "# 자동 생성: python gen_layouts_c.py — 직접 수정 금지 (layouts.py 를 고치고 재생성)",
+        "# layouts.py dtype 들의 C struct 미러. 오프셋/크기는 dtype 과 바이트 단위로 같다",
+        "# (numpy 기본 dtype 은 packed, v2 는 정렬+64B 패딩 → _pad 로 재현).",
+        "# <이름>_at(seg1, n1, seg2, i): ShmRing.peek_ptr 두 구간에서 i 번째 레코드",
+        "from libc.stdint cimport int8_t, int16_t, int32_t, int64_t, uint8_t, uint16_t, uint32_t, uint64_t",
+        "",
+    ]
+    for k, dt in dts:
+        out += emit_struct(k, dt)
+    out.append("")
+    for k, _ in dts:
+        out += emit_accessor(k)
+    return "\n".join(out).rstrip() + "\n"
+
+
+def check() -> bool:
+    """layouts_c.pxd 가 현재 layouts.py 로 생성한 내용과 같은지"""
+    try:
+        with open(PXD_PATH, encoding="utf-8") as f:
+            return f.read() == render()
+    except FileNotFoundError:
+        return False
+
+
+def write():
+    with open(PXD_PATH, "w", encoding="utf-8", newline="\n") as f:
+        f.write(render())
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        if not check():
+            print("layouts_c.pxd 가 layouts.py 와 다름 → python gen_layouts_c.py 로 재생성", file=sys.stderr)
+            sys.exit(1)
+    else:
+        write()
+        print(f"wrote {PXD_PATH}")
@@ -1,12 +1,18 @@
 # layouts.py
 import numpy as np
 
+# 타임스탬프 규칙 (시장데이터 / private 레코드 공통)
+#   ts      : 거래소 시각 (ms, epoch) — 거래소가 안 주는 스트림은 로컬 수신 ms
+#   recv_ns : 로컬 수신 시각 (ns, CLOCK_REALTIME = time.time_ns()), 소켓 콜백 진입 직후 찍음
+# feed 지연 = recv_ns / 1e6 - ts (shm_status.latency_stats)
+
 TRADE_DTYPE = np.dtype([
     ("ts",  "int64"),
     ("px",  "float64"),
     ("qty", "float64"),
     ("sell","uint8"),
     ("tid", "int64"),
+    ("recv_ns", "int64"),
 ])
 
 BOOK_DTYPE = np.dtype([
@@ -67,6 +73,7 @@ PRIVATE_EXEC_DTYPE = np.dtype([
     ("last_fill", "float64"), # 이번 이벤트 체결
     ("last_price","float64"), # 이번 이벤트 체결가
     ("avg_price", "float64"), # 평균 체결가(있으면)
+    ("recv_ns",   "int64"),   # 로컬 수신 ns
 ])
 '''
 self.orders[coid] = {
@@ -120,3 +127,204 @@ BG_WS_CMD_DTYPE = np.dtype([
     ("client_oid",  "int64"),
     ("order_id",    "U48"),      # cancel 시 우선
 ])
+
+
+# ====== v2: 고정폭 컴팩트 레이아웃 ======
+# U48/U32 는 글자당 4B(UTF-32)라 리포트 1건이 300B 넘게 대부분 패딩이고 대입마다 인코딩이 돈다.
+# v2: 거래소 주문ID(숫자 문자열) → int64, 심볼 → 심볼 테이블(SymbolTable)의 int16 ID,
+#     레코드 크기는 64B(캐시라인) 배수. OR/FL 링은 v2, v1 소비자는 from_v2 로 변환.
+
+
+class SymbolTable:
+    """
+    심볼 ↔ int16 ID. ID = 목록 순서 + 1 (0 = 미지정). 목록은 cfg["symbols"] (run_lowlat.build_cfg 가
+    쓰는 심볼 문자열 전부로 채움) → cfg 를 공유하는 모든 프로세스가 같은 ID 를 쓴다.
+    문자열은 받은 그대로 (대소문자/접미사 포함) 등록 → name(id(s)) == s.
+    """
+    __slots__ = ("names", "ids")
+
+    def __init__(self, symbols):
+        names = [""]
+        for s in symbols:
+            if s and s not in names:
+                names.append(str(s))
+        if len(names) > 0x7fff:
+            raise ValueError(f"심볼 {len(names) - 1}개 > int16")
+        self.names = tuple(names)
+        self.ids = {s: i for i, s in enumerate(self.names)}
+
+    def id(self, sym) -> int:
+        """심볼 → ID (미등록 0)"""
+        return self.ids.get(sym or "", 0)
+
+    def name(self, sid) -> str:
+        sid = int(sid)
+        return self.names[sid] if 0 <= sid < len(self.names) else ""
+
+    def __len__(self):
+        return len(self.names) - 1
+
+
+def symbol_table(cfg) -> SymbolTable:
+    return SymbolTable(cfg.get("symbols") or ())
+
+
+def order_id_int(oid) -> int:
+    """거래소 주문ID 문자열 → int64 (숫자가 아니거나 범위 밖이면 0)"""
+    try:
+        v = int(oid)
+    except (TypeError, ValueError):
+        return 0
+    return v if 0 <= v < (1 << 63) else 0
+
+
+def _rec64(fields):
+    """필드를 C 정렬로 배치하고 레코드 크기를 64B 배수로 올림"""
+    dt = np.dtype(fields, align=True)
+    size = (dt.itemsize + 63) // 64 * 64
+    return np.dtype({"names": dt.names,
+                     "formats": [dt.fields[n][0] for n in dt.names],
+                     "offsets": [dt.fields[n][1] for n in dt.names],
+                     "itemsize": size})
+
+
+ORDER_FLAG_V2_DTYPE = _rec64([      # 64B (v1 177B)
+    ("ts",         "int64"),
+    ("exec_px",    "float64"),
+    ("exit_px",    "float64"),
+    ("qty",        "float64"),
+    ("tick",       "float64"),
+    ("client_oid", "int64"),
+    ("symbol",     "int16"),        # SymbolTable ID
+    ("side",       "int8"),
+])
+
+ORDER_REPORT_V2_DTYPE = _rec64([    # 64B (v1 370B)
+    ("ts",         "int64"),
+    ("client_oid", "int64"),
+    ("order_id",   "int64"),        # 숫자 주문ID (아니면 0)
+    ("price",      "float64"),
+    ("orig_qty",   "float64"),
+    ("exec_qty",   "float64"),
+    ("remain_qty", "float64"),
+    ("symbol",     "int16"),
+    ("status",     "int8"),
+    ("side",       "int8"),
+])
+
+FILL_REPORT_V2_DTYPE = _rec64([     # 64B (v1 354B)
+    ("ts",         "int64"),
+    ("client_oid", "int64"),
+    ("order_id",   "int64"),
+    ("fill_qty",   "float64"),
+    ("fill_price", "float64"),
+    ("symbol",     "int16"),
+    ("side",       "int8"),
+    ("liquidity",  "int8"),
+])
+
+PRIVATE_EXEC_V2_DTYPE = _rec64([    # 128B (v1 258B) — 필드 8B×9 + 플래그라 한 라인에 안 들어감
+    ("ts",         "int64"),
+    ("client_oid", "int64"),
+    ("order_id",   "int64"),
+    ("size",       "float64"),
+    ("acc_fill",   "float64"),
+    ("last_fill",  "float64"),
+    ("last_price", "float64"),
+    ("avg_price",  "float64"),
+    ("recv_ns",    "int64"),
+    ("symbol",     "int16"),
+    ("side",       "int8"),
+    ("status",     "int8"),
+])
+
+# v1 → v2 대응 (전환 기간 변환용)
+V2_OF = {
+    ORDER_FLAG_DTYPE:   ORDER_FLAG_V2_DTYPE,
+    ORDER_REPORT_DTYPE: ORDER_REPORT_V2_DTYPE,
+    FILL_REPORT_DTYPE:  FILL_REPORT_V2_DTYPE,
+    PRIVATE_EXEC_DTYPE: PRIVATE_EXEC_V2_DTYPE,
+}
+V1_OF = {v: k for k, v in V2_OF.items()}
+
+
+def to_v2(recs, symbols: SymbolTable, v2_dtype=None):
+    """
+    v1 레코드(배열/스칼라) → v2 배열. 같은 이름 필드는 복사, symbol/order_id 는 ID 로 변환.
+    무손실만 허용: 테이블에 없는 심볼, 숫자가 아닌 주문ID 는 ValueError (0 으로 뭉개지 않음)
+    → from_v2(to_v2(x, t), t) == x
+    """
+    recs = np.atleast_1d(recs)
+    v2_dtype = v2_dtype or V2_OF[recs.dtype]
+    out = np.zeros(len(recs), dtype=v2_dtype)
+    for f in v2_dtype.names:
+        if f not in recs.dtype.names:
+            continue
+        if f == "symbol":
+            out[f] = [_sym_v2(symbols, x) for x in recs[f]]
+        elif f == "order_id":
+            out[f] = [_oid_v2(x) for x in recs[f]]
+        else:
+            out[f] = recs[f]
+    return out
+
+
+def _sym_v2(symbols: SymbolTable, sym: str) -> int:
+    sid = symbols.id(sym)
+    if sym and not sid:
+        raise ValueError(f"심볼 테이블에 없음: {sym!r}")
+    return sid
+
+
+def _oid_v2(oid: str) -> int:
+    v = order_id_int(oid)
+    if oid and str(v) != oid:
+        raise ValueError(f"int64 로 무손실 변환 불가한 주문ID: {oid!r}")
+    return v
+
+
+def from_v2(recs, symbols: SymbolTable, v1_dtype=None):
+    """v2 배열 → v1 배열 (기존 소비자용). 심볼/주문ID 는 문자열로 복원 (order_id 0 → "")"""
+    recs = np.atleast_1d(recs)
+    v1_dtype = v1_dtype or V1_OF[recs.dtype]
+    out = np.zeros(len(recs), dtype=v1_dtype)
+    for f in v1_dtype.names:
+        if f not in recs.dtype.names:
+            continue
+        if f == "symbol":
+            out[f] = [symbols.name(x) for x in recs[f]]
+        elif f == "order_id":
+            out[f] = [str(x) if x else "" for x in recs[f]]
+        else:
+            out[f] = recs[f]
+    return out
+
+
+# ====== Bitget 선물 ticker: 마크/인덱스/펀딩/미결제약정 (심볼별 seqlock 스냅샷) ======
+TICKER_DTYPE = _rec64([            # 64B
+    ("ts",              "int64"),   # 거래소 ts (ms)
+    ("recv_ns",         "int64"),
+    ("mark_px",         "float64"),
+    ("index_px",        "float64"),
+    ("funding_rate",    "float64"),
+    ("next_funding_ms", "int64"),
+    ("open_interest",   "float64"), # holdingAmount (base 수량)
+    ("symbol",          "int16"),   # SymbolTable ID
+])
+
+
+# ====== 고정 깊이 북: 상위 N 레벨 (N = cfg["depth_levels"]) ======
+# 가격/수량을 레벨 배열로 → 전략에서 레벨 축으로 벡터 연산 (임밸런스, microprice 등)
+# nb/na = 실제 채워진 레벨 수 (나머지는 0), 레코드는 64B 배수
+def depth_dtype(n: int) -> np.dtype:
+    n = int(n)
+    return _rec64([
+        ("ts",      "int64"),
+        ("recv_ns", "int64"),
+        ("nb",      "int16"),
+        ("na",      "int16"),
+        ("bid_px",  "float64", (n,)),
+        ("bid_qty", "float64", (n,)),
+        ("ask_px",  "float64", (n,)),
+        ("ask_qty", "float64", (n,)),
+    ])
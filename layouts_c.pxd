@@ -0,0 +1,189 @@
+# layouts_c.pxd
+# 자동 생성: python gen_layouts_c.py — 직접 수정 금지 (layouts.py 를 고치고 재생성)
+# layouts.py dtype 들의 C struct 미러. 오프셋/크기는 dtype 과 바이트 단위로 같다
+# (numpy 기본 dtype 은 packed, v2 는 정렬+64B 패딩 → _pad 로 재현).
+# <이름>_at(seg1, n1, seg2, i): ShmRing.peek_ptr 두 구간에서 i 번째 레코드
+from libc.stdint cimport int8_t, int16_t, int32_t, int64_t, uint8_t, uint16_t, uint32_t, uint64_t
+
+cdef packed struct trade_t:  # TRADE_DTYPE, 41B
+    int64_t ts
+    double  px
+    double  qty
+    uint8_t sell
+    int64_t tid
+    int64_t recv_ns
+
+cdef packed struct book_t:  # BOOK_DTYPE, 40B
+    int64_t ts
+    double  bbid
+    double  bqty
+    double  bask
+    double  aqty
+
+cdef packed struct order_flag_t:  # ORDER_FLAG_DTYPE, 177B
+    int64_t ts
+    Py_UCS4 symbol[32]
+    int8_t  side
+    double  exec_px
+    double  exit_px
+    double  qty
+    double  tick
+    int64_t client_oid
+
+cdef packed struct order_report_t:  # ORDER_REPORT_DTYPE, 370B
+    int64_t ts
+    int64_t client_oid
+    Py_UCS4 order_id[48]
+    Py_UCS4 symbol[32]
+    int8_t  status
+    double  price
+    double  orig_qty
+    double  exec_qty
+    double  remain_qty
+    int8_t  side
+
+cdef packed struct fill_report_t:  # FILL_REPORT_DTYPE, 354B
+    int64_t ts
+    int64_t client_oid
+    Py_UCS4 order_id[48]
+    Py_UCS4 symbol[32]
+    double  fill_qty
+    double  fill_price
+    int8_t  side
+    int8_t  liquidity
+
+cdef packed struct private_exec_t:  # PRIVATE_EXEC_DTYPE, 258B
+    int64_t ts
+    int64_t client_oid
+    Py_UCS4 order_id[48]
+    int8_t  side
+    int8_t  status
+    double  size
+    double  acc_fill
+    double  last_fill
+    double  last_price
+    double  avg_price
+    int64_t recv_ns
+
+cdef packed struct bg_ws_cmd_t:  # BG_WS_CMD_DTYPE, 230B
+    int64_t ts
+    int8_t  cmd
+    int8_t  side
+    int8_t  order_type
+    int8_t  force
+    int8_t  reduce_only
+    int8_t  trade_side
+    double  qty
+    double  price
+    int64_t client_oid
+    Py_UCS4 order_id[48]
+
+cdef packed struct order_flag_v2_t:  # ORDER_FLAG_V2_DTYPE, 64B
+    int64_t ts
+    double  exec_px
+    double  exit_px
+    double  qty
+    double  tick
+    int64_t client_oid
+    int16_t symbol
+    int8_t  side
+    char    _pad0[13]
+
+cdef packed struct order_report_v2_t:  # ORDER_REPORT_V2_DTYPE, 64B
+    int64_t ts
+    int64_t client_oid
+    int64_t order_id
+    double  price
+    double  orig_qty
+    double  exec_qty
+    double  remain_qty
+    int16_t symbol
+    int8_t  status
+    int8_t  side
+    char    _pad0[4]
+
+cdef packed struct fill_report_v2_t:  # FILL_REPORT_V2_DTYPE, 64B
+    int64_t ts
+    int64_t client_oid
+    int64_t order_id
+    double  fill_qty
+    double  fill_price
+    int16_t symbol
+    int8_t  side
+    int8_t  liquidity
+    char    _pad0[20]
+
+cdef packed struct private_exec_v2_t:  # PRIVATE_EXEC_V2_DTYPE, 128B
+    int64_t ts
+    int64_t client_oid
+    int64_t order_id
+    double  size
+    double  acc_fill
+    double  last_fill
+    double  last_price
+    double  avg_price
+    int64_t recv_ns
+    int16_t symbol
+    int8_t  side
+    int8_t  status
+    char    _pad0[52]
+
+cdef packed struct ticker_t:  # TICKER_DTYPE, 64B
+    int64_t ts
+    int64_t recv_ns
+    double  mark_px
+    double  index_px
+    double  funding_rate
+    int64_t next_funding_ms
+    double  open_interest
+    int16_t symbol
+    char    _pad0[6]
+
+
+cdef inline const trade_t* trade_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const trade_t*>seg1 + i if i < n1 else <const trade_t*>seg2 + (i - n1)
+
+cdef inline const book_t* book_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const book_t*>seg1 + i if i < n1 else <const book_t*>seg2 + (i - n1)
+
+cdef inline const order_flag_t* order_flag_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const order_flag_t*>seg1 + i if i < n1 else <const order_flag_t*>seg2 + (i - n1)
+
+cdef inline const order_report_t* order_report_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const order_report_t*>seg1 + i if i < n1 else <const order_report_t*>seg2 + (i - n1)
+
+cdef inline const fill_report_t* fill_report_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const fill_report_t*>seg1 + i if i < n1 else <const fill_report_t*>seg2 + (i - n1)
+
+cdef inline const private_exec_t* private_exec_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const private_exec_t*>seg1 + i if i < n1 else <const private_exec_t*>seg2 + (i - n1)
+
+cdef inline const bg_ws_cmd_t* bg_ws_cmd_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const bg_ws_cmd_t*>seg1 + i if i < n1 else <const bg_ws_cmd_t*>seg2 + (i - n1)
+
+cdef inline const order_flag_v2_t* order_flag_v2_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const order_flag_v2_t*>seg1 + i if i < n1 else <const order_flag_v2_t*>seg2 + (i - n1)
+
+cdef inline const order_report_v2_t* order_report_v2_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const order_report_v2_t*>seg1 + i if i < n1 else <const order_report_v2_t*>seg2 + (i - n1)
+
+cdef inline const fill_report_v2_t* fill_report_v2_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const fill_report_v2_t*>seg1 + i if i < n1 else <const fill_report_v2_t*>seg2 + (i - n1)
+
+cdef inline const private_exec_v2_t* private_exec_v2_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const private_exec_v2_t*>seg1 + i if i < n1 else <const private_exec_v2_t*>seg2 + (i - n1)
+
+cdef inline const ticker_t* ticker_at(const void* seg1, Py_ssize_t n1,
+                                 const void* seg2, Py_ssize_t i) noexcept nogil:
+    return <const ticker_t*>seg1 + i if i < n1 else <const ticker_t*>seg2 + (i - n1)
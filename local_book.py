@@ -0,0 +1,118 @@
+# local_book.py
+# Binance diff depth (<symbol>@depth@100ms) + REST /api/v3/depth 스냅샷으로 유지하는 로컬 L2 북
+#   1) 스트림을 먼저 열고 이벤트를 버퍼링
+#   2) REST 스냅샷(lastUpdateId) 적용, u <= lastUpdateId 인 이벤트는 버림
+#   3) 첫 이벤트는 U <= lastUpdateId+1 <= u, 이후 U == 직전 u + 1 (아니면 gap → 재동기)
+import numpy as np
+
+
+class LocalBook:
+    """
+    배열 기반 가격 레벨 (측마다 정렬된 key/qty 배열 + 개수)
+      asks: key = px  (오름차순, [0] = best ask)
+      bids: key = -px (오름차순, [0] = best bid)
+    업데이트는 searchsorted + 슬라이스 이동(memmove) 으로 제자리 삽입/삭제 — dict 재구성/정렬 없음.
+    """
+
+    def __init__(self, cap: int = 4096):
+        cap = int(cap)
+        self.bk = np.zeros(cap, np.float64); self.bq = np.zeros(cap, np.float64); self.nb = 0
+        self.ak = np.zeros(cap, np.float64); self.aq = np.zeros(cap, np.float64); self.na = 0
+        self.last_id = 0        # 마지막으로 적용한 updateId (u)
+        self.synced = False
+
+    # ---------- 내부: 한 측 배열 ----------
+    @staticmethod
+    def _grow(k, q):
+        k2 = np.zeros(len(k) * 2, np.float64); k2[:len(k)] = k
+        q2 = np.zeros(len(q) * 2, np.float64); q2[:len(q)] = q
+        return k2, q2
+
+    def _set(self, side: int, key: float, qty: float):
+        if side:
+            k, q, n = self.ak, self.aq, self.na
+        else:
+            k, q, n = self.bk, self.bq, self.nb
+        i = int(np.searchsorted(k[:n], key))
+        if i < n and k[i] == key:
+            if qty == 0.0:                  # 삭제
+                k[i:n-1] = k[i+1:n]; q[i:n-1] = q[i+1:n]
+                n -= 1
+            else:
+                q[i] = qty
+        elif qty != 0.0:                    # 삽입 (없는 레벨의 qty=0 은 무시)
+            if n == len(k):
+                k, q = self._grow(k, q)
+            k[i+1:n+1] = k[i:n]; q[i+1:n+1] = q[i:n]
+            k[i] = key; q[i] = qty
+            n += 1
+        if side:
+            self.ak, self.aq, self.na = k, q, n
+        else:
+            self.bk, self.bq, self.nb = k, q, n
+
+    def _apply(self, bids, asks):
+        for p, s in bids:
+            self._set(0, -float(p), float(s))
+        for p, s in asks:
+            self._set(1, float(p), float(s))
+
+    # ---------- 동기화 ----------
+    def load_snapshot(self, snap: dict):
+        """REST depth 응답으로 북 초기화 (레벨은 이미 정렬되어 옴)"""
+        b = np.asarray(snap.get("bids") or [], dtype=np.float64).reshape(-1, 2)
+        a = np.asarray(snap.get("asks") or [], dtype=np.float64).reshape(-1, 2)
+        b = b[b[:, 1] > 0]; a = a[a[:, 1] > 0]
+        b = b[np.argsort(-b[:, 0], kind="stable")]
+        a = a[np.argsort(a[:, 0], kind="stable")]
+        while len(self.bk) < len(b): self.bk, self.bq = self._grow(self.bk, self.bq)
+        while len(self.ak) < len(a): self.ak, self.aq = self._grow(self.ak, self.aq)
+        self.nb = len(b); self.bk[:self.nb] = -b[:, 0]; self.bq[:self.nb] = b[:, 1]
+        self.na = len(a); self.ak[:self.na] = a[:, 0]; self.aq[:self.na] = a[:, 1]
+        self.last_id = int(snap["lastUpdateId"])
+        self.synced = False         # 첫 브리지 이벤트를 받아야 synced
+
+    def apply_diff(self, ev: dict) -> int:
+        """
+        depthUpdate 이벤트 적용
+        return: 1 적용, 0 스냅샷보다 오래됨(버림), -1 gap (재동기 필요)
+        """
+        U = int(ev["U"]); u = int(ev["u"])
+        if u <= self.last_id:
+            return 0
+        if self.synced:
+            if U != self.last_id + 1:
+                return -1
+        elif not (U <= self.last_id + 1 <= u):
+            return -1
+        self._apply(ev.get("b") or (), ev.get("a") or ())
+        self.last_id = u
+        self.synced = True
+        return 1
+
+    def reset(self):
+        self.nb = self.na = 0
+        self.last_id = 0
+        self.synced = False
+
+    # ---------- 조회 / 발행 ----------
+    def best(self):
+        """(best bid, best ask) — 비어 있으면 0.0"""
+        return (-self.bk[0] if self.nb else 0.0, self.ak[0] if self.na else 0.0)
+
+    def crossed(self) -> bool:
+        return self.nb > 0 and self.na > 0 and -self.bk[0] >= self.ak[0]
+
+    def write_depth(self, arr, i: int, ts: int, recv_ns: int = 0):
+        """상위 N 레벨을 depth_dtype 배열 arr[i] 에 제자리 기록 (부족한 레벨은 0)"""
+        rec = arr[i:i+1]
+        n = arr.dtype["bid_px"].shape[0]
+        nb = min(n, self.nb); na = min(n, self.na)
+        rec["ts"] = ts
+        rec["recv_ns"] = recv_ns
+        rec["nb"] = nb
+        rec["na"] = na
+        bp = rec["bid_px"][0]; bq = rec["bid_qty"][0]
+        ap = rec["ask_px"][0]; aq = rec["ask_qty"][0]
+        np.negative(self.bk[:nb], out=bp[:nb]); bq[:nb] = self.bq[:nb]; bp[nb:] = 0.0; bq[nb:] = 0.0
+        ap[:na] = self.ak[:na]; aq[:na] = self.aq[:na]; ap[na:] = 0.0; aq[na:] = 0.0
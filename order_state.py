@@ -0,0 +1,166 @@
+# order_state.py
+# Bitget private orders + fill 채널 → 주문별 정규화 이벤트 (PRIVATE_EXEC_DTYPE 필드 순서 tuple)
+#   - 상태는 단조: new → partially_filled → 종결(filled/canceled/rejected/expired), 역행/종결 후 변경 무시
+#   - fill 은 tradeId 로 중복 제거 (재연결/재구독으로 같은 체결이 다시 와도 1번만)
+#   - 누적 체결은 거래소 문자열을 Decimal 로 더해 정확하게 (float 누적 오차 없음)
+#   - 두 채널 중 먼저 온 쪽이 체결분을 반영하고 늦게 온 쪽은 이미 반영된 만큼 건너뜀
+#     → 이벤트의 acc_fill 은 정확한 누적, last_fill 은 이번 이벤트에서 새로 늘어난 양 (상태만 바뀌면 0)
+from collections import deque, OrderedDict
+from decimal import Decimal
+
+# PRIVATE_EXEC_DTYPE.status 코드
+S_NEW, S_FILLED, S_PART, S_CANCELED, S_REJECTED, S_EXPIRED = range(6)
+_RANK = {S_NEW: 0, S_PART: 1, S_FILLED: 2, S_CANCELED: 2, S_REJECTED: 2, S_EXPIRED: 2}
+
+_ZERO = Decimal(0)
+
+
+def status_code(s: str) -> int:
+    s = (s or "").lower()
+    if s in ("live", "new", "open", "created", "accepted"): return S_NEW
+    if s in ("filled", "done"): return S_FILLED
+    if s in ("partially_filled", "partial-fill", "part"): return S_PART
+    if s in ("canceled", "cancelled"): return S_CANCELED
+    if s in ("rejected", "reject"): return S_REJECTED
+    if s in ("expired", "ioc_exhaust"): return S_EXPIRED
+    return S_NEW
+
+
+def side_code(s: str) -> int:
+    s = (s or "").lower()
+    if s == "buy": return +1
+    if s == "sell": return -1
+    return 0
+
+
+def _dec(x) -> Decimal:
+    try:
+        return Decimal(str(x)) if x not in (None, "") else _ZERO
+    except ArithmeticError:
+        return _ZERO
+
+
+class _Order:
+    __slots__ = ("coid", "order_id", "side", "size", "status", "acc", "fill_sum", "notional",
+                 "avg", "trades", "known")
+
+    def __init__(self, order_id: str):
+        self.order_id = order_id
+        self.coid = 0
+        self.side = 0
+        self.size = _ZERO
+        self.status = S_NEW
+        self.acc = _ZERO        # 이벤트로 내보낸 누적 체결
+        self.fill_sum = _ZERO   # fill 채널에서 본 체결 합 (tradeId 중복 제거 후)
+        self.notional = _ZERO   # fill 채널 체결 금액 합 (평균가 fallback)
+        self.avg = 0.0
+        self.trades = set()
+        self.known = False      # orders 채널로 clientOid 를 받았는지
+
+
+class OrderStateNormalizer:
+    """
+    orders 행은 on_order, fill 행은 on_fill → 바뀐 게 있으면 이벤트 tuple, 없으면 None.
+    fill 채널에는 clientOid 가 없으므로 같은 orderId 의 orders 행이 한 번 올 때까지
+    체결분은 쌓아만 두고, orders 행이 오면 밀린 체결을 한 이벤트로 내보낸다.
+    종결된 주문은 최근 keep 개만 남겨 늦게 온 중복 메시지를 걸러낸다.
+    종결되지 않는 주문(상태 메시지 유실)이나 fill 만 온 주문도 있으므로 전체는 max_orders 개
+    LRU 로 제한 — 가장 오래 소식 없는 주문부터 버린다 (그 뒤에 오는 행은 새 주문처럼 처리).
+    """
+
+    def __init__(self, keep: int = 4096, max_orders: int = 16384):
+        self.orders = OrderedDict()     # orderId -> _Order (마지막으로 본 순서, 오래된 것이 앞)
+        self.done = deque()             # 종결 순서 (오래된 것부터 버림)
+        self.keep = int(keep)
+        self.max_orders = max(int(max_orders), self.keep)
+
+    def _get(self, order_id: str) -> _Order:
+        orders = self.orders
+        o = orders.get(order_id)
+        if o is None:
+            o = orders[order_id] = _Order(order_id)
+            if len(orders) > self.max_orders:
+                orders.popitem(last=False)
+        else:
+            orders.move_to_end(order_id)
+        return o
+
+    def _set_status(self, o: _Order, status: int) -> bool:
+        """앞으로만 (new → part → 종결). 역행, 같은 단계, 종결 후 변경은 무시"""
+        if _RANK[status] <= _RANK[o.status]:
+            return False
+        o.status = status
+        if _RANK[status] == 2:
+            self.done.append(o.order_id)
+            if len(self.done) > self.keep:
+                self.orders.pop(self.done.popleft(), None)
+        return True
+
+    def _event(self, o: _Order, ts: int, last_fill: Decimal, last_px: float, recv_ns: int):
+        # 필드 순서 = PRIVATE_EXEC_DTYPE
+        return (ts, o.coid, o.order_id, o.side, o.status, float(o.size),
+                float(o.acc), float(last_fill), last_px, o.avg, recv_ns)
+
+    def _advance(self, o: _Order, acc: Decimal) -> Decimal:
+        """누적을 acc 까지 올림 → 새로 늘어난 양 (이미 반영된 만큼은 0)"""
+        if acc <= o.acc:
+            return _ZERO
+        delta = acc - o.acc
+        o.acc = acc
+        if o.size and o.acc >= o.size:
+            self._set_status(o, S_FILLED)
+        elif o.status == S_NEW:
+            self._set_status(o, S_PART)
+        return delta
+
+    def on_order(self, d: dict, ts: int, recv_ns: int):
+        order_id = str(d.get("orderId") or "")
+        if not order_id:
+            return None
+        o = self._get(order_id)
+        first = not o.known         # 첫 orders 행 = 주문 접수 이벤트
+        if first:
+            try:
+                o.coid = int(d.get("clientOId") or d.get("clientOid") or 0)
+            except ValueError:
+                o.coid = 0
+            o.side = side_code(d.get("side"))
+            o.size = _dec(d.get("size"))
+            o.known = True
+        prev = o.status
+        # 누적: orders 의 accBaseVolume 과 이미 받은 fill 합 중 큰 쪽 (밀린 fill 포함)
+        delta = self._advance(o, max(_dec(d.get("accBaseVolume")), o.fill_sum))
+        avg = float(d.get("priceAvg") or 0)
+        if avg:
+            o.avg = avg
+        elif o.fill_sum and o.fill_sum >= o.acc:
+            o.avg = float(o.notional / o.fill_sum)
+        self._set_status(o, status_code(d.get("status")))
+        if not delta and o.status == prev and not first:
+            return None
+        last_px = (float(d.get("fillPrice") or 0) or o.avg) if delta else 0.0
+        return self._event(o, ts, delta, last_px, recv_ns)
+
+    def on_fill(self, d: dict, ts: int, recv_ns: int):
+        order_id = str(d.get("orderId") or "")
+        tid = str(d.get("tradeId") or "")
+        if not order_id:
+            return None
+        o = self._get(order_id)
+        if tid:
+            if tid in o.trades:
+                return None
+            o.trades.add(tid)
+        q = _dec(d.get("baseVolume"))
+        px = _dec(d.get("price") or d.get("fillPrice"))
+        o.fill_sum += q
+        o.notional += q * px
+        if not o.side:
+            o.side = side_code(d.get("side"))
+        if not o.known:
+            return None             # clientOid 를 모름 → orders 행이 오면 같이 나감
+        delta = self._advance(o, o.fill_sum)
+        if not delta:
+            return None             # orders 채널이 이미 반영
+        o.avg = float(o.notional / o.fill_sum)
+        return self._event(o, ts, delta, float(px), recv_ns)
@@ -1,32 +1,42 @@
 # ordersystem.pyx
 # cython: language_level=3
 # cython: boundscheck=False, wraparound=False, cdivision=True, nonecheck=False
-import time, json, threading, hmac, base64, hashlib
+import time, threading, hmac, base64, hashlib
+from collections import deque
 cimport cython
+from libc.string cimport memset
 import numpy as np
-from websocket import WebSocketApp
-
-from shm_ring import ShmRing
-from layouts import ORDER_FLAG_DTYPE, ORDER_REPORT_DTYPE, FILL_REPORT_DTYPE, PRIVATE_EXEC_DTYPE
+from bitget_ws_loop import BitgetLoop
+from bitget.v2.mix.order_api import OrderApi
+from order_state import status_code, side_code, S_FILLED
+
+from shm_ring_fast cimport ShmRing
+from shm_wakeup import wait_readable
+from shm_registry import attach_ring
+from layouts_c cimport (order_flag_t, private_exec_t, order_report_v2_t, fill_report_v2_t,
+                        order_flag_at, private_exec_at)
+from layouts import (ORDER_FLAG_DTYPE, ORDER_REPORT_V2_DTYPE, FILL_REPORT_V2_DTYPE, PRIVATE_EXEC_DTYPE,
+                     symbol_table, order_id_int)
 
 cdef inline long long _now_ms(): return <long long>(time.time()*1000)
 
 
-cdef inline long long _to_ms():
-    return <long long>(time.time()*1000)
-
 cdef class Ordersystem:
     cdef dict cfg
     cdef str  symbol, inst_type, margin_mode, margin_coin
-    cdef object r_flags, r_exec, r_orpt, r_frpt
+    cdef short symbol_id        # OR/FL v2 레코드의 심볼 ID (layouts.SymbolTable)
+    cdef ShmRing r_flags, r_exec, r_orpt, r_frpt
     cdef dict orders
     cdef long long seq
     cdef bint running
+    cdef int spin               # 입력 링이 비었을 때 polling 횟수
+    cdef double block_s         # 그 후 doorbell block 상한
+    cdef object _recon          # 체결 대사(REST detail) 결과 → 메인 루프에서 반영
+    cdef bint   _recon_busy
 
     # WS 송신 전용
-    cdef object _ws              # WebSocketApp
-    cdef object _ws_lock         # send 보호용
-    cdef bint   _ws_live
+    cdef object _ws_loop         # BitgetLoop (핑/퐁/재연결, 데몬 스레드 1개)
+    cdef object _ws              # BgConn
     cdef str    _api_key, _api_secret, _api_pass
     cdef int _ws_authed
     def __init__(self, dict cfg):
@@ -35,17 +45,25 @@ cdef class Ordersystem:
         self.inst_type  = <str>cfg.get("bitget_product_type","USDT-FUTURES")
         self.margin_mode= <str>cfg.get("bitget_margin_mode","crossed")
         self.margin_coin= (<str>cfg.get("bitget_margin_coin","USDT")).upper()
+        self.symbol_id  = symbol_table(cfg).id(self.symbol)
+
+        # 링은 디렉터리(cfg["ring_dir"])에서 논리 이름으로 attach
+        self.r_flags = attach_ring(cfg, cfg.get("of_ring","OF"), ORDER_FLAG_DTYPE, cls=ShmRing)
+        self.r_exec  = attach_ring(cfg, cfg.get("bg_priv_ring","BGPRV"), PRIVATE_EXEC_DTYPE, cls=ShmRing)
+        # 리포트 링은 v2 (64B, 심볼/주문ID 정수) — v1 이 필요한 소비자는 layouts.from_v2
+        self.r_orpt  = attach_ring(cfg, cfg.get("or_ring","OR"), ORDER_REPORT_V2_DTYPE, producer=True, cls=ShmRing)
+        self.r_frpt  = attach_ring(cfg, cfg.get("fl_ring","FL"), FILL_REPORT_V2_DTYPE, producer=True, cls=ShmRing)
 
-        self.r_flags = ShmRing(cfg.get("of_ring","RING_ORDER_FLAGS"), ORDER_FLAG_DTYPE, cfg.get("of_capacity",2048), create=False)
-        self.r_exec  = ShmRing(cfg.get("bg_priv_ring","RING_BG_PRIV"), PRIVATE_EXEC_DTYPE, cfg.get("bg_priv_capacity",8192), create=False)
-        self.r_orpt  = ShmRing(cfg.get("or_ring","RING_ORDER_REPORT"), ORDER_REPORT_DTYPE, cfg.get("or_capacity",4096), create=False)
-        self.r_frpt  = ShmRing(cfg.get("fl_ring","RING_FILL_REPORT"),  FILL_REPORT_DTYPE,  cfg.get("fl_capacity",8192), create=False)
 
+        self.spin    = int(cfg.get("order_spin", 2000))
+        self.block_s = float(cfg.get("order_block_s", 0.05))
 
         self.orders = {}
         self.seq = (_now_ms() & 0x7fffffff)
         self.running = False
         self._ws_authed = False
+        self._recon = deque()
+        self._recon_busy = False
 
        
         #self._api_key    = <str>cfg.get("BITGET_API_KEY","")
@@ -53,9 +71,8 @@ cdef class Ordersystem:
         self._api_key    = ""
         self._api_secret = ""
         self._api_pass   = ""
+        self._ws_loop = None
         self._ws = None
-        self._ws_lock = threading.Lock()
-        self._ws_live = False
 
     cdef long long _oid(self):
         self.seq += 1
@@ -74,12 +91,10 @@ cdef class Ordersystem:
         return sig
 
     cdef void _ws_send_json(self, obj):
-        # websocket-client는 스레드 세이프 아님 → send 보호
+        # BgConn.send 는 송신 락을 잡음 (루프 스레드의 ping 과 겹쳐도 안전), 끊겨 있으면 버림
         try:
-            msg = json.dumps(obj)
-            with self._ws_lock:
-                if self._ws is not None and self._ws_live:
-                    self._ws.send(msg)
+            if self._ws is not None:
+                self._ws.send_json(obj)
 
         except Exception as e:
             print(e)
@@ -134,171 +149,94 @@ cdef class Ordersystem:
         }]}
         self._ws_send_json(pkt)
 
-    # ===== WS 스레드 (재연결 + ping/pong) =====
-    cdef object _mk_backoff(self):
-        def _backoff_gen():
-            t = 0.5
-            while True:
-                yield t
-                t = t*2 if t < 12 else 12
-        return _backoff_gen()
+    # ===== WS 연결 (핑/퐁/재연결은 BitgetLoop 스레드 하나) =====
+    cdef void _ws_on_open(self, conn):
+        # 로그인
+        self._ws_authed = False
+        self._ws_login()
+
+    cdef void _ws_on_message(self, conn, dict data):
+        print(data)
+        evt = data.get("event")
+        if evt == "login":
+            code = str(data.get("code",""))
+            # Bitget 성공코드: "0" 또는 "00000"
+            self._ws_authed = (code in ("0","00000"))
+            if not self._ws_authed:
+                print("WS LOGIN FAILED:", data)
+            return
+        # 기타 메세지는 무시(주로 trade 응답, 에러 등)
 
-    cdef void _ws_thread_main(self):
+    cdef void _ensure_ws(self):
         #cdef str url = "wss://ws.bitget.com/v2/ws/private"
         cdef str url = "wss://wspap.bitget.com/v2/ws/private"
-
-        HEARTBEAT_INTERVAL = 10    # app ping
-        HEARTBEAT_TIMEOUT  = 60    # ms 기준 환산은 아래에서
-        CONTROL_PING_INT   = 10    # control frame ping
-
-        # 가변 컨테이너들 (클로저에서 nonlocal 대체)
-        bo_holder   = {"bo": self._mk_backoff()}
-        last_pong   = {"ts": _to_ms()}   # 앱 레벨 pong 시각
-        alive_flag  = {"alive": True}    # 스레드 생존 제어
-
-        while self.running:
-            self._ws_live = False
-
-            def reset_backoff():
-                bo_holder["bo"] = self._mk_backoff()
-
-            def on_open(ws):
-
-
-
-                # app-level ping loop ("ping" 문자열 송신 + pong 타임아웃 관리)
-                def app_ping_loop():
-                    while self.running and self._ws_live:
-                        try:
-                            if self._ws and getattr(self._ws, "sock", None) and self._ws.sock.connected:
-                                # 문자열 ping
-                                with self._ws_lock:
-                                    if self._ws_live:
-                                        self._ws.send("ping")
-                            else:
-                                break
-                        except Exception:
-                            break
-
-                        # pong 타임아웃 → 연결 닫아서 재연결 유도
-                        if (_to_ms() - <long long>last_pong["ts"]) > <long long>(HEARTBEAT_TIMEOUT*1000):
-                            try:
-                                self._ws.close()
-                            except Exception:
-                                pass
-                            break
-                        time.sleep(HEARTBEAT_INTERVAL)
-                # 로그인
-                self._ws_authed = False
-                self._ws = ws
-                self._ws_live = True
-                last_pong["ts"] = _to_ms()
-                reset_backoff()
-                threading.Thread(target=app_ping_loop,  daemon=True).start()
-                time.sleep(0.1)
-                self._ws_login()
-
-
-            def on_message(ws, message):
-                # 문자열 pong
-
-                print(message)
-                if message == "pong":
-                    last_pong["ts"] = _to_ms()
-                    return
-                # JSON
-                try:
-                    data = json.loads(message)
-                except Exception:
-                    return
-                if isinstance(data, dict):
-                    evt = data.get("event")
-                    if evt == "login":
-                        code = str(data.get("code",""))
-                        # Bitget 성공코드: "0" 또는 "00000"
-                        self._ws_authed = (code in ("0","00000"))
-                        if not self._ws_authed:
-                            print("WS LOGIN FAILED:", data)
-                        return
-                    if evt == "error":
-                        return
-                    elif evt == "pong":
-                        last_pong["ts"] = _to_ms()
-                        return
-                    # login 이벤트는 송신 전용이므로 통과
-                    # 필요 시 에러 로깅 등 확장 가능
-                # 기타 메세지는 무시(주로 trade 응답, 에러 등)
-            def on_error(ws, err):
-                self._ws_live = False
-
-            def on_close(ws, *a):
-                self._ws_live = False
-
-            ws = WebSocketApp(url, on_open=on_open, on_message=on_message,
-                              on_error=on_error, on_close=on_close)
-            try:
-                ws.run_forever(ping_interval=0, ping_timeout=None)
-            except Exception:
-                pass
-
-            if not self.running:
-                break
-
-            # 끊김 → 백오프 후 재시도
-            try:
-                dt = next(bo_holder["bo"])
-            except Exception:
-                dt = 1.0
-            time.sleep(dt)
-
-        # 종료 시 플래그 정리
-        self._ws_live = False
-
-    cdef void _ensure_ws(self):
-        # 연결 없거나 죽었으면 WS 송신 스레드 보장
-        if (self._ws is None) or (not self._ws_live):
-            t = threading.Thread(target=self._ws_thread_main, daemon=True)
-            t.start()
-            # 로그인/오픈 약간의 유예
-            time.sleep(0.05)
+        if self._ws_loop is not None:
+            return
+        self._ws_loop = BitgetLoop(ping_s=float(self.cfg.get("bg_ping_s", 25)),
+                                   pong_timeout_s=float(self.cfg.get("bg_pong_timeout_s", 60)))
+        self._ws = self._ws_loop.add(
+            url,
+            on_open=lambda conn: self._ws_on_open(conn),
+            on_message=lambda conn, msg, recv_ns: self._ws_on_message(conn, msg))
+        self._ws_loop.start()
 
     # ===== 메인 루프 =====
     cpdef void start(self):
+        cdef Py_ssize_t BATCH = 1024
+        cdef Py_ssize_t i, n, n1, got
+        cdef const void* p1
+        cdef const void* p2
+        cdef const order_flag_t* flags
+        cdef const private_exec_t* e
         self.running = True
         self._ensure_ws()
-        BATCH=1024
         while self.running:
             # 1) 전략 → 주문플래그 수신 → WS place (post_only maker)
-            chunk = self.r_flags.pop_many(BATCH)
-            if chunk is not None:
-                for rec in chunk: self._on_flag(rec)
+            #    peek_ptr: 랩어라운드 두 구간을 한 번에, 처리 끝난 뒤 commit
+            with nogil:
+                n = self.r_flags.peek_ptr(&p1, &n1, &p2, BATCH)
+            got = n
+            for i in range(n):
+                flags = order_flag_at(p1, n1, p2, i)
+                self._on_flag(flags)
+            self.r_flags.commit_n(n)
 
             # 2) Private WS orders/fill 이벤트 소비
-            execs = self.r_exec.pop_many(BATCH)
-            if execs is not None:
-                for e in execs:
-                    print("실행되는주문 :",e)
-                    self._on_exec(e)
+            with nogil:
+                n = self.r_exec.peek_ptr(&p1, &n1, &p2, BATCH)
+            got += n
+            for i in range(n):
+                e = private_exec_at(p1, n1, p2, i)
+                print("실행되는주문 :", e.client_oid, e.status, e.acc_fill, e.last_fill)
+                self._on_exec(e)
+            self.r_exec.commit_n(n)
+            if self.r_exec.gap:
+                # 체결/주문 이벤트 유실 → 살아있는 주문을 REST 로 대사
+                print("[order] exec 링 gap=%d → 체결 대사" % self.r_exec.gap)
+                self._start_reconcile()
+            if self._recon:
+                self._drain_reconcile()
 
             # 3) 타임아웃 스캔
             self._scan_timeouts()
-            time.sleep(0.00001)
+
+            # 4) 두 입력 링 모두 비었으면 spin → doorbell block (두 링이 같은 doorbell 공유)
+            if got == 0:
+                wait_readable((self.r_flags, self.r_exec), self.spin, self.block_s)
 
     cpdef void stop(self):
         self.running = False
-        # run_forever는 내부에서 빠져나오고 _ws_live False로 정리됨
-        try:
-            if self._ws is not None:
-                self._ws.close()
-        except Exception:
-            pass
-
-    cdef void _on_flag(self, rec):
-        cdef long long coid = int(rec["client_oid"]) or self._oid()
-        cdef int side = int(rec["side"])
-        cdef double qty = float(rec["qty"])
-        cdef double exec_px = float(rec["exec_px"])
-        cdef double exit_px = float(rec["exit_px"])
+        # 루프 스레드가 연결을 닫고 빠져나옴
+        if self._ws_loop is not None:
+            self._ws_loop.stop()
+            self._ws_loop = None
+
+    cdef void _on_flag(self, const order_flag_t* rec):
+        cdef long long coid = rec.client_oid if rec.client_oid != 0 else self._oid()
+        cdef int side = rec.side
+        cdef double qty = rec.qty
+        cdef double exec_px = rec.exec_px
+        cdef double exit_px = rec.exit_px
 
         try:
             # place: limit + post_only (maker)
@@ -318,15 +256,15 @@ cdef class Ordersystem:
             print("[ERROR] _on_flag :  ",e)
 
 
-    cdef void _on_exec(self, e):
-        cdef long long coid = int(e["client_oid"]) #프로그램에서 나간 주문만 처리한다.
+    cdef void _on_exec(self, const private_exec_t* e):
+        cdef long long coid = e.client_oid #프로그램에서 나간 주문만 처리한다.
         try:
             st = self.orders.get(coid)
 
             # --- 반대(coid-5000) 체결 감지: 던진 수익주문의 체결 완료 체크 ---
             if st is None:
                 dt = self.orders.get(coid - 5000)
-                if dt is not None:
+                if dt is not None and e.status == S_FILLED:
                     # 내가 보낸 반대주문(coid-5000 규칙)과 일치하고 아직 미완이면 완료 처리
                     if dt.get('opp_sent_coid') == coid and dt.get('done', False) is False:
                         dt["done"] = True
@@ -334,40 +272,22 @@ cdef class Ordersystem:
                         print("반대주문체결완료")
                 return  # 원 주문(coid) 기록이 없으면 여기서 종료
 
-            # --- 공통 필드 파싱 ---
-            side     = int(e["side"])
-            status   = int(e["status"])
-            acc      = float(e.get("acc_fill", 0.0))
-            last_sz  = float(e.get("last_fill", 0.0))
-            last_px  = float(e.get("last_price", 0.0))
-            avg      = float(e.get("avg_price", 0.0))
-            size0    = float(e.get("size", 0.0))
-
-            # --- 스냅샷/상태 업데이트만 반영(orders 채널에 해당) ---
-            # 힌트: fill 메시지는 last_fill>0, orders 메시지는 last_fill==0 로 구분 가능
-            # 단, 어떤 거래소는 fill에도 acc만 주는 경우가 있어 Δ 로직이 더 안전.
-            prev_acc = float(st.get("acc_fill_prev", 0.0))
-            delta    = acc - prev_acc
-
-            # 상태/평균가/누적갱신은 항상 반영
-            st["avg"] = avg
-            st["acc_fill_prev"] = acc
-            # 필요하면 상태코드 기반으로 내부 상태도 업데이트
-            # st["status_code"] = status
-
-            # --- 트리거 조건: '누적 체결 증가(Δ>0)'일 때만 ---
-            if delta <= 0.0:
+            # 이벤트는 정규화됨 (order_state): 상태 단조, acc_fill = 정확한 누적,
+            # last_fill = 이번 이벤트로 새로 체결된 양 (상태만 바뀐 이벤트는 0) → 여기서 Δ 재계산 없음
+            st["avg"] = e.avg_price
+            st["status"] = e.status
+
+            # --- 트리거 조건: 새 체결이 있을 때만 ---
+            if e.last_fill <= 0.0:
                 return
 
-            # 여기서부터는 실제 "새 체결"로 간주
             # first_fill 마킹
             if st.get('first_fill_ms', 0) == 0:
                 st["first_fill_ms"] = _now_ms()
 
-            # Δ만큼 채워졌다고 보고 누적
-            st["filled_qty"] = st.get("filled_qty", 0.0) + delta
+            st["filled_qty"] = e.acc_fill
 
-            print("수익주문준비완료 (coid=%d, delta=%.4f, acc=%.4f)" % (coid, delta, acc))
+            print("수익주문준비완료 (coid=%d, delta=%.4f, acc=%.4f)" % (coid, e.last_fill, e.acc_fill))
 
             # --- idempotent 게이트: opp_sent=False 에서만 1회 발사 ---
             if (st.get('done') is False) and (st.get('opp_sent') is not True):
@@ -417,15 +337,86 @@ cdef class Ordersystem:
                                 print(e)
                         self.orders.get(coid)["done"]=True
 
+    # ===== 체결 대사 (exec 링 gap 시) =====
+    cdef void _start_reconcile(self):
+        # REST 조회는 느리므로 별도 스레드, 결과는 _recon 에 쌓고 메인 루프가 반영
+        if self._recon_busy:
+            return
+        coids = []
+        for coid, st in self.orders.items():
+            if st.get("done"): continue
+            coids.append(coid)
+            if st.get("opp_sent"):
+                coids.append(st["opp_sent_coid"])
+        if not coids:
+            return
+        self._recon_busy = True
+        api = OrderApi(self._api_key, self._api_secret, self._api_pass)
+        params = {"symbol": self.symbol, "productType": self.inst_type}
+
+        def _run():
+            try:
+                for c in coids:
+                    try:
+                        res = api.detail(dict(params, clientOid=str(c)))
+                        d = res.get("data") if isinstance(res, dict) else None
+                        if d:
+                            self._recon.append(d)
+                    except Exception as ex:
+                        print("[order] 대사 조회 실패:", c, ex)
+            finally:
+                self._recon_busy = False
+        threading.Thread(target=_run, daemon=True).start()
+
+    cdef void _drain_reconcile(self):
+        # REST 주문 상세 → private_exec_t 로 바꿔 WS 이벤트와 같은 경로(_on_exec)로 반영.
+        # REST 는 누적만 주므로 last_fill 은 이미 반영한 filled_qty 대비 증가분 (이미 본 체결은 0).
+        cdef private_exec_t ev
+        while self._recon:
+            d = self._recon.popleft()
+            try:
+                coid = int(d.get("clientOid") or 0)
+            except ValueError:
+                continue
+            status = status_code(d.get("state") or d.get("status"))
+            # 반대주문은 _on_exec 가 이벤트만 보고 완료 처리하므로 체결 완료일 때만
+            if coid not in self.orders and status != S_FILLED:
+                continue
+            memset(&ev, 0, sizeof(ev))
+            ev.ts = _now_ms()
+            ev.recv_ns = time.time_ns()
+            ev.client_oid = coid
+            ev.side = side_code(d.get("side"))
+            ev.status = status
+            ev.size = float(d.get("size") or 0)
+            ev.acc_fill = float(d.get("baseVolume") or 0)
+            st = self.orders.get(coid)
+            ev.last_fill = ev.acc_fill - (st.get("filled_qty", 0.0) if st is not None else 0.0)
+            if ev.last_fill < 0.0:
+                ev.last_fill = 0.0
+            ev.last_price = float(d.get("price") or 0)
+            ev.avg_price = float(d.get("priceAvg") or 0)
+            self._on_exec(&ev)
+
     # 리포트 push
+    # 링 슬롯을 claim 해서 struct 로 제자리에 씀 → publish (레코드당 np.zeros/복사 없음)
     cdef void _push_orpt(self, long long coid, str ordid, int status, double px, double orig, double execq, double remain, int side):
-        rec = np.zeros((), dtype=ORDER_REPORT_DTYPE)
-        rec["ts"]=_now_ms(); rec["client_oid"]=coid; rec["order_id"]=ordid; rec["symbol"]=self.symbol
-        rec["status"]=status; rec["price"]=px; rec["orig_qty"]=orig; rec["exec_qty"]=execq; rec["remain_qty"]=remain; rec["side"]=side
-        self.r_orpt.push(rec)
+        cdef order_report_v2_t* r = <order_report_v2_t*>self.r_orpt.claim_ptr()
+        if r == NULL:
+            return
+        memset(r, 0, sizeof(order_report_v2_t))
+        r.ts = _now_ms(); r.client_oid = coid
+        r.order_id = order_id_int(ordid); r.symbol = self.symbol_id
+        r.status = <signed char>status; r.price = px; r.orig_qty = orig; r.exec_qty = execq; r.remain_qty = remain
+        r.side = <signed char>side
+        self.r_orpt.publish_n()
 
     cdef void _push_frpt(self, long long coid, str ordid, double fq, double fp, int side, int liq):
-        rec = np.zeros((), dtype=FILL_REPORT_DTYPE)
-        rec["ts"]=_now_ms(); rec["client_oid"]=coid; rec["order_id"]=ordid; rec["symbol"]=self.symbol
-        rec["fill_qty"]=fq; rec["fill_price"]=fp; rec["side"]=side; rec["liquidity"]=liq
-        self.r_frpt.push(rec)
+        cdef fill_report_v2_t* r = <fill_report_v2_t*>self.r_frpt.claim_ptr()
+        if r == NULL:
+            return
+        memset(r, 0, sizeof(fill_report_v2_t))
+        r.ts = _now_ms(); r.client_oid = coid
+        r.order_id = order_id_int(ordid); r.symbol = self.symbol_id
+        r.fill_qty = fq; r.fill_price = fp; r.side = <signed char>side; r.liquidity = <signed char>liq
+        self.r_frpt.publish_n()
@@ -4,12 +4,18 @@
 
 import os
 from libc.math cimport floor
+from libc.string cimport memset
 cimport cython
 import numpy as np
 
-from shm_ring import ShmRing
+from shm_ring_fast cimport ShmRing
+from shm_registry import attach_ring
+from layouts_c cimport order_flag_t
 from layouts import ORDER_FLAG_DTYPE
 
+cdef enum:
+    LADDER_MAX = 64   # 한 번의 feed_trade 에서 모아 publish 할 최대 주문 수
+
 cdef inline double qtick(double x, double tick) nogil:
     if tick <= 0.0:
         return x
@@ -27,13 +33,20 @@ cdef class Avellaneda_Stoikov_marketmaking:
     # 내부 상태
     cdef double last_bid, last_ask
     cdef double tick
-    cdef object of_ring
+    cdef ShmRing of_ring
+    cdef order_flag_t flag          # 주문플래그 템플릿 (symbol 은 __init__ 에서 1회 채움)
     cdef long long seq
     cdef int last_signal_side
+    # Bitget 선물 체결 테이프 (TR_BG 링, feed_bg_trade)
+    cdef public double bg_last_trade_px, bg_flow
+    cdef public long long bg_last_trade_ms
+    # Bitget ticker 스냅샷 (feed_bg_ticker)
+    cdef public double bg_mark_px, bg_index_px, bg_funding_rate
+    cdef public long long bg_next_funding_ms
 
     def __init__(self, str ticker, str base, str settle, int magic,
                  str interval, double bet_amount, int minqty, int numOrders,
-                 str bitget_ticker):
+                 str bitget_ticker, str ring_dir="SHM_RING_DIR", str of_ring="OF"):
         self.ticker = ticker
         self.base = base
         self.settle = settle
@@ -49,18 +62,70 @@ cdef class Avellaneda_Stoikov_marketmaking:
         self.tick = float(os.getenv("BITGET_TICK_SIZE", "0.001"))
         self.seq = 490000
         self.last_signal_side = 0
-
-        self.of_ring = ShmRing(
-            os.getenv("ORDER_FLAGS_RING", "RING_ORDER_FLAGS"),
-            ORDER_FLAG_DTYPE,
-            capacity=int(os.getenv("OF_CAP", "2048")),
-            create=False
-        )
+        self.bg_last_trade_px = 0.0
+        self.bg_flow = 0.0
+        self.bg_last_trade_ms = 0
+        self.bg_mark_px = 0.0
+        self.bg_index_px = 0.0
+        self.bg_funding_rate = 0.0
+        self.bg_next_funding_ms = 0
+
+        # 주문플래그 링: 디렉터리에서 논리 이름으로 attach (이 프로세스가 생산자)
+        self.of_ring = attach_ring({"ring_dir": ring_dir}, of_ring, ORDER_FLAG_DTYPE,
+                                   producer=True, cls=ShmRing)
+        cdef str sym = self.bitget_ticker if self.bitget_ticker else "BTCUSDT_UMCBL"
+        cdef Py_ssize_t i
+        cdef Py_UCS4 ch
+        memset(&self.flag, 0, sizeof(order_flag_t))
+        for i, ch in enumerate(sym[:32]):
+            self.flag.symbol[i] = ch
 
     cdef inline long long _next_oid(self) nogil:
         self.seq += 1
         return self.seq & 0x7fffffff
 
+    # 한 장 사다리에 추가 (목표수익 S_ticks 고정)
+    # 매수: exit = exec + S_ticks*tau, 매도: exit = exec - S_ticks*tau
+    # OF 링 슬롯을 claim 해서 제자리에 씀 (임시 레코드/복사 없음)
+    # 사다리 장수 = 링의 claimed (따로 세지 않음 → publish/discard 와 항상 같이 움직임)
+    cdef inline void _push_flag(self, int pside, double px_exec, double qtty,
+                                double tau, double S_ticks, long long t_ms) noexcept nogil:
+        if self.of_ring.claimed == LADDER_MAX:
+            self._flush_ladder()
+        cdef order_flag_t* r = <order_flag_t*>self.of_ring.claim_ptr()
+        if r == NULL:
+            return              # 링 정책상 버림 (drops 에 집계됨)
+        r[0] = self.flag
+        r.ts         = t_ms
+        r.side       = <signed char>pside
+        r.exec_px    = px_exec
+        r.exit_px    = px_exec + (S_ticks * tau if pside > 0 else -S_ticks * tau)
+        r.qty        = qtty
+        r.tick       = tau
+        r.client_oid = self._next_oid()
+
+    # 모은 사다리를 한 번에 publish → 주문엔진은 사다리 전체를 같이 본다
+    cdef inline void _flush_ladder(self) noexcept nogil:
+        self.of_ring.publish_n()
+
+    # 사다리를 다 못 만들고 빠질 때: claim 만 한 슬롯은 버림 (다음 publish 에 섞여 나가지 않게)
+    cdef inline void _drop_ladder(self) noexcept nogil:
+        self.of_ring.discard_n()
+
+    cpdef void feed_bg_trade(self, double price, double qty, bint is_sell, long long t_ms):
+        """Bitget 선물 체결: 마지막 체결가 + 부호 체결량 EWMA (매수 +, 매도 -, α=0.05)"""
+        self.bg_last_trade_px = price
+        self.bg_last_trade_ms = t_ms
+        self.bg_flow += 0.05 * ((-qty if is_sell else qty) - self.bg_flow)
+
+    cpdef void feed_bg_ticker(self, double mark_px, double index_px, double funding_rate,
+                              long long next_funding_ms):
+        """Bitget 선물 마크/인덱스/펀딩 (ticker 스냅샷이 바뀌었을 때만 호출)"""
+        self.bg_mark_px = mark_px
+        self.bg_index_px = index_px
+        self.bg_funding_rate = funding_rate
+        self.bg_next_funding_ms = next_funding_ms
+
     cpdef void feed_trade(
         self,
         double price, double qty, bint is_sell, long long t_ms,
@@ -75,9 +140,8 @@ cdef class Avellaneda_Stoikov_marketmaking:
         qty         : Binance trade qty
         is_sell     : Binance trade aggressor (1=sell, 0=buy)
         t_ms        : trade timestamp (ms)
-        bid_px[0]   : Binance L1 best bid
-        ask_px[0]   : Binance L1 best ask
-        bg big/as : Bitget Futures 마지막 체결가 (직접 인자)  ← NEW
+        bid_px..    : Binance 상위 N 레벨 배열 (layouts.depth_dtype), [0] = L1
+        bg_*        : Bitget Futures 상위 N 레벨 배열
         """
         cdef object rec
         cdef double exec_px
@@ -179,26 +243,7 @@ cdef class Avellaneda_Stoikov_marketmaking:
         if price == 0.0:
             return
 
-        # 로컬 보관(원하면 반환/로그)
-        cdef list orders = []
-
-        # 내부 헬퍼: 한 장 push (목표수익 100틱 고정)
-        # 매수: exit = exec + 100*tau, 매도: exit = exec - 100*tau
-        def _push(int pside, double px_exec, double qtty):
-            cdef object rec
-            cdef double exit_px = px_exec + (S_ticks * tau if pside > 0 else -S_ticks * tau)
-            rec = np.zeros((), dtype=ORDER_FLAG_DTYPE)
-            rec["ts"]         = <long long>t_ms
-            rec["symbol"]     = self.bitget_ticker if self.bitget_ticker else "BTCUSDT_UMCBL"
-            rec["side"]       = <int>pside           # +1 매수 / -1 매도
-            rec["exec_px"]    = <double>px_exec      # ★ 스칼라
-            rec["exit_px"]    = <double>exit_px      # ★ 스칼라 (목표수익 100틱)
-            rec["qty"]        = <double>qtty
-            rec["tick"]       = <double>tau
-            rec["client_oid"] = <long long>self._next_oid()
-            self.of_ring.push(rec)
-            orders.append(rec)
-
+        self._drop_ladder()         # 이전 호출이 남긴 claim (정상 경로에서는 0)
         try:
             if side == 0:
                 # 양방향 스프레드: ladder_levels 만큼 대칭
@@ -207,13 +252,13 @@ cdef class Avellaneda_Stoikov_marketmaking:
                     exec_px = base_bid - off * tau
                     if exec_px > bg_bid:
                         exec_px = bg_bid
-                    _push(+1, exec_px, qty1)
+                    self._push_flag(+1, exec_px, qty1, tau, S_ticks, t_ms)
 
                     # 매도측
                     exec_px = base_ask + off * tau
                     if exec_px < bg_ask:
                         exec_px = bg_ask
-                    _push(-1, exec_px, qty1)
+                    self._push_flag(-1, exec_px, qty1, tau, S_ticks, t_ms)
 
             elif side > 0:
                 # 롱 모드: 매수만 여러 장
@@ -221,7 +266,7 @@ cdef class Avellaneda_Stoikov_marketmaking:
                     exec_px = base_bid - off * tau
                     if exec_px > bg_bid:
                         exec_px = bg_bid
-                    _push(+1, exec_px, qty1)
+                    self._push_flag(+1, exec_px, qty1, tau, S_ticks, t_ms)
 
             else:
                 # 숏 모드: 매도만 여러 장
@@ -229,9 +274,12 @@ cdef class Avellaneda_Stoikov_marketmaking:
                     exec_px = base_ask + off * tau
                     if exec_px < bg_ask:
                         exec_px = bg_ask
-                    _push(-1, exec_px, qty1)
+                    self._push_flag(-1, exec_px, qty1, tau, S_ticks, t_ms)
+
+            self._flush_ladder()
 
         except Exception as _:
-            # 속도우선: 실패 시 조용히 무시
+            # 속도우선: 실패 시 조용히 무시 (만들다 만 사다리는 내보내지 않음)
+            self._drop_ladder()
             return
 
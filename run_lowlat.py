@@ -1,42 +1,82 @@
 # run_lowlat.py
 import os, time, signal
-from multiprocessing import Process, Manager, set_start_method
+from multiprocessing import Process, set_start_method
 
 from shm_ring import ShmRing
+from shm_snapshot import ShmSnapshot
+from shm_registry import ShmRegistry
+from shm_status import ShmStatus
+from shm_wakeup import atomic_ring_available
 from layouts import (
-    TRADE_DTYPE, BOOK_DTYPE,
-    ORDER_FLAG_DTYPE, ORDER_REPORT_DTYPE, FILL_REPORT_DTYPE,
+    TRADE_DTYPE, TICKER_DTYPE, depth_dtype,
+    ORDER_FLAG_DTYPE, ORDER_REPORT_V2_DTYPE, FILL_REPORT_V2_DTYPE,
     PRIVATE_EXEC_DTYPE,BG_WS_CMD_DTYPE
 )
-from ws_workers import trade_ws_worker, book_ws_worker
-from bitget_ws_workers import bitget_futures_book_ws_worker
+from ws_workers import trade_ws_worker, book_ws_worker, book_diff_ws_worker, binance_md_gateway
+from bitget_ws_workers import (bitget_futures_book_ws_worker, bitget_futures_trade_ws_worker,
+                               bitget_futures_ticker_ws_worker, ticker_snap_name, bitget_ticker_symbols)
 from bitget_private_ws import bitget_private_ws_worker
 from strategy_worker import strategy_worker
 # Bitget
 
 
 
+# main 이 띄우는 Bitget 워커의 상태 슬롯 키 (Binance 쪽은 md_feeds 에서)
+BITGET_STATUS_KEYS = ("OB_BG", "TR_BG", "TK_BG", "BGPRV")
+
+# 링 → doorbell cfg 키 (같은 doorbell 을 여러 링이 공유하면 생산자도 여럿)
+RING_WAKE = {"TR_BI": "wake_strat", "TR_BG": "wake_strat", "OF": "wake_order", "BGPRV": "wake_order"}
+
+
+def check_doorbells(cfg):
+    """
+    생산자가 둘 이상인 doorbell 은 원자적 seq 증가(shm_ring_fast.bell_ring)가 있어야 한다.
+    미빌드(파이썬 fallback = 단일 생산자 전용)면 깨우기 유실 대신 시작 시 거부.
+    """
+    users = {}
+    for ring_key, wake_key in RING_WAKE.items():
+        users.setdefault(cfg[wake_key], []).append(ring_key)
+    shared = {w: keys for w, keys in users.items() if len(keys) > 1}
+    if shared and not atomic_ring_available():
+        raise RuntimeError(f"공유 doorbell {shared} 에는 shm_ring_fast 가 필요 "
+                           f"(python setup.py build_ext --inplace) — 또는 wake_* 를 링마다 다르게")
+
+
 # ---------- NEW: top-level order process target (픽클 가능) ----------
 def order_main(cfg):
     # Cython ordersystem 모듈 import 는 child 프로세스에서
     from ordersystem import Ordersystem
-    o = Ordersystem({
-        **cfg,
-        "of_ring": cfg["ring_of"],
-        "or_ring": cfg["ring_or"],
-        "fl_ring": cfg["ring_fl"],
-        "bg_priv_ring": cfg["ring_bg_priv"],
-    })
+    o = Ordersystem(cfg)     # 링은 디렉터리에서 논리 이름(OF/BGPRV/OR/FL)으로 attach
     o.start()
 
 
 def build_cfg():
-    return {
+    cfg = {
         "ticker": "SOLUSDT",
         "base": "SOL",
         "settle": "USDT",
-        "depth_levels": 5,
+        "depth_levels": 5,          # 북 링/스냅샷 레벨 수 N (Binance 5/10/20, Bitget books5/books15)
         "depth_speed_ms": 100,
+        # Binance 북 소스: "diff" = @depth 차분 + REST 스냅샷 로컬 북, "partial" = partial_book_depth
+        "ob_bi_mode": "diff",
+        "depth_snapshot_limit": 1000,
+        # Binance 게이트웨이: 프로세스 1개가 combined stream 연결 md_conns 개로 md_feeds 전부 수신
+        # False 면 피드마다 워커 프로세스/소켓 1개 (이전 방식)
+        "md_gateway": True,
+        "md_conns": 1,
+        # hot-hot 중복 연결 수 (1 = 끔). 피드가 trade id / update id 로 먼저 온 것만 링에 넣음
+        "md_redundancy": 1,
+        "md_urls": ["wss://stream.binance.com:9443", "wss://stream.binance.com:443"],
+        "bg_redundancy": 1,
+        "bg_pub_urls": ["wss://wspap.bitget.com/v2/ws/public"],
+        # Bitget WS 연결 (BitgetLoop): 앱 "ping" 주기 / pong 없으면 재연결 / 무수신 재연결(0 = 끔)
+        "bg_ping_s": 25,
+        "bg_pong_timeout_s": 60,
+        "bg_idle_s": 0,
+        # private orders/fill 정규화: 종결된 주문 상태를 최근 몇 개까지 기억할지 (늦게 온 중복 차단)
+        "bg_order_state_keep": 4096,
+        # 종결 안 된 주문 / fill 만 온 주문까지 합친 상한 (LRU, 오래 소식 없는 주문부터 버림)
+        "bg_order_state_max": 16384,
 
         "bitget_ticker": "SOLUSDT", ##주문 넣을때
         "bitget_symbol": "SOLUSDT", ##웹소켓 사용시
@@ -53,12 +93,31 @@ def build_cfg():
         "magic": 1, "interval": "1s",
         "bet_amount": 1.0, "minqty": 1, "numOrders": 5,
 
-        "tr_capacity": 4096, "ob_capacity": 2048,
+        "tr_capacity": 4096, "ob_capacity": 2048, "tr_bg_capacity": 4096,
         "bg_ob_capacity": 2048,
         "of_capacity": 2048, "or_capacity": 4096, "fl_capacity": 8192,
         "bg_priv_capacity": 8192,
 
+        # 링이 가득 찼을 때 정책 (overwrite / drop_newest / block)
+        # 북은 최신값만 의미 있으니 overwrite, 체결·주문 경로는 유실보다 지연이 낫다 → block
+        "tr_policy": "block", "ob_policy": "overwrite", "bg_ob_policy": "overwrite", "tr_bg_policy": "block",
+        "of_policy": "block", "or_policy": "drop_newest", "fl_policy": "drop_newest",
+        "bg_priv_policy": "block", "bg_cmd_policy": "block",
+        "block_timeout_us": 2000,
+
+        # 소비자 깨우기 doorbell (같은 이름 = 하나의 doorbell 을 여러 링이 공유, RING_WAKE)
+        # 공유 doorbell = 생산자 여럿 → shm_ring_fast 빌드 필요 (check_doorbells)
+        "wake_strat": "WAKE_STRAT",   # TR_BI / TR_BG → 전략
+        "wake_order": "WAKE_ORDER",   # OF + BG_PRIV → 주문엔진
+        # 프로세스별 대기: spin 횟수만큼 polling 후 doorbell 에서 block (block_s 는 안전망 timeout)
+        "strat_spin": 2000, "strat_block_s": 0.1,
+        "order_spin": 2000, "order_block_s": 0.05,
+
+        # 링 디렉터리: 워커는 create_rings 의 논리 이름(TR_BI, OF, ...)으로 attach
+        # 살아있는 링 목록: python shm_registry.py
+        "ring_dir": "SHM_RING_DIR",
         "ring_tr_bi": "RING_TR_BI",
+        "ring_tr_bg": "RING_TR_BG",
         "ring_ob_bi": "RING_OB_BI",
         "ring_ob_bg": "RING_OB_BG",
         "ring_of":    "RING_ORDER_FLAGS",
@@ -66,23 +125,86 @@ def build_cfg():
         "ring_fl":    "RING_FILL_REPORT",
         "ring_bg_priv": "RING_BG_PRIV",
         "ring_bg_cmd": "RING_BG_CMD",
-    }
 
+        # 상위 N 북 최신값 seqlock 슬롯 (북 워커 write, 전략 read)
+        "snap_ob_bi": "SNAP_OB_BI",
+        "snap_ob_bg": "SNAP_OB_BG",
+        # Bitget ticker (마크/인덱스/펀딩/OI) 심볼별 seqlock 슬롯: SNAP_TK_BG_<심볼>
+        "snap_tk_bg": "SNAP_TK_BG",
+        "bg_ticker_symbols": ["SOLUSDT"],
 
-def create_rings(cfg):
-    rings = {}
-    rings["TR_BI"] = ShmRing(cfg["ring_tr_bi"], TRADE_DTYPE, cfg["tr_capacity"], create=True) #Trade Binance
-    rings["OB_BI"] = ShmRing(cfg["ring_ob_bi"], BOOK_DTYPE,  cfg["ob_capacity"], create=True) #Orderbook Binance
-    rings["OB_BG"] = ShmRing(cfg["ring_ob_bg"], BOOK_DTYPE, cfg["bg_ob_capacity"], create=True) #Orderbook Bitget
-    rings["OF"]    = ShmRing(cfg["ring_of"],    ORDER_FLAG_DTYPE,   cfg["of_capacity"], create=True) #OrderFlag
-    rings["OR"]    = ShmRing(cfg["ring_or"],    ORDER_REPORT_DTYPE, cfg["or_capacity"], create=True) #OrderReport
-    rings["FL"]    = ShmRing(cfg["ring_fl"],    FILL_REPORT_DTYPE,  cfg["fl_capacity"], create=True) #FillReport
-    rings["BGPRV"] = ShmRing(cfg["ring_bg_priv"], PRIVATE_EXEC_DTYPE, cfg["bg_priv_capacity"], create=True)
-    rings["BG_CMD"] = ShmRing(cfg["ring_bg_cmd"], BG_WS_CMD_DTYPE, cfg["bg_priv_capacity"], create=True)
+        # 워커 상태/하트비트 블록 (슬롯 = cfg["status_slots"], 워커 write, main read)
+        "status_name": "SHM_STATUS",
+    }
+    # 게이트웨이 피드 (kind, symbol, 링 논리 이름). 심볼을 늘리면 링/스냅샷도 같이 추가
+    cfg["md_feeds"] = [
+        ("trade", cfg["ticker"], "TR_BI"),
+        (cfg["ob_bi_mode"], cfg["ticker"], "OB_BI"),
+    ]
+    # v2 레코드의 심볼 ID 테이블 (layouts.symbol_table): 이 cfg 가 쓰는 심볼 문자열 전부, 순서 = ID
+    cfg["symbols"] = [cfg["ticker"], cfg["bitget_ticker"], cfg["bitget_symbol"],
+                      *bitget_ticker_symbols(cfg), *(sym for _, sym, _ in cfg["md_feeds"])]
+    # 상태 슬롯: 게이트웨이 피드의 링 키 + Bitget 워커 키 (피드를 늘리면 슬롯도 따라 늘어남)
+    cfg["status_slots"] = [key for _, _, key in cfg["md_feeds"]] + list(BITGET_STATUS_KEYS)
+    check_doorbells(cfg)
+    return cfg
+
+
+def create_rings(cfg, registry):
+    def mk(name, dtype, cap, policy, wakeup=None):
+        return ShmRing(name, dtype, cap, create=True,
+                       policy=policy, block_timeout_us=cfg["block_timeout_us"], wakeup=wakeup)
 
+    rings = {}
+    rings["TR_BI"] = mk(cfg["ring_tr_bi"], TRADE_DTYPE, cfg["tr_capacity"], cfg["tr_policy"], cfg[RING_WAKE["TR_BI"]]) #Trade Binance
+    rings["TR_BG"] = mk(cfg["ring_tr_bg"], TRADE_DTYPE, cfg["tr_bg_capacity"], cfg["tr_bg_policy"], cfg[RING_WAKE["TR_BG"]]) #Trade Bitget futures
+    depth = depth_dtype(cfg["depth_levels"])
+    rings["OB_BI"] = mk(cfg["ring_ob_bi"], depth, cfg["ob_capacity"], cfg["ob_policy"]) #Orderbook Binance (상위 N)
+    rings["OB_BG"] = mk(cfg["ring_ob_bg"], depth, cfg["bg_ob_capacity"], cfg["bg_ob_policy"]) #Orderbook Bitget (상위 N)
+    rings["OF"]    = mk(cfg["ring_of"],    ORDER_FLAG_DTYPE,   cfg["of_capacity"], cfg["of_policy"], cfg[RING_WAKE["OF"]]) #OrderFlag
+    rings["OR"]    = mk(cfg["ring_or"],    ORDER_REPORT_V2_DTYPE, cfg["or_capacity"], cfg["or_policy"]) #OrderReport (v2 64B)
+    rings["FL"]    = mk(cfg["ring_fl"],    FILL_REPORT_V2_DTYPE,  cfg["fl_capacity"], cfg["fl_policy"]) #FillReport (v2 64B)
+    rings["BGPRV"] = mk(cfg["ring_bg_priv"], PRIVATE_EXEC_DTYPE, cfg["bg_priv_capacity"], cfg["bg_priv_policy"], cfg[RING_WAKE["BGPRV"]])
+    rings["BG_CMD"] = mk(cfg["ring_bg_cmd"], BG_WS_CMD_DTYPE, cfg["bg_priv_capacity"], cfg["bg_cmd_policy"])
+
+    for k, r in rings.items():
+        registry.register(k, r)
     return rings
 
 
+def create_snapshots(cfg):
+    snaps = {}
+    depth = depth_dtype(cfg["depth_levels"])
+    snaps["OB_BI"] = ShmSnapshot(cfg["snap_ob_bi"], depth, create=True)
+    snaps["OB_BG"] = ShmSnapshot(cfg["snap_ob_bg"], depth, create=True)
+    for s in bitget_ticker_symbols(cfg):
+        snaps["TK_BG_" + s] = ShmSnapshot(ticker_snap_name(cfg, s), TICKER_DTYPE, create=True)
+    return snaps
+
+
+def ring_report(rings):
+    # 링별 최대 점유/용량 + 유실 수 (drop=생산자 측, lost=소비자가 seq gap 으로 확인).
+    # 최대 점유가 용량의 90% 이상이거나 유실이 있으면 '!' 표시 → 용량 부족
+    out = []
+    for k, r in rings.items():
+        st = r.stats()
+        warn = "!" if st["drops"] or st["max_occ"] >= 0.9 * st["cap"] else ""
+        out.append(f"{k}={st['max_occ']}/{st['cap']}"
+                   + (f",drop={st['drops']}" if st["drops"] else "")
+                   + (f",lost={st['lost']}" if st["lost"] else "") + warn)
+    return " ".join(out)
+
+
+def status_report(status):
+    # 워커별 상태 / 마지막 거래소 ts / 마지막 수신 후 경과(ms) / feed 지연 EWMA(ms) / 메시지·에러 수
+    out = []
+    for k, s in status.read().items():
+        age = f"{s['age_ms']:.0f}ms" if s["age_ms"] is not None else "-"
+        out.append(f"{k}={s['state']}(ts={s['exch_ts']},age={age},lat={s['lat_us'] / 1000:.1f}ms,n={s['msgs']}"
+                   + (f",err={s['errs']}" if s["errs"] else "") + ")")
+    return " ".join(out)
+
+
 # ---------- NEW: 안전 정리 (뷰 먼저 해제) ----------
 def close_and_unlink_all(rings):
     # memoryview/ndarray 참조 먼저 해제
@@ -114,29 +236,27 @@ def main():
         pass
 
     cfg = build_cfg()
-    rings = create_rings(cfg)
-    mgr = Manager()
-    shared = mgr.dict()
+    registry = ShmRegistry(cfg["ring_dir"], create=True)
+    rings = create_rings(cfg, registry)
+    snaps = create_snapshots(cfg)
+    status = ShmStatus(cfg["status_name"], cfg["status_slots"], create=True)
 
     procs = []
 
-    procs.append(Process(target=trade_ws_worker,
-                         args=(cfg, cfg["ring_tr_bi"], cfg["tr_capacity"], shared),
-                         daemon=True))
-    procs.append(Process(target=book_ws_worker,
-                         args=(cfg, cfg["ring_ob_bi"], cfg["ob_capacity"], shared),
-                         daemon=True))
-    procs.append(Process(target=bitget_futures_book_ws_worker,
-                         args=(cfg, cfg["ring_ob_bg"], cfg["bg_ob_capacity"], shared),
-                         daemon=True))
-    procs.append(Process(target=bitget_private_ws_worker,
-                         args=(cfg, cfg["ring_bg_priv"],  cfg["bg_priv_capacity"], shared),
-                         daemon=True))
-
-    # strategy: Binance OB/Trades + Bitget Orderbook 전달
-    procs.append(Process(target=strategy_worker,
-                         args=(cfg, shared, cfg["ring_tr_bi"], cfg["ring_ob_bi"], cfg["ring_ob_bg"]),
-                         daemon=True))
+    # 워커 인자는 링 논리 이름 (세그먼트 이름/dtype/cap 은 디렉터리와 링 헤더에서)
+    if cfg["md_gateway"]:
+        procs.append(Process(target=binance_md_gateway, args=(cfg,), daemon=True))
+    else:
+        procs.append(Process(target=trade_ws_worker, args=(cfg, "TR_BI"), daemon=True))
+        ob_bi_worker = book_diff_ws_worker if cfg["ob_bi_mode"] == "diff" else book_ws_worker
+        procs.append(Process(target=ob_bi_worker, args=(cfg, "OB_BI"), daemon=True))
+    procs.append(Process(target=bitget_futures_book_ws_worker, args=(cfg, "OB_BG"), daemon=True))
+    procs.append(Process(target=bitget_futures_trade_ws_worker, args=(cfg, "TR_BG"), daemon=True))
+    procs.append(Process(target=bitget_futures_ticker_ws_worker, args=(cfg, "TK_BG"), daemon=True))
+    procs.append(Process(target=bitget_private_ws_worker, args=(cfg, "BGPRV"), daemon=True))
+
+    # strategy: Binance / Bitget trades 링 (북은 seqlock 스냅샷)
+    procs.append(Process(target=strategy_worker, args=(cfg, "TR_BI", "TR_BG"), daemon=True))
 
     # ---------- CHANGED: order_main 은 top-level 함수 ----------
     procs.append(Process(target=order_main, args=(cfg,), daemon=True))
@@ -158,19 +278,15 @@ def main():
     try:
         while not stopping:
             time.sleep(1.0)
-            print(
-                f"BINANCE tr={shared.get('tr_ws_state')} "
-                f"ob={shared.get('ob_ws_state')} | "
-                f"BITGET pub-tr={shared.get('bg_books_state')} priv={shared.get('bg_priv_state')} | "
-                f"last BiT={shared.get('last_trade_ts')} BiOB={shared.get('last_book_ts')} "
-                f"BgOB={shared.get('last_bg_books_ts')} BgPriv={shared.get('bg_priv_last_ts')}",
-                flush=True
-            )
+            print(f"  feeds {status_report(status)}", flush=True)
+            print(f"  rings {ring_report(rings)}", flush=True)
     finally:
         for p in procs:
             try: p.terminate()
             except Exception: pass
         close_and_unlink_all(rings)
+        close_and_unlink_all(snaps)
+        close_and_unlink_all({"DIR": registry, "STATUS": status})
         print("[main] cleaned. bye.", flush=True)
 
 
@@ -6,6 +6,12 @@ import os, sys, platform
 
 BASE_DIR = os.path.dirname(__file__)
 
+# layouts_c.pxd(struct 미러)가 layouts.py dtype 과 어긋나면 빌드 중단
+sys.path.insert(0, os.path.abspath(BASE_DIR))
+import gen_layouts_c
+if not gen_layouts_c.check():
+    sys.exit("layouts_c.pxd 가 layouts.py 와 다름 → python gen_layouts_c.py 로 재생성 후 빌드")
+
 def ext(name, rel_src):
     src = os.path.join(BASE_DIR, rel_src)
     is_msvc = platform.system().lower().startswith("win") and \
@@ -17,13 +23,15 @@ def ext(name, rel_src):
     return Extension(
         name=name,
         sources=[src],
-        include_dirs=[np.get_include()],
+        include_dirs=[np.get_include(), BASE_DIR],   # BASE_DIR: shm_atomic.h
         language="c++",                 # C++로 컴파일
         extra_compile_args=extra_compile_args,
         extra_link_args=extra_link_args,
     )
 
 extensions = [
+    # ShmRing 핫패스 (shm_ring.py 와 같은 레이아웃, nogil 진입점)
+    ext("shm_ring_fast", "shm_ring_fast.pyx"),
     # 전략 엔진 (feed_trade 포함)
     ext("qty_based_leverage_trading", "qty_based_leverage_trading.pyx"),
     # 오더 실행/관리 엔진 (REST 발주 + Private 이벤트 소비)
@@ -0,0 +1,83 @@
+/* shm_atomic.h
+ * ShmRing 헤더 word 용 acquire load / release store.
+ * 생산자: 슬롯 write -> shm_store_release(head)
+ * 소비자: shm_load_acquire(head) -> 슬롯 read -> shm_store_release(tail)
+ * 생산자 claim(가득 찬 OVERWRITE): shm_store_fenced(claim_end) -> 슬롯 write
+ *   (claim_end store 가 이후 슬롯 write 보다 먼저 보여야 소비자의 재확인이 잡는다)
+ * BLOCK 정책 spin 용 단조 시계(shm_now_ns)와 spin 힌트(shm_cpu_relax) 포함.
+ * shm_bell_ring: shm_wakeup.ShmDoorbell 울리기 ([uint32 seq][uint32 waiters]).
+ */
+#ifndef SHM_ATOMIC_H
+#define SHM_ATOMIC_H
+
+#include <stdint.h>
+
+#if defined(_MSC_VER)
+#include <intrin.h>
+#include <windows.h>
+/* x64 MSVC: 정렬된 8B volatile 접근은 원자적이고 하드웨어 순서는 TSO.
+ * 컴파일러 재배치만 막으면 된다. */
+static inline int64_t shm_load_acquire(const int64_t* p) {
+    int64_t v = *(const volatile int64_t*)p;
+    _ReadWriteBarrier();
+    return v;
+}
+static inline void shm_store_release(int64_t* p, int64_t v) {
+    _ReadWriteBarrier();
+    *(volatile int64_t*)p = v;
+}
+static inline void shm_store_fenced(int64_t* p, int64_t v) {
+    *(volatile int64_t*)p = v;
+    _ReadWriteBarrier();
+}
+static inline int64_t shm_now_ns(void) {
+    static LARGE_INTEGER f = {0};
+    LARGE_INTEGER c;
+    if (f.QuadPart == 0) QueryPerformanceFrequency(&f);
+    QueryPerformanceCounter(&c);
+    return (int64_t)((double)c.QuadPart * 1e9 / (double)f.QuadPart);
+}
+static inline void shm_cpu_relax(void) { _mm_pause(); }
+/* Windows: 프로세스 간 futex 없음 → seq 만 올리고 소비자는 sleep polling */
+static inline void shm_bell_ring(uint32_t* bell) {
+    _InterlockedIncrement((volatile long*)bell);
+}
+#else
+#include <time.h>
+static inline int64_t shm_load_acquire(const int64_t* p) {
+    return __atomic_load_n(p, __ATOMIC_ACQUIRE);
+}
+static inline void shm_store_release(int64_t* p, int64_t v) {
+    __atomic_store_n(p, v, __ATOMIC_RELEASE);
+}
+static inline void shm_store_fenced(int64_t* p, int64_t v) {
+    __atomic_store_n(p, v, __ATOMIC_RELAXED);
+    __atomic_thread_fence(__ATOMIC_RELEASE);     /* 이후 store 보다 먼저 */
+}
+static inline int64_t shm_now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (int64_t)ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+#if defined(__x86_64__) || defined(__i386__)
+static inline void shm_cpu_relax(void) { __builtin_ia32_pause(); }
+#else
+static inline void shm_cpu_relax(void) { }
+#endif
+#if defined(__linux__)
+#include <limits.h>
+#include <unistd.h>
+#include <sys/syscall.h>
+#include <linux/futex.h>
+#endif
+static inline void shm_bell_ring(uint32_t* bell) {
+    /* seq_cst RMW = full barrier: seq 증가가 waiters 확인보다 먼저 보이게 */
+    __atomic_fetch_add(bell, 1, __ATOMIC_SEQ_CST);
+#if defined(__linux__)
+    if (__atomic_load_n(bell + 1, __ATOMIC_RELAXED))
+        syscall(SYS_futex, bell, FUTEX_WAKE, INT_MAX, NULL, NULL, 0);
+#endif
+}
+#endif
+
+#endif /* SHM_ATOMIC_H */
@@ -0,0 +1,187 @@
+# shm_registry.py
+import os
+import sys
+import time
+import struct
+from multiprocessing import shared_memory
+
+from shm_ring import ShmRing, CACHE_LINE, dtype_hash
+
+REGISTRY_NAME = "SHM_RING_DIR"
+MAGIC = b"SHMRDIR\0"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill(pid, 0) 은 Windows 에서 프로세스를 종료시키므로 핸들로 확인
+        import ctypes
+        k32 = ctypes.windll.kernel32
+        h = k32.OpenProcess(0x1000, False, pid)      # PROCESS_QUERY_LIMITED_INFORMATION
+        if not h:
+            return False
+        code = ctypes.c_ulong()
+        ok = k32.GetExitCodeProcess(h, ctypes.byref(code))
+        k32.CloseHandle(h)
+        return bool(ok) and code.value == 259       # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _untrack(shm):
+    # POSIX: attach 만 해도 resource_tracker 가 등록해서 이 프로세스 종료 시 unlink 해버림
+    # → 점검 도구처럼 남의 세그먼트를 잠깐 여는 경우 등록 해제
+    if os.name != "nt":
+        from multiprocessing import resource_tracker
+        try: resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception: pass
+
+
+class ShmRegistry:
+    """
+    공유메모리 링 디렉터리 — 논리 이름("TR_BI" 등) → 링 세그먼트
+    레이아웃: [  0: 64) [8B magic][int64 version][int64 slots][int64 count]
+             [ 64: ..) 엔트리 slots 개 × 128B (ENTRY_FMT)
+    엔트리: 논리 이름, 세그먼트 이름, cap, item_size, dtype_hash, policy,
+           생성 PID, 생산자 PID(attach(producer=True) 가 기록), 생성 시각(ns, wall clock)
+
+    등록은 링을 만드는 프로세스(run_lowlat main) 하나만 한다. 엔트리를 다 쓴 뒤 count 를
+    올리므로 독자는 count 이하 엔트리만 보면 된다. 생산자 PID 는 해당 생산자만 쓴다.
+    dtype 자체는 링 헤더(desc)에 있으므로 여기서는 hash 로 attach 측 dtype 만 확인한다.
+    """
+    VERSION    = 1
+    HDR_FMT    = "<8sqqq"
+    ENTRY_FMT  = "<32s32sqqQqqqq"     # logical, segment, cap, item_size, dtype_hash, policy, creator, producer, created_ns
+    ENTRY_SIZE = 2 * CACHE_LINE
+    OFF_ENTRY  = CACHE_LINE
+    _I_COUNT   = 3
+    _E_PRODUCER = 104                 # 엔트리 내 producer pid 오프셋
+
+    def __init__(self, name: str = REGISTRY_NAME, create: bool = False, slots: int = 64):
+        self.name = name
+        if create:
+            self.slots = int(slots)
+            size = self.OFF_ENTRY + self.slots * self.ENTRY_SIZE
+            self.shm = shared_memory.SharedMemory(create=True, size=size, name=name)
+            self.shm.buf[:size] = bytes(size)
+            struct.pack_into(self.HDR_FMT, self.shm.buf, 0, MAGIC, self.VERSION, self.slots, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+            magic, ver, self.slots, _ = struct.unpack_from(self.HDR_FMT, self.shm.buf, 0)
+            if magic != MAGIC or ver != self.VERSION:
+                self.shm.close()
+                raise ValueError(f"{name}: 링 디렉터리 세그먼트가 아님 (magic {magic!r}, version {ver})")
+        self.buf = self.shm.buf
+        self.hdr = self.buf[:CACHE_LINE].cast("q")
+
+    def _off(self, i: int) -> int:
+        return self.OFF_ENTRY + i * self.ENTRY_SIZE
+
+    def _entry(self, i: int) -> dict:
+        (logical, seg, cap, item_size, h, policy,
+         creator, producer, created_ns) = struct.unpack_from(self.ENTRY_FMT, self.buf, self._off(i))
+        return {
+            "logical": logical.rstrip(b"\0").decode(), "name": seg.rstrip(b"\0").decode(),
+            "cap": cap, "item_size": item_size, "dtype_hash": h, "policy": policy,
+            "creator_pid": creator, "producer_pid": producer, "created_ns": created_ns,
+        }
+
+    def _find(self, logical: str) -> int:
+        for i in range(self.hdr[self._I_COUNT]):
+            if self._entry(i)["logical"] == logical:
+                return i
+        return -1
+
+    # --- 등록 (링 생성 프로세스)
+    def register(self, logical: str, ring):
+        """방금 만든 링을 논리 이름으로 등록 (같은 이름이 있으면 덮어씀)"""
+        i = self._find(logical)
+        if i < 0:
+            i = self.hdr[self._I_COUNT]
+            if i >= self.slots:
+                raise ValueError(f"{self.name}: 디렉터리가 가득 참 ({self.slots})")
+        struct.pack_into(self.ENTRY_FMT, self.buf, self._off(i),
+                         logical.encode()[:31], ring.name.encode()[:31], ring.capacity, ring.item_size,
+                         dtype_hash(ring.item_dtype), ring.policy, os.getpid(), 0, time.time_ns())
+        if i == self.hdr[self._I_COUNT]:
+            self.hdr[self._I_COUNT] = i + 1     # publish
+
+    # --- 조회 / attach (워커, 도구)
+    def lookup(self, logical: str):
+        i = self._find(logical)
+        return self._entry(i) if i >= 0 else None
+
+    def attach(self, logical: str, item_dtype=None, producer: bool = False, cls=ShmRing):
+        """
+        논리 이름으로 링 attach. item_dtype 을 주면 링 헤더와 대조 (None 이면 헤더에서 복원).
+        producer=True 면 이 프로세스 PID 를 생산자로 기록. cls 로 shm_ring_fast.ShmRing 지정 가능.
+        """
+        i = self._find(logical)
+        if i < 0:
+            raise KeyError(f"{self.name}: 등록되지 않은 링 '{logical}'")
+        e = self._entry(i)
+        ring = cls(e["name"], item_dtype, e["cap"], False)
+        if producer:
+            struct.pack_into("<q", self.buf, self._off(i) + self._E_PRODUCER, os.getpid())
+        return ring
+
+    def entries(self) -> list:
+        return [self._entry(i) for i in range(self.hdr[self._I_COUNT])]
+
+    def live(self) -> list:
+        """세그먼트가 남아 있고 생산자가 (기록됐다면) 살아 있는 엔트리"""
+        out = []
+        for e in self.entries():
+            try:
+                shm = shared_memory.SharedMemory(name=e["name"], create=False)
+            except FileNotFoundError:
+                continue
+            _untrack(shm)
+            shm.close()
+            if e["producer_pid"] and not _pid_alive(e["producer_pid"]):
+                continue
+            out.append(e)
+        return out
+
+    def close(self):
+        v = self.__dict__.pop("hdr", None)
+        if v is not None:
+            try: v.release()
+            except BufferError: pass
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def attach_ring(cfg, logical: str, item_dtype=None, producer: bool = False, cls=ShmRing):
+    """워커용: cfg["ring_dir"] 디렉터리에서 논리 이름으로 링 attach"""
+    reg = ShmRegistry(cfg.get("ring_dir", REGISTRY_NAME), create=False)
+    try:
+        return reg.attach(logical, item_dtype, producer=producer, cls=cls)
+    finally:
+        reg.close()
+
+
+if __name__ == "__main__":
+    # 살아있는 링 목록: python shm_registry.py [디렉터리 이름]
+    reg = ShmRegistry(sys.argv[1] if len(sys.argv) > 1 else REGISTRY_NAME, create=False)
+    _untrack(reg.shm)
+    for e in reg.live():
+        r = ShmRing(e["name"], None, 0, create=False)
+        _untrack(r.shm)
+        if r.bell is not None:
+            _untrack(r.bell.shm)
+        st = r.stats()
+        age = (time.time_ns() - e["created_ns"]) / 1e9
+        print(f"{e['logical']:<10} {e['name']:<20} cap={e['cap']:<6} occ={st['occ']:<6} "
+              f"pushes={st['pushes']} drops={st['drops']} lost={st['lost']} "
+              f"producer={e['producer_pid']} age={age:.0f}s dtype={r.item_dtype.descr}")
+        r.close()
+    reg.close()
@@ -1,86 +1,487 @@
 # shm_ring.py
+import ast
 import time
 import struct
+import hashlib
 import numpy as np
 from multiprocessing import shared_memory
 
+from shm_wakeup import ShmDoorbell
+
+CACHE_LINE = 64
+
+# 가득 찼을 때 push 정책 (링 생성 시 결정, 헤더에 기록 → attach 한 생산자도 동일 정책)
+OVERWRITE   = 0   # 가장 오래된 레코드 덮어쓰기 (소비자가 랩 감지 후 건너뜀)
+DROP_NEWEST = 1   # 새 레코드 버림
+BLOCK       = 2   # 빈자리 생길 때까지 spin, timeout 지나면 새 레코드 버림
+
+POLICIES = {"overwrite": OVERWRITE, "drop_newest": DROP_NEWEST, "block": BLOCK}
+
+MAGIC = b"SHMRING\0"
+
+
+class ShmLayoutError(ValueError):
+    """attach 한 세그먼트가 ShmRing 이 아니거나 버전/레코드 레이아웃이 다름"""
+
+
+def _pow2(n: int) -> int:
+    n = max(int(n), 2)
+    return 1 << (n - 1).bit_length()
+
+
+def _policy_code(policy) -> int:
+    if isinstance(policy, str):
+        return POLICIES[policy.lower()]
+    return int(policy)
+
+
+def dtype_from_descr(descr) -> np.dtype:
+    """dtype.descr → dtype. 이름 없는 ('', '|Vn') 항목은 패딩으로 보고 오프셋만 넘긴다"""
+    names, formats, offsets, off = [], [], [], 0
+    for name, fmt, *shape in descr:
+        f = np.dtype((fmt, tuple(shape[0])) if shape else fmt)
+        if name:
+            names.append(name); formats.append(f); offsets.append(off)
+        off += f.itemsize
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": off})
+
+
+def dtype_hash(dt: np.dtype) -> int:
+    """item_dtype.descr 의 64bit 해시 (필드 이름/타입/순서가 같으면 프로세스가 달라도 같은 값)"""
+    return int.from_bytes(hashlib.blake2b(repr(np.dtype(dt).descr).encode(), digest_size=8).digest(), "little")
+
+
 class ShmRing:
     """
-    단일 생산자-단일 소비자(SPSC) 링버퍼
-    헤더(24B): [int64 head][int64 tail][int64 cap]
-    데이터 영역: cap * item_bytes
+    단일 생산자-단일 소비자(SPSC) 링버퍼 — 헤더 v4
+    헤더(1280B):
+      [  0: 64) meta : [8B magic][int64 version][int64 cap][int64 mask][int64 policy]
+                       [int64 block_timeout_ns][int64 item_size][uint64 dtype_hash]
+                       생성 후 read-only
+      [ 64:128) wake : doorbell 세그먼트 이름 (utf-8, NUL 패딩, 없으면 빈 값) read-only
+      [128:192) prod : [int64 head][int64 pushes][int64 drops][int64 max_occ][int64 seq]
+                       [int64 claim_end]
+                       생산자만 write
+      [192:256) cons : [int64 tail][int64 lost][int64 next_seq]
+                       소비자만 write
+      [256:1280) desc : repr(item_dtype.descr) (utf-8, NUL 패딩) read-only
+    seq 영역  : cap * int64 — 슬롯별 레코드 seq 스탬프
+    데이터 영역: cap * item_bytes (cap 은 2의 거듭제곱으로 올림, 시작은 캐시라인 정렬)
+
+    head/tail 은 단조 증가 카운터이고 슬롯 인덱스는 (counter & mask).
+    head 와 tail 이 서로 다른 캐시라인에 있으므로 push/pop 이 서로의 라인을
+    무효화하지 않는다 (v1 은 24B 헤더 한 줄에 head/tail/cap 이 같이 있었음).
+
+    publish 순서: 슬롯/seq 스탬프 write → head store.
+    head/tail 은 8B 정렬 int64 단일 store 이고, x86-64(TSO)에서는 일반 store 가
+    곧 release store 이므로 소비자는 head 를 본 시점에 슬롯 내용도 본다.
+
+    생산자는 tail 을 쓰지 않는다. OVERWRITE 정책에서 링이 밀리면(head - tail > cap)
+    소비자가 읽을 때 tail 을 head - cap 으로 당겨서 덮어써진 구간을 건너뛴다.
+    claim 은 head 를 publish 때에야 움직이므로, 가득 찬 링에서 살아있는 슬롯을 빌려줄 때는
+    claim_end(빌려준 슬롯 끝, 단조 증가)를 먼저 올리고, 소비자는 max(head, claim_end) - cap
+    까지 건너뛴다 → 쓰는 중인 슬롯을 소비자에게 내주지 않는다.
+
+    seq: 생산자에게 들어온 레코드마다 1씩 증가하는 64bit 번호 (정책상 버린 레코드도 번호를 소모).
+    publish 되는 슬롯에는 그 레코드의 seq 가 함께 찍힌다. 소비자는 다음에 올 seq(next_seq)를
+    공유메모리에 두고, 읽은 구간의 마지막 seq 와 개수로 잃어버린 레코드 수를 계산한다:
+      gap = (마지막 seq + 1 - next_seq) - 읽은 개수
+    랩(덮어쓰기)이든 DROP_NEWEST/BLOCK 버림이든 같은 식으로 잡힌다.
+    pop_many/peek_batch 직후 self.gap 에 남고 lost 에는 소비 확정 시(pop_many / commit) 누적
+    (commit 전에 다시 peek 해도 같은 gap 을 두 번 세지 않는다) → 소비자는 gap > 0 이면
+    스냅샷 재동기화/체결 대사 등으로 상태를 복구해야 한다.
+    카운터: pushes = publish 된 레코드 수, drops = 잃어버린 레코드 수
+    (덮어쓰기/버림/timeout), max_occ = push 직후 관측한 최대 점유 수,
+    lost = 소비자가 gap 으로 확인한 레코드 수.
+
+    wakeup(선택): 생성 시 doorbell 이름을 주면 생산자가 publish 후 doorbell 을 울리고,
+    소비자는 shm_wakeup.wait_readable 로 spin 후 block 할 수 있다.
+
+    attach(create=False) 시 magic/version/item_size/dtype_hash 를 확인하고 다르면
+    ShmLayoutError. cap 은 항상 헤더 값을 쓴다 (attach 측 capacity 인자는 무시).
+    item_dtype=None 으로 attach 하거나 ShmRing.open(name) 을 쓰면 desc 에서 dtype 을 복원한다.
     """
-    HEADER_FMT = "<qqq"  # head, tail, cap (int64)
-    HEADER_SIZE = struct.calcsize(HEADER_FMT)
+    VERSION     = 4
+    META_FMT    = "<8sqqqqqqQ"     # magic, version, cap, mask, policy, block_timeout_ns, item_size, dtype_hash
+    OFF_META    = 0
+    OFF_WAKE    = 1 * CACHE_LINE
+    OFF_HEAD    = 2 * CACHE_LINE
+    OFF_TAIL    = 3 * CACHE_LINE
+    OFF_DESC    = 4 * CACHE_LINE
+    DESC_SIZE   = 16 * CACHE_LINE
+    HEADER_SIZE = OFF_DESC + DESC_SIZE
 
-    def __init__(self, name: str, item_dtype: np.dtype, capacity: int, create: bool):
-        self.item_dtype = np.dtype(item_dtype)
-        self.item_size  = self.item_dtype.itemsize
-        self.capacity   = int(capacity)
-        self.total_size = self.HEADER_SIZE + self.capacity * self.item_size
+    _I_HEAD    = OFF_HEAD // 8
+    _I_PUSHES  = _I_HEAD + 1
+    _I_DROPS   = _I_HEAD + 2
+    _I_MAX_OCC = _I_HEAD + 3
+    _I_SEQ     = _I_HEAD + 4
+    _I_CLAIM   = _I_HEAD + 5
+    _I_TAIL    = OFF_TAIL // 8
+    _I_LOST    = _I_TAIL + 1
+    _I_NEXT    = _I_TAIL + 2
+
+    def __init__(self, name: str, item_dtype: np.dtype, capacity: int, create: bool,
+                 policy=OVERWRITE, block_timeout_us: int = 1000, wakeup: str = None):
+        self.name = name
 
         if create:
+            self.item_dtype = np.dtype(item_dtype)
+            self.item_size  = self.item_dtype.itemsize
+            desc = repr(self.item_dtype.descr).encode()
+            if len(desc) >= self.DESC_SIZE:
+                raise ShmLayoutError(f"{name}: dtype descr 가 {self.DESC_SIZE}B 를 넘음")
+            self.capacity   = _pow2(capacity)
+            self.policy     = _policy_code(policy)
+            self.block_timeout_ns = int(block_timeout_us) * 1000
+            self.data_off   = self._data_off(self.capacity)
+            self.total_size = self.data_off + self.capacity * self.item_size
             self.shm = shared_memory.SharedMemory(create=True, size=self.total_size, name=name)
             buf = self.shm.buf
-            struct.pack_into(self.HEADER_FMT, buf, 0, 0, 0, self.capacity)
+            buf[:self.data_off] = bytes(self.data_off)
+            struct.pack_into(self.META_FMT, buf, self.OFF_META,
+                             MAGIC, self.VERSION, self.capacity, self.capacity - 1, self.policy,
+                             self.block_timeout_ns, self.item_size, dtype_hash(self.item_dtype))
+            wake = (wakeup or "").encode()[:CACHE_LINE - 1]
+            buf[self.OFF_WAKE:self.OFF_WAKE + len(wake)] = wake
+            buf[self.OFF_DESC:self.OFF_DESC + len(desc)] = desc
         else:
             self.shm = shared_memory.SharedMemory(name=name, create=False)
             buf = self.shm.buf
-            _h, _t, cap = struct.unpack_from(self.HEADER_FMT, buf, 0)
-            self.capacity = cap
-            self.total_size = self.HEADER_SIZE + self.capacity * self.item_size
+            try:
+                cap, self.policy, self.block_timeout_ns, self.item_dtype = self._check_meta(name, buf, item_dtype)
+            except ShmLayoutError:
+                self.shm.close()
+                raise
+            self.item_size  = self.item_dtype.itemsize
+            self.capacity   = cap
+            self.data_off   = self._data_off(self.capacity)
+            self.total_size = self.data_off + self.capacity * self.item_size
+            wakeup = bytes(buf[self.OFF_WAKE:self.OFF_WAKE + CACHE_LINE]).rstrip(b"\0").decode()
+
+        self.bell = ShmDoorbell(wakeup, create=create) if wakeup else None
 
+        self.mask = self.capacity - 1
         self.buf = self.shm.buf
-        self.data_mv = memoryview(self.buf)[self.HEADER_SIZE:]
+        # 헤더를 int64 배열로 보는 뷰: 인덱싱 1회 = 정렬된 8B load/store 1회
+        self.hdr = self.buf[:self.HEADER_SIZE].cast("q")
+        self.seqs_mv = self.buf[self.HEADER_SIZE:self.HEADER_SIZE + self.capacity * 8].cast("q")
+        self.data_mv = self.buf[self.data_off:self.data_off + self.capacity * self.item_size]
         self.arr = np.ndarray((self.capacity,), dtype=self.item_dtype, buffer=self.data_mv)
+        # 슬롯별 seq 스탬프 (gap 이 어디서 났는지 소비자가 직접 볼 때)
+        self.seqs = np.ndarray((self.capacity,), dtype=np.int64, buffer=self.seqs_mv)
+        self.gap = 0
+        self._peek_n = 0
+        self._peek_end = 0
+        self._claimed = 0       # claim 했지만 아직 publish 안 한 슬롯 수 (생산자 로컬)
+        self._claim_seq = 0     # 이번 claim 묶음의 첫 seq (discard 가 되돌릴 값)
+
+    @classmethod
+    def _check_meta(cls, name, buf, item_dtype):
+        """attach 측 검증: (cap, policy, block_timeout_ns, dtype) 반환. item_dtype=None 이면 desc 에서 복원"""
+        if len(buf) < cls.HEADER_SIZE:
+            raise ShmLayoutError(f"{name}: ShmRing 세그먼트가 아님 (크기 {len(buf)}B)")
+        magic, ver, cap, _mask, policy, timeout_ns, item_size, h = struct.unpack_from(cls.META_FMT, buf, cls.OFF_META)
+        if magic != MAGIC:
+            raise ShmLayoutError(f"{name}: ShmRing 세그먼트가 아님 (magic {magic!r})")
+        if ver != cls.VERSION:
+            raise ShmLayoutError(f"{name}: 레이아웃 버전 {ver} != {cls.VERSION}")
+        if item_dtype is None:
+            desc = bytes(buf[cls.OFF_DESC:cls.OFF_DESC + cls.DESC_SIZE]).rstrip(b"\0").decode()
+            dt = dtype_from_descr(ast.literal_eval(desc))
+        else:
+            dt = np.dtype(item_dtype)
+        if dt.itemsize != item_size:
+            raise ShmLayoutError(f"{name}: 레코드 크기 {dt.itemsize}B != 세그먼트 {item_size}B")
+        if dtype_hash(dt) != h:
+            raise ShmLayoutError(f"{name}: dtype 불일치 {dt.descr}")
+        return cap, policy, timeout_ns, dt
+
+    @classmethod
+    def open(cls, name: str):
+        """dtype 을 몰라도 attach (세그먼트 헤더에서 복원) — 점검/덤프 도구용"""
+        return cls(name, None, 0, create=False)
+
+    @classmethod
+    def _data_off(cls, cap: int) -> int:
+        off = cls.HEADER_SIZE + cap * 8
+        return (off + CACHE_LINE - 1) // CACHE_LINE * CACHE_LINE
 
     # --- header helpers
     def _get_head_tail(self):
-        return struct.unpack_from(self.HEADER_FMT, self.buf, 0)[:2]
+        hdr = self.hdr
+        return hdr[self._I_HEAD], hdr[self._I_TAIL]
 
     def _set_head(self, v: int):
-        struct.pack_into("<q", self.buf, 0, v)
+        self.hdr[self._I_HEAD] = v
 
     def _set_tail(self, v: int):
-        struct.pack_into("<q", self.buf, 8, v)
+        self.hdr[self._I_TAIL] = v
+
+    def _reserve(self, head: int, tail: int, n: int) -> int:
+        """
+        생산자: n 개를 쓸 자리 확보. 정책 적용 후 실제로 쓸 개수를 반환 (0 = 전부 버림).
+        못 쓴 레코드와 덮어쓸 레코드는 drops 에 누적.
+        """
+        cap = self.capacity
+        if head + n - tail <= cap:
+            return n
+        hdr = self.hdr
+        if self.policy == OVERWRITE:
+            hdr[self._I_DROPS] += min(n, head + n - tail - cap)
+            return n
+        if self.policy == BLOCK:
+            deadline = time.perf_counter_ns() + self.block_timeout_ns
+            while head + n - tail > cap:
+                if time.perf_counter_ns() > deadline:
+                    break
+                tail = hdr[self._I_TAIL]
+        k = min(n, max(cap - (head - tail), 0))
+        if k < n:
+            hdr[self._I_DROPS] += n - k
+        return k
+
+    def _published(self, head: int, tail: int, n: int):
+        """생산자: head publish 후 카운터 갱신 (생산자 캐시라인, 일반 store)"""
+        hdr = self.hdr
+        hdr[self._I_PUSHES] += n
+        occ = min(head - tail, self.capacity)
+        if occ > hdr[self._I_MAX_OCC]:
+            hdr[self._I_MAX_OCC] = occ
+
+    def _consumer_tail(self, head: int, tail: int) -> int:
+        """소비자: OVERWRITE 로 밀린 경우 tail 을 살아있는 가장 오래된 레코드로 당김"""
+        if head - tail > self.capacity:
+            tail = head - self.capacity
+            self._set_tail(tail)
+        return tail
+
+    def _span(self, maxn: int, wrap: bool):
+        """
+        소비자: 읽을 구간 (tail, n, 마지막 seq). 비었으면 None.
+        생산자가 claim 중인 슬롯(claim_end - cap 이전)은 건너뛴다.
+        마지막 seq 를 읽은 뒤 head/claim_end 를 다시 봐서 그사이 덮어써졌으면(OVERWRITE) 다시 당긴다.
+        """
+        hdr = self.hdr
+        cap = self.capacity
+        while True:
+            head, tail = hdr[self._I_HEAD], hdr[self._I_TAIL]
+            if head == tail:
+                self.gap = 0
+                return None
+            tail = self._consumer_tail(max(head, hdr[self._I_CLAIM]), tail)
+            n = head - tail
+            if n == 0:              # 남은 슬롯 전부 claim 중 (덮어쓰는 중)
+                self.gap = 0
+                return None
+            if 0 < maxn < n:
+                n = maxn
+            if not wrap:
+                n = min(n, cap - (tail & self.mask))
+            last = self.seqs_mv[(tail + n - 1) & self.mask]
+            if max(hdr[self._I_HEAD], hdr[self._I_CLAIM]) - tail <= cap:
+                return tail, n, last
+
+    def _count_gap(self, n: int, last: int) -> int:
+        """소비자: [.., last] 까지 n 개를 받았을 때 next_seq 대비 빠진 개수 → self.gap (lost 는 안 건드림)"""
+        self.gap = last + 1 - self.hdr[self._I_NEXT] - n
+        return self.gap
+
+    def _consumed(self, n: int, end: int):
+        """소비자: n 개 소비 확정, 다음 seq = end. 그 사이 빠진 개수를 lost 에 누적 (확정 시 1회)"""
+        hdr = self.hdr
+        lost = end - hdr[self._I_NEXT] - n
+        if lost:
+            hdr[self._I_LOST] += lost
+        hdr[self._I_NEXT] = end
 
     # --- API
-    def push(self, rec):
+    def push(self, rec) -> bool:
         head, tail = self._get_head_tail()
-        nxt = (head + 1) % self.capacity
-        if nxt == tail:
-            tail = (tail + 1) % self.capacity
-            self._set_tail(tail)
-        self.arr[head] = rec
-        self._set_head(nxt)
+        seq = self.hdr[self._I_SEQ]
+        self.hdr[self._I_SEQ] = seq + 1
+        if self._reserve(head, tail, 1) == 0:
+            return False
+        i = head & self.mask
+        self.arr[i] = rec
+        self.seqs_mv[i] = seq
+        self._set_head(head + 1)   # publish
+        self._published(head + 1, tail, 1)
+        if self.bell is not None:
+            self.bell.ring()
+        return True
 
-    def pop_many(self, maxn: int):
+    def push_many(self, recs) -> int:
+        """
+        구조화 배열 recs 를 최대 두 구간 복사(버퍼 끝 / 처음)로 쓰고 head 는 배치당 1회 publish.
+        소비자는 배치 전체를 한 번에 본다. 반환: 실제로 쓴 개수 (정책상 버린 건 drops 로).
+        """
+        if not isinstance(recs, np.ndarray):
+            recs = np.asarray(recs, dtype=self.item_dtype)
+        n = len(recs)
+        if n == 0:
+            return 0
+        cap = self.capacity
+        seq = self.hdr[self._I_SEQ]
+        self.hdr[self._I_SEQ] = seq + n
+        if n > cap and self.policy == OVERWRITE:
+            # 한 배치가 링보다 크면 앞부분은 어차피 덮어써진다 → 뒤 cap 개만
+            self.hdr[self._I_DROPS] += n - cap
+            recs = recs[n - cap:]
+            seq += n - cap
+            n = cap
         head, tail = self._get_head_tail()
-        if head == tail:
+        n = self._reserve(head, tail, n)
+        if n == 0:
+            return 0
+        i = head & self.mask
+        n1 = min(n, cap - i)
+        self.arr[i:i+n1] = recs[:n1]
+        self.seqs[i:i+n1] = np.arange(seq, seq + n1)
+        if n > n1:
+            self.arr[:n - n1] = recs[n1:n]
+            self.seqs[:n - n1] = np.arange(seq + n1, seq + n)
+        self._set_head(head + n)   # publish (배치 전체)
+        self._published(head + n, tail, n)
+        if self.bell is not None:
+            self.bell.ring()
+        return n
+
+    def claim(self) -> int:
+        """
+        생산자: 다음 슬롯을 제자리 쓰기용으로 확보 → 슬롯 인덱스 i (정책상 버리면 -1).
+        self.arr[i] 가 공유메모리의 그 슬롯이므로 필드/tuple 을 바로 쓴다 (np.zeros + 복사 없음).
+        여러 번 claim 한 뒤 publish() 한 번이면 push_many 처럼 head 1회 publish.
+        claim ~ publish 사이에는 push/push_many 금지 (같은 head 를 쓴다).
+        슬롯을 다 못 채웠으면 publish 대신 discard() (반쯤 쓴 슬롯이 나가지 않게).
+        """
+        k = self._claimed
+        if k == self.capacity:
+            self.publish()
+            k = 0
+        hdr = self.hdr
+        head, tail = hdr[self._I_HEAD] + k, hdr[self._I_TAIL]
+        seq = hdr[self._I_SEQ]
+        if k == 0:
+            self._claim_seq = seq
+        hdr[self._I_SEQ] = seq + 1
+        if self._reserve(head, tail, 1) == 0:
+            return -1
+        if head - tail >= self.capacity and head + 1 > hdr[self._I_CLAIM]:
+            hdr[self._I_CLAIM] = head + 1       # OVERWRITE: 살아있는 슬롯 → 쓰기 전에 소비자에게 알림
+        i = head & self.mask
+        self.seqs_mv[i] = seq
+        self._claimed = k + 1
+        return i
+
+    def publish(self) -> int:
+        """claim 한 슬롯 전부 publish (head store 1회 + doorbell). 반환: publish 한 개수"""
+        k = self._claimed
+        if k == 0:
+            return 0
+        self._claimed = 0
+        head, tail = self._get_head_tail()
+        self._set_head(head + k)   # publish
+        self._published(head + k, tail, k)
+        if self.bell is not None:
+            self.bell.ring()
+        return k
+
+    def discard(self) -> int:
+        """
+        claim 한 슬롯 전부 취소: head 는 그대로라 소비자는 못 보고, seq 도 되돌려 gap 이 안 생긴다.
+        파싱 실패 등으로 슬롯을 다 못 채웠을 때. 반환: 취소한 개수
+        OVERWRITE 로 덮기 시작한 슬롯은 이미 잃은 것이라 claim_end 는 되돌리지 않는다.
+        """
+        k = self._claimed
+        if k == 0:
+            return 0
+        self._claimed = 0
+        self.hdr[self._I_SEQ] = self._claim_seq
+        return k
+
+    def pop_many(self, maxn: int):
+        """
+        연속 구간 하나를 반환하고 tail 전진 (버퍼 끝에서 끊어지면 끝까지만).
+        self.gap = 이 구간 앞/안에서 빠진 레코드 수 (0 = 연속)
+        """
+        span = self._span(maxn, False)
+        if span is None:
             return None  # empty
+        tail, n, last = span
+        i = tail & self.mask
+        view = self.arr[i:i+n]
+        self._count_gap(n, last)
+        self._consumed(n, last + 1)
+        self._set_tail(tail + n)
+        return view
+
+    def peek_batch(self, maxn: int = 0):
+        """
+        읽을 수 있는 레코드를 랩어라운드 포함 한 번에 반환 (zero-copy)
+        → (seg1, seg2): seg1 = tail..버퍼 끝, seg2 = 버퍼 처음..(랩된 나머지, 없으면 길이 0)
+        tail 은 전진하지 않는다. 처리 후 commit(len(seg1) + len(seg2)) 로 반납.
+        DROP_NEWEST/BLOCK 정책에서는 commit 전까지 생산자가 이 구간을 덮어쓰지 않는다.
+        self.gap = 이 구간 앞/안에서 빠진 레코드 수 (0 = 연속). lost 에는 commit 때 반영.
+        """
+        span = self._span(maxn, True)
+        if span is None:
+            return None
+        tail, n, last = span
+        self._count_gap(n, last)
+        self._peek_n, self._peek_end = n, last + 1
+        i = tail & self.mask
+        n1 = min(n, self.capacity - i)
+        return self.arr[i:i+n1], self.arr[:n - n1]
 
-        if head > tail:
-            n = min(maxn, head - tail)
-            view = self.arr[tail:tail+n]
-            self._set_tail((tail + n) % self.capacity)
-            return view
+    def commit(self, n: int):
+        """peek_batch 로 받은 레코드 n 개 소비 완료 → tail 전진 (이때부터 생산자가 재사용)"""
+        if n <= 0:
+            return
+        tail = self.hdr[self._I_TAIL]
+        if n == self._peek_n:
+            self._consumed(n, self._peek_end)
         else:
-            # wrap
-            left = self.capacity - tail
-            n = min(maxn, left)
-            view = self.arr[tail:tail+n]
-            self._set_tail((tail + n) % self.capacity)
-            return view
+            self._consumed(n, self.seqs_mv[(tail + n - 1) & self.mask] + 1)
+        self._peek_n = 0
+        self._set_tail(tail + n)
 
     def latest(self):
         head, tail = self._get_head_tail()
         if head == tail:
             return None
-        idx = (head - 1) % self.capacity
-        return self.arr[idx]
+        return self.arr[(head - 1) & self.mask]
+
+    def stats(self) -> dict:
+        """공유메모리 카운터 스냅샷 (어느 프로세스에서든 읽기 가능)"""
+        hdr = self.hdr
+        head, tail = hdr[self._I_HEAD], hdr[self._I_TAIL]
+        return {
+            "cap": self.capacity,
+            "occ": min(head - tail, self.capacity),
+            "max_occ": hdr[self._I_MAX_OCC],
+            "pushes": hdr[self._I_PUSHES],
+            "drops": hdr[self._I_DROPS],
+            "lost": hdr[self._I_LOST],
+            "seq": hdr[self._I_SEQ],
+        }
+
+    def __len__(self):
+        head, tail = self._get_head_tail()
+        return min(head - tail, self.capacity)
 
     def close(self):
+        # 공유메모리를 잡고 있는 뷰를 먼저 풀어야 close 가능
+        for a in ("arr", "seqs", "data_mv", "seqs_mv", "hdr"):
+            v = self.__dict__.pop(a, None)
+            if isinstance(v, memoryview):
+                try: v.release()
+                except BufferError: pass
+        if self.bell is not None:
+            self.bell.close()
         self.shm.close()
 
     def unlink(self):
+        if self.bell is not None:
+            self.bell.unlink()
         self.shm.unlink()
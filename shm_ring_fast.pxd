@@ -0,0 +1,61 @@
+# shm_ring_fast.pxd
+from libc.stdint cimport int64_t, uint32_t
+
+cdef extern from "shm_atomic.h" nogil:
+    int64_t shm_load_acquire(const int64_t* p)
+    void    shm_store_release(int64_t* p, int64_t v)
+    void    shm_store_fenced(int64_t* p, int64_t v)
+    int64_t shm_now_ns()
+    void    shm_cpu_relax()
+    void    shm_bell_ring(uint32_t* bell)
+
+# shm_ring.OVERWRITE / DROP_NEWEST / BLOCK 과 같은 값
+cdef enum:
+    RING_OVERWRITE   = 0
+    RING_DROP_NEWEST = 1
+    RING_BLOCK       = 2
+
+cdef class ShmRing:
+    cdef readonly object py          # shm_ring.ShmRing: 세그먼트 생성/attach/close 담당
+    cdef readonly object arr
+    cdef readonly object item_dtype
+    cdef readonly int64_t capacity
+    cdef readonly Py_ssize_t item_size
+    cdef int64_t mask
+    cdef readonly int policy
+    cdef int64_t block_timeout_ns
+    cdef int64_t* head_p
+    cdef int64_t* tail_p
+    cdef int64_t* pushes_p
+    cdef int64_t* drops_p
+    cdef int64_t* max_occ_p
+    cdef int64_t* seq_p              # 생산자: 다음에 매길 seq
+    cdef int64_t* claim_p            # 생산자: 빌려준 슬롯 끝 (가득 찬 OVERWRITE claim 때만 갱신)
+    cdef int64_t* lost_p
+    cdef int64_t* next_p             # 소비자: 다음에 올 seq
+    cdef int64_t* seqs_p             # 슬롯별 seq 스탬프
+    cdef uint32_t* bell_p            # doorbell seq word (wakeup 없으면 NULL)
+    cdef char* data
+    cdef readonly int64_t gap        # 마지막 pop/peek 구간 앞/안에서 빠진 레코드 수
+    cdef int64_t peek_n, peek_end
+    cdef readonly int64_t claimed    # claim 했지만 아직 publish 안 한 슬롯 수
+    cdef int64_t claim_seq           # 이번 claim 묶음의 첫 seq (discard_n 이 되돌릴 값)
+
+    cdef int64_t _reserve(self, int64_t head, int64_t tail, int64_t n) noexcept nogil
+    cdef void _published(self, int64_t head, int64_t tail, int64_t n) noexcept nogil
+    cdef int64_t _consumer_tail(self, int64_t head) noexcept nogil
+    cdef int64_t _span(self, Py_ssize_t maxn, bint wrap, int64_t* n, int64_t* last) noexcept nogil
+    cdef void _count_gap(self, int64_t n, int64_t last) noexcept nogil
+    cdef void _consumed(self, int64_t n, int64_t end) noexcept nogil
+
+    # --- nogil 진입점: rec 은 layouts_c 의 struct 포인터 (item_size 바이트)
+    cdef bint push_ptr(self, const void* rec) noexcept nogil     # False = 정책에 의해 버림
+    cdef Py_ssize_t push_many_ptr(self, const void* recs, Py_ssize_t n) noexcept nogil
+    cdef void* claim_ptr(self) noexcept nogil                   # 슬롯에 직접 쓰기, NULL = 버림
+    cdef Py_ssize_t publish_n(self) noexcept nogil              # claim 한 슬롯 전부 publish
+    cdef Py_ssize_t discard_n(self) noexcept nogil              # claim 한 슬롯 전부 취소
+    cdef Py_ssize_t pop_ptr(self, const void** out, Py_ssize_t maxn) noexcept nogil
+    cdef Py_ssize_t peek_ptr(self, const void** seg1, Py_ssize_t* n1,
+                             const void** seg2, Py_ssize_t maxn) noexcept nogil
+    cdef void commit_n(self, Py_ssize_t n) noexcept nogil
+    cdef const void* latest_ptr(self) noexcept nogil
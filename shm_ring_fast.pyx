@@ -0,0 +1,382 @@
+# shm_ring_fast.pyx
+# cython: language_level=3
+# cython: boundscheck=False, wraparound=False, cdivision=True, nonecheck=False
+#
+# shm_ring.ShmRing 의 컴파일 버전. 세그먼트 레이아웃/생성/attach 는 파이썬 구현을 그대로
+# 쓰고 (헤더 오프셋 단일 출처), 핫패스(push/push_many/claim/publish/discard/pop_many/peek_batch/commit/latest)만
+# C 로 처리한다. .pyx 엔진은 `from shm_ring_fast cimport ShmRing` 후
+# push_ptr/push_many_ptr/claim_ptr/publish_n/discard_n/pop_ptr/peek_ptr/latest_ptr 를
+# layouts_c struct 포인터로 GIL 없이 호출할 수 있다.
+from libc.string cimport memcpy
+from libc.stdint cimport int64_t, uint32_t, uintptr_t
+
+import numpy as np
+import shm_ring as _py_ring
+
+
+def bell_ring(uintptr_t addr):
+    """
+    shm_wakeup.ShmDoorbell.ring 의 원자적 구현 (addr = doorbell seq word 주소).
+    seq_cst fetch_add 라 생산자가 여럿이어도 증가가 사라지지 않고, waiters 확인보다 먼저 보인다.
+    """
+    with nogil:
+        shm_bell_ring(<uint32_t*>addr)
+
+
+cdef class ShmRing:
+
+    def __init__(self, str name, item_dtype, capacity, bint create,
+                 policy=_py_ring.OVERWRITE, block_timeout_us=1000, wakeup=None):
+        cdef uintptr_t data_addr
+        self.py = _py_ring.ShmRing(name, item_dtype, capacity, create,
+                                   policy=policy, block_timeout_us=block_timeout_us, wakeup=wakeup)
+        self.arr = self.py.arr
+        self.item_dtype = self.py.item_dtype
+        self.item_size = self.py.item_size
+        self.capacity = self.py.capacity
+        self.mask = self.capacity - 1
+        self.policy = self.py.policy
+        self.block_timeout_ns = self.py.block_timeout_ns
+
+        data_addr = <uintptr_t>self.arr.__array_interface__["data"][0]
+        cdef char* base = <char*>data_addr - <Py_ssize_t>self.py.data_off
+        self.data   = <char*>data_addr
+        self.seqs_p = <int64_t*>(base + <Py_ssize_t>_py_ring.ShmRing.HEADER_SIZE)
+        self.head_p = <int64_t*>(base + <Py_ssize_t>_py_ring.ShmRing.OFF_HEAD)
+        self.tail_p = <int64_t*>(base + <Py_ssize_t>_py_ring.ShmRing.OFF_TAIL)
+        self.pushes_p  = self.head_p + 1
+        self.drops_p   = self.head_p + 2
+        self.max_occ_p = self.head_p + 3
+        self.seq_p     = self.head_p + 4
+        self.claim_p   = self.head_p + 5
+        self.lost_p    = self.tail_p + 1
+        self.next_p    = self.tail_p + 2
+        self.gap = self.peek_n = self.peek_end = 0
+        self.claimed = 0
+        self.claim_seq = 0
+        self.bell_p = NULL
+        if self.py.bell is not None:
+            self.bell_p = <uint32_t*><uintptr_t>self.py.bell.addr
+
+    @classmethod
+    def open(cls, str name):
+        """dtype 을 세그먼트 헤더에서 복원해 attach (shm_ring.ShmRing.open 과 동일)"""
+        return cls(name, None, 0, False)
+
+    # ===== 정책 / 카운터 (shm_ring.ShmRing._reserve 등과 동일 규칙) =====
+    cdef int64_t _reserve(self, int64_t head, int64_t tail, int64_t n) noexcept nogil:
+        cdef int64_t cap = self.capacity
+        cdef int64_t deadline, k
+        if head + n - tail <= cap:
+            return n
+        if self.policy == RING_OVERWRITE:
+            k = head + n - tail - cap
+            self.drops_p[0] += k if k < n else n
+            return n
+        if self.policy == RING_BLOCK:
+            deadline = shm_now_ns() + self.block_timeout_ns
+            while head + n - tail > cap:
+                if shm_now_ns() > deadline:
+                    break
+                shm_cpu_relax()
+                tail = shm_load_acquire(self.tail_p)
+        k = cap - (head - tail)
+        if k < 0:
+            k = 0
+        if k > n:
+            k = n
+        if k < n:
+            self.drops_p[0] += n - k
+        return k
+
+    cdef void _published(self, int64_t head, int64_t tail, int64_t n) noexcept nogil:
+        cdef int64_t occ = head - tail
+        self.pushes_p[0] += n
+        if occ > self.capacity:
+            occ = self.capacity
+        if occ > self.max_occ_p[0]:
+            self.max_occ_p[0] = occ
+
+    cdef int64_t _consumer_tail(self, int64_t head) noexcept nogil:
+        cdef int64_t tail = self.tail_p[0]
+        if head - tail > self.capacity:
+            tail = head - self.capacity
+            shm_store_release(self.tail_p, tail)
+        return tail
+
+    cdef int64_t _span(self, Py_ssize_t maxn, bint wrap, int64_t* n, int64_t* last) noexcept nogil:
+        """읽을 구간: tail 반환, 개수 n (0 = empty), 마지막 seq. shm_ring.ShmRing._span 과 동일"""
+        cdef int64_t head, tail, k, front
+        while True:
+            head = shm_load_acquire(self.head_p)
+            if head == self.tail_p[0]:
+                self.gap = 0
+                n[0] = 0
+                return head
+            front = shm_load_acquire(self.claim_p)
+            tail = self._consumer_tail(front if front > head else head)
+            k = head - tail
+            if k == 0:              # 남은 슬롯 전부 claim 중 (덮어쓰는 중)
+                self.gap = 0
+                n[0] = 0
+                return head
+            if 0 < maxn < k:
+                k = maxn
+            if not wrap and k > self.capacity - (tail & self.mask):
+                k = self.capacity - (tail & self.mask)
+            last[0] = shm_load_acquire(self.seqs_p + ((tail + k - 1) & self.mask))
+            head = shm_load_acquire(self.head_p)
+            front = shm_load_acquire(self.claim_p)
+            if (front if front > head else head) - tail <= self.capacity:
+                n[0] = k
+                return tail
+
+    cdef void _count_gap(self, int64_t n, int64_t last) noexcept nogil:
+        self.gap = last + 1 - self.next_p[0] - n
+
+    cdef void _consumed(self, int64_t n, int64_t end) noexcept nogil:
+        """소비 확정: 그 사이 빠진 개수를 lost 에 1회 누적 (peek 를 반복해도 중복 없음)"""
+        cdef int64_t lost = end - self.next_p[0] - n
+        if lost:
+            self.lost_p[0] += lost
+        self.next_p[0] = end
+
+    # ===== nogil 진입점 =====
+    cdef bint push_ptr(self, const void* rec) noexcept nogil:
+        cdef int64_t head = self.head_p[0]              # 생산자 소유 → 일반 load
+        cdef int64_t tail = shm_load_acquire(self.tail_p)
+        cdef int64_t seq = self.seq_p[0]
+        self.seq_p[0] = seq + 1
+        if self._reserve(head, tail, 1) == 0:
+            return False
+        memcpy(self.data + (head & self.mask) * self.item_size, rec, self.item_size)
+        self.seqs_p[head & self.mask] = seq
+        shm_store_release(self.head_p, head + 1)      # publish
+        self._published(head + 1, tail, 1)
+        if self.bell_p != NULL:
+            shm_bell_ring(self.bell_p)
+        return True
+
+    cdef Py_ssize_t push_many_ptr(self, const void* recs, Py_ssize_t n) noexcept nogil:
+        """연속 레코드 n 개: memcpy 최대 2회 + head publish 1회. 반환 = 쓴 개수"""
+        cdef const char* src = <const char*>recs
+        if n <= 0:
+            return 0
+        cdef int64_t seq = self.seq_p[0]
+        self.seq_p[0] = seq + n
+        if n > self.capacity and self.policy == RING_OVERWRITE:
+            self.drops_p[0] += n - self.capacity
+            src += (n - self.capacity) * self.item_size
+            seq += n - self.capacity
+            n = <Py_ssize_t>self.capacity
+        cdef int64_t head = self.head_p[0]
+        cdef int64_t tail = shm_load_acquire(self.tail_p)
+        cdef int64_t k = self._reserve(head, tail, n)
+        if k == 0:
+            return 0
+        cdef int64_t i = head & self.mask
+        cdef int64_t k1 = self.capacity - i
+        cdef int64_t j
+        if k1 > k:
+            k1 = k
+        memcpy(self.data + i * self.item_size, src, k1 * self.item_size)
+        if k > k1:
+            memcpy(self.data, src + k1 * self.item_size, (k - k1) * self.item_size)
+        for j in range(k):
+            self.seqs_p[(head + j) & self.mask] = seq + j
+        shm_store_release(self.head_p, head + k)      # publish (배치 전체)
+        self._published(head + k, tail, k)
+        if self.bell_p != NULL:
+            shm_bell_ring(self.bell_p)
+        return <Py_ssize_t>k
+
+    cdef void* claim_ptr(self) noexcept nogil:
+        """
+        다음 슬롯을 struct 포인터로 빌려줌 → 호출자가 필드를 제자리에 쓰고 publish_n().
+        임시 레코드/memcpy 없음. NULL = 정책상 버림. claim ~ publish 사이에 push 금지.
+        다 못 채운 슬롯은 publish_n 대신 discard_n.
+        """
+        cdef int64_t k = self.claimed
+        if k == self.capacity:
+            self.publish_n()
+            k = 0
+        cdef int64_t head = self.head_p[0] + k
+        cdef int64_t tail = shm_load_acquire(self.tail_p)
+        cdef int64_t seq = self.seq_p[0]
+        if k == 0:
+            self.claim_seq = seq
+        self.seq_p[0] = seq + 1
+        if self._reserve(head, tail, 1) == 0:
+            return NULL
+        if head - tail >= self.capacity and head + 1 > self.claim_p[0]:
+            shm_store_fenced(self.claim_p, head + 1)   # OVERWRITE: 살아있는 슬롯 → 쓰기 전에 소비자에게 알림
+        self.seqs_p[head & self.mask] = seq
+        self.claimed = k + 1
+        return self.data + (head & self.mask) * self.item_size
+
+    cdef Py_ssize_t publish_n(self) noexcept nogil:
+        cdef int64_t k = self.claimed
+        if k == 0:
+            return 0
+        self.claimed = 0
+        cdef int64_t head = self.head_p[0]
+        cdef int64_t tail = shm_load_acquire(self.tail_p)
+        shm_store_release(self.head_p, head + k)      # publish (claim 한 슬롯 전부)
+        self._published(head + k, tail, k)
+        if self.bell_p != NULL:
+            shm_bell_ring(self.bell_p)
+        return <Py_ssize_t>k
+
+    cdef Py_ssize_t discard_n(self) noexcept nogil:
+        """claim 한 슬롯 전부 취소 (head 그대로, seq 되돌림) — shm_ring.ShmRing.discard 와 동일"""
+        cdef int64_t k = self.claimed
+        if k == 0:
+            return 0
+        self.claimed = 0
+        self.seq_p[0] = self.claim_seq
+        return <Py_ssize_t>k
+
+    cdef Py_ssize_t pop_ptr(self, const void** out, Py_ssize_t maxn) noexcept nogil:
+        """연속 구간 하나의 시작 포인터를 out 에 쓰고 개수를 반환 (0 = empty). 빠진 수는 self.gap"""
+        cdef int64_t n, last
+        cdef int64_t tail = self._span(maxn, False, &n, &last)
+        if n == 0:
+            return 0
+        out[0] = self.data + (tail & self.mask) * self.item_size
+        self._count_gap(n, last)
+        self._consumed(n, last + 1)
+        shm_store_release(self.tail_p, tail + n)
+        return <Py_ssize_t>n
+
+    cdef Py_ssize_t peek_ptr(self, const void** seg1, Py_ssize_t* n1,
+                             const void** seg2, Py_ssize_t maxn) noexcept nogil:
+        """
+        랩어라운드 포함 두 연속 구간을 한 번에: seg1[0:n1], seg2[0:반환값-n1]
+        반환값 = 전체 개수 (0 = empty). tail 은 commit_n 에서만 전진. 빠진 수는 self.gap (lost 는 commit_n 때)
+        """
+        cdef int64_t n, last
+        cdef int64_t tail = self._span(maxn, True, &n, &last)
+        n1[0] = 0
+        if n == 0:
+            return 0
+        self._count_gap(n, last)
+        self.peek_n = n
+        self.peek_end = last + 1
+        cdef int64_t i = tail & self.mask
+        cdef int64_t k = self.capacity - i
+        if k > n:
+            k = n
+        seg1[0] = self.data + i * self.item_size
+        seg2[0] = self.data
+        n1[0] = <Py_ssize_t>k
+        return <Py_ssize_t>n
+
+    cdef void commit_n(self, Py_ssize_t n) noexcept nogil:
+        cdef int64_t tail
+        if n <= 0:
+            return
+        tail = self.tail_p[0]
+        if n == self.peek_n:
+            self._consumed(n, self.peek_end)
+        else:
+            self._consumed(n, self.seqs_p[(tail + n - 1) & self.mask] + 1)
+        self.peek_n = 0
+        shm_store_release(self.tail_p, tail + n)
+
+    cdef const void* latest_ptr(self) noexcept nogil:
+        cdef int64_t head = shm_load_acquire(self.head_p)
+        if head == shm_load_acquire(self.tail_p):
+            return NULL
+        return self.data + ((head - 1) & self.mask) * self.item_size
+
+    # ===== shm_ring.ShmRing 과 같은 파이썬 API =====
+    def push(self, rec):
+        cdef int64_t head = self.head_p[0]
+        cdef int64_t tail = shm_load_acquire(self.tail_p)
+        cdef int64_t seq = self.seq_p[0]
+        cdef int64_t k
+        self.seq_p[0] = seq + 1
+        with nogil:
+            k = self._reserve(head, tail, 1)
+        if k == 0:
+            return False
+        self.arr[head & self.mask] = rec
+        self.seqs_p[head & self.mask] = seq
+        shm_store_release(self.head_p, head + 1)
+        self._published(head + 1, tail, 1)
+        if self.bell_p != NULL:
+            shm_bell_ring(self.bell_p)
+        return True
+
+    def push_many(self, recs):
+        cdef Py_ssize_t n
+        cdef const void* p
+        if not isinstance(recs, np.ndarray) or recs.dtype != self.item_dtype:
+            recs = np.asarray(recs, dtype=self.item_dtype)
+        recs = np.ascontiguousarray(recs)
+        n = len(recs)
+        p = <const void*><uintptr_t>recs.__array_interface__["data"][0]
+        with nogil:
+            n = self.push_many_ptr(p, n)
+        return n
+
+    def claim(self):
+        """슬롯 인덱스 (self.arr[i] 에 제자리 쓰기, -1 = 버림) — shm_ring.ShmRing.claim 과 동일"""
+        cdef void* p = self.claim_ptr()
+        if p == NULL:
+            return -1
+        return (<char*>p - self.data) // self.item_size
+
+    def publish(self):
+        return self.publish_n()
+
+    def discard(self):
+        return self.discard_n()
+
+    def pop_many(self, Py_ssize_t maxn):
+        cdef const void* p
+        cdef Py_ssize_t n = self.pop_ptr(&p, maxn)
+        if n == 0:
+            return None
+        cdef Py_ssize_t i = (<const char*>p - self.data) // self.item_size
+        return self.arr[i:i+n]
+
+    def peek_batch(self, Py_ssize_t maxn=0):
+        cdef const void* p1
+        cdef const void* p2
+        cdef Py_ssize_t n1
+        cdef Py_ssize_t n = self.peek_ptr(&p1, &n1, &p2, maxn)
+        if n == 0:
+            return None
+        cdef Py_ssize_t i = (<const char*>p1 - self.data) // self.item_size
+        return self.arr[i:i+n1], self.arr[:n - n1]
+
+    def commit(self, Py_ssize_t n):
+        self.commit_n(n)
+
+    def latest(self):
+        cdef const void* p = self.latest_ptr()
+        if p == NULL:
+            return None
+        return self.arr[(<const char*>p - self.data) // self.item_size]
+
+    def stats(self):
+        return self.py.stats()
+
+    def __len__(self):
+        cdef int64_t n = shm_load_acquire(self.head_p) - shm_load_acquire(self.tail_p)
+        return n if n < self.capacity else self.capacity
+
+    def close(self):
+        self.arr = None
+        self.bell_p = NULL
+        self.head_p = self.tail_p = self.seqs_p = NULL
+        self.data = NULL
+        self.py.close()
+
+    def unlink(self):
+        self.py.unlink()
+
+    def __getattr__(self, name):
+        # 핫패스가 아닌 나머지(name, shm, hdr, ...)는 파이썬 구현에 위임
+        return getattr(self.py, name)
@@ -0,0 +1,87 @@
+# shm_snapshot.py
+import numpy as np
+from multiprocessing import shared_memory
+
+from shm_ring import CACHE_LINE
+
+
+class ShmSnapshot:
+    """
+    seqlock 으로 보호되는 단일 슬롯 "최신값" (conflated snapshot)
+    레이아웃: [  0: 64) [int64 seq]   생산자만 write
+             [ 64: ..) record(item_dtype) 1개
+    생산자 1, 독자 N. 독자는 링을 소비하지 않고 O(1)로 일관된 최신 레코드를 얻는다.
+
+    write: seq+1(홀수=쓰는 중) → record write → seq+1(짝수=완료)
+    read : seq 읽기(홀수면 재시도) → record 복사 → seq 재확인, 다르면 재시도
+           재시도는 max_spins 회까지 — 생산자가 쓰는 도중 죽으면 seq 가 홀수로 남으므로 무한 spin 대신 None
+    x86-64 는 store-store / load-load 순서를 보장하므로 정렬된 8B seq store/load 로 충분하다.
+    """
+    OFF_SEQ  = 0
+    OFF_DATA = CACHE_LINE
+
+    def __init__(self, name: str, item_dtype: np.dtype, create: bool, max_spins: int = 10000):
+        self.name       = name
+        self.max_spins  = int(max_spins)
+        self.item_dtype = np.dtype(item_dtype)
+        self.item_size  = self.item_dtype.itemsize
+        self.total_size = self.OFF_DATA + self.item_size
+
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.total_size, name=name)
+            self.shm.buf[:self.total_size] = bytes(self.total_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+
+        self.buf = self.shm.buf
+        self.hdr = self.buf[:self.OFF_DATA].cast("q")
+        self.data_mv = self.buf[self.OFF_DATA:self.OFF_DATA + self.item_size]
+        self.arr = np.ndarray((1,), dtype=self.item_dtype, buffer=self.data_mv)
+
+    def write(self, rec):
+        hdr = self.hdr
+        s = hdr[0]
+        hdr[0] = s + 1     # 쓰는 중
+        self.arr[0] = rec
+        hdr[0] = s + 2     # 완료
+
+    def read(self):
+        """
+        일관된 최신 레코드 사본 (np.void).
+        아직 한 번도 안 써졌거나, max_spins 번 안에 일관된 사본을 못 얻으면(생산자가 쓰는 중 멈춤/사망) None
+        """
+        return self.read_newer(0)[0]
+
+    def read_newer(self, seen: int):
+        """
+        seen(지난번에 받은 seq) 이후 새로 써졌을 때만 복사 → (rec, seq). 그대로면 복사 없이 (None, seen).
+        seq 는 rec 과 같은 write 의 값이라 다음 호출에 넘기면 read 와 seq 확인 사이의 write 를 놓치지 않는다.
+        """
+        hdr = self.hdr
+        arr = self.arr
+        for _ in range(self.max_spins):
+            s1 = hdr[0]
+            if s1 == seen:
+                return None, seen
+            if s1 & 1:
+                continue
+            rec = arr[0].copy()
+            if hdr[0] == s1:
+                return rec, s1
+        return None, seen
+
+    @property
+    def seq(self) -> int:
+        """쓰기 횟수 * 2 — 독자가 바뀐 게 있는지 값 복사 없이 확인할 때 사용"""
+        return self.hdr[0]
+
+    def close(self):
+        for a in ("arr", "data_mv", "hdr"):
+            v = self.__dict__.pop(a, None)
+            if isinstance(v, memoryview):
+                try: v.release()
+                except BufferError: pass
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
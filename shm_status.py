@@ -0,0 +1,162 @@
+# shm_status.py
+import os
+import time
+import hashlib
+import numpy as np
+from multiprocessing import shared_memory
+
+from shm_ring import CACHE_LINE
+
+
+# 상태 enum (슬롯 word 0)
+(ST_NONE, ST_STARTING, ST_CONNECTING, ST_CONNECTED, ST_LIVE, ST_RESYNC,
+ ST_IDLE_RESTART, ST_CLOSED, ST_ERROR, ST_LOGIN_SENT, ST_LOGIN_FAIL) = range(11)
+STATE_NAMES = ("-", "starting", "connecting", "connected", "live", "resync",
+               "idle-restart", "closed", "error", "login_sent", "login_fail")
+
+MAGIC = 0x5354415453484D00      # "\0MHSTATS"
+
+
+class StatusSlot:
+    """
+    워커 하나의 상태 슬롯 (64B = 캐시라인 1개, 쓰는 프로세스는 하나)
+      [0] state  [1] 마지막 거래소 ts(ms)  [2] 마지막 로컬 수신 ns(time_ns)
+      [3] 메시지 수  [4] 에러 수  [5] pid  [6] 마지막 에러 코드
+      [7] feed 지연 EWMA(us) = 수신 ns - 거래소 ts (거래소 ts 가 있는 메시지만, α=1/16)
+    정렬된 8B 단일 store 라 독자는 찢어진 word 를 보지 않는다 (word 간 일관성은 보장 안 함).
+    """
+    __slots__ = ("_r", "_owner")
+
+    def __init__(self, row, owner=None):
+        self._r = row
+        self._owner = owner     # 블록 세그먼트를 슬롯 수명 동안 유지
+
+    def tick(self, exch_ts: int, recv_ns: int = 0):
+        # 메시지당 호출: word store 몇 번 (Manager 왕복 없음). recv_ns 없으면 지금 시각
+        r = self._r
+        if not recv_ns:
+            recv_ns = time.time_ns()
+        r[2] = recv_ns
+        r[3] += 1
+        if exch_ts:
+            r[1] = exch_ts
+            lat = recv_ns // 1000 - exch_ts * 1000
+            r[7] += (lat - r[7]) // 16
+
+    def state(self, st: int):
+        self._r[0] = st
+
+    def error(self, code: int = 0):
+        r = self._r
+        r[4] += 1
+        r[6] = code
+
+    def close(self):
+        """슬롯 뷰를 먼저 풀고 블록 세그먼트 close (워커 종료/테스트용)"""
+        r, self._r = self._r, None
+        if r is not None:
+            r.release()
+        if self._owner is not None:
+            self._owner.close()
+
+
+def _keys_hash(keys) -> int:
+    return int.from_bytes(hashlib.blake2b("\0".join(keys).encode(), digest_size=7).digest(), "little")
+
+
+class ShmStatus:
+    """
+    워커 상태/하트비트 블록 — Manager.dict 대체
+    레이아웃: [  0: 64) [int64 magic][int64 slots][int64 keys 해시]
+             [ 64: ..) keys 순서로 슬롯 × 64B (StatusSlot)
+    keys = cfg["status_slots"] (run_lowlat.build_cfg 가 피드/워커 목록에서 만든다) → 피드/심볼을
+    늘려도 이 모듈은 그대로. 모든 프로세스가 같은 cfg 를 받으므로 순서 = 슬롯 번호가 일치하고,
+    어긋나면 attach 시 해시로 거부.
+    워커는 slot(key) 로 자기 슬롯에 plain store, run_lowlat main 은 read() 로 읽기만 한다.
+    """
+
+    def __init__(self, name: str, keys, create: bool):
+        self.name = name
+        self.keys = tuple(keys)
+        self.index = {k: i + 1 for i, k in enumerate(self.keys)}
+        if len(self.index) != len(self.keys):
+            raise ValueError(f"{name}: 중복된 상태 슬롯 키 {self.keys}")
+        self.slots = len(self.keys)
+        h = _keys_hash(self.keys)
+        size = CACHE_LINE * (1 + self.slots)
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size, name=name)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+        if self.shm.size < size:
+            self.shm.close()
+            raise ValueError(f"{name}: 상태 블록 크기 {self.shm.size}B < {size}B")
+        self.words = self.shm.buf[:size].cast("q")
+        if create:
+            self.words[0] = MAGIC
+            self.words[1] = self.slots
+            self.words[2] = h
+        elif self.words[0] != MAGIC or self.words[1] != self.slots or self.words[2] != h:
+            n = self.words[1]
+            self.close()
+            raise ValueError(f"{name}: 상태 블록이 아니거나 슬롯 구성 불일치 ({n} != {self.slots})")
+
+    def slot(self, key: str) -> StatusSlot:
+        """key 슬롯을 이 프로세스 소유로 (pid 기록)"""
+        i = self.index[key]
+        w = CACHE_LINE // 8
+        row = self.words[i * w:(i + 1) * w]
+        row[5] = os.getpid()
+        return StatusSlot(row, self)
+
+    def read(self) -> dict:
+        """{key: {"state", "exch_ts", "local_ns", "age_ms", "msgs", "errs", "pid", "err_code", "lat_us"}}"""
+        w = CACHE_LINE // 8
+        now = time.time_ns()
+        out = {}
+        for j, key in enumerate(self.keys):
+            r = self.words[(j + 1) * w:(j + 2) * w].tolist()
+            out[key] = {
+                "state": STATE_NAMES[r[0]] if 0 <= r[0] < len(STATE_NAMES) else str(r[0]),
+                "exch_ts": r[1], "local_ns": r[2],
+                "age_ms": (now - r[2]) / 1e6 if r[2] else None,
+                "msgs": r[3], "errs": r[4], "pid": r[5], "err_code": r[6],
+                "lat_us": r[7],
+            }
+        return out
+
+    def close(self):
+        v = self.__dict__.pop("words", None)
+        if v is not None:
+            try: v.release()
+            except BufferError: pass
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def latency_stats(recs) -> dict:
+    """
+    레코드 배열(ts ms + recv_ns) 의 feed 지연 분포 (ms): 수신 - 거래소
+    거래소 시각이 없는(ts == recv ms) 레코드도 그대로 들어가므로 해당 feed 에는 쓰지 말 것
+    """
+    recs = np.atleast_1d(recs)
+    recs = recs[recs["recv_ns"] > 0]
+    if not len(recs):
+        return {"n": 0}
+    lat = recs["recv_ns"] / 1e6 - recs["ts"]
+    p50, p99 = np.percentile(lat, (50, 99))
+    return {"n": len(lat), "p50": float(p50), "p99": float(p99),
+            "max": float(lat.max()), "min": float(lat.min())}
+
+
+def status_slot(cfg, key: str) -> StatusSlot:
+    """워커용: cfg["status_name"] 블록에서 key 슬롯"""
+    st = ShmStatus(cfg["status_name"], cfg["status_slots"], create=False)
+    try:
+        return st.slot(key)
+    except KeyError:
+        st.close()
+        raise
@@ -0,0 +1,133 @@
+# shm_wakeup.py
+import time
+import ctypes
+import platform
+from multiprocessing import shared_memory
+
+# Linux futex (프로세스 간 공유 매핑 → FUTEX_PRIVATE_FLAG 없이)
+_SYS_FUTEX = {"x86_64": 202, "amd64": 202, "aarch64": 98, "arm64": 98}.get(platform.machine().lower())
+_FUTEX_WAIT = 0
+_FUTEX_WAKE = 1
+_INT_MAX = 0x7fffffff
+
+_libc = None
+if platform.system() == "Linux" and _SYS_FUTEX is not None:
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.syscall.restype = ctypes.c_long
+    except OSError:
+        _libc = None
+
+FALLBACK_SLEEP_S = 50e-6   # futex 없는 플랫폼(Windows 등): 짧은 sleep polling
+
+
+class _timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def _compiled_bell_ring():
+    """shm_ring_fast.bell_ring (원자적 seq 증가 + full barrier + FUTEX_WAKE). 미빌드면 None"""
+    try:
+        from shm_ring_fast import bell_ring
+    except ImportError:
+        return None
+    return bell_ring
+
+
+def atomic_ring_available() -> bool:
+    """여러 생산자가 doorbell 하나를 공유해도 되는지 (shm_ring_fast 빌드 여부)"""
+    return _compiled_bell_ring() is not None
+
+
+class ShmDoorbell:
+    """
+    링 생산자 → 소비자 깨우기용 공유메모리 futex word
+    레이아웃(64B): [uint32 seq][uint32 waiters]
+      생산자: head publish → seq += 1 → waiters 있으면 FUTEX_WAKE
+      소비자: seen = seq → (링 재확인) → waiters=1 → FUTEX_WAIT(seq == seen, timeout) → waiters=0
+    seq 가 seen 과 다르면 커널이 바로 반환하므로 publish 와 wait 사이의 경합으로 잠들지 않는다.
+    timeout 은 상한(안전망)이다. 여러 링이 같은 doorbell 을 공유할 수 있다 (소비자 1개가 여러 링 대기).
+
+    seq += 1 은 shm_ring_fast.bell_ring (seq_cst fetch_add) 로 한다 → 생산자가 여럿이어도 안전.
+    shm_ring_fast 가 없으면 파이썬 read-modify-write + barrier 없음 → 생산자 1개 전용
+    (run_lowlat.check_doorbells 가 공유 doorbell 을 거부한다).
+    """
+    SIZE = 64
+
+    def __init__(self, name: str, create: bool):
+        self.name = name
+        self.owner = False
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(create=True, size=self.SIZE, name=name)
+                self.shm.buf[:self.SIZE] = bytes(self.SIZE)
+                self.owner = True
+            except FileExistsError:
+                # 같은 doorbell 을 쓰는 다른 링이 먼저 만들었음
+                self.shm = shared_memory.SharedMemory(name=name, create=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+        self._seq = ctypes.c_uint32.from_buffer(self.shm.buf, 0)
+        self._waiters = ctypes.c_uint32.from_buffer(self.shm.buf, 4)
+        self.addr = ctypes.addressof(self._seq)
+        self._atomic_ring = _compiled_bell_ring()
+
+    def seq(self) -> int:
+        return self._seq.value
+
+    def ring(self):
+        if self._atomic_ring is not None:
+            self._atomic_ring(self.addr)
+            return
+        # 단일 생산자 전용 fallback
+        self._seq.value = (self._seq.value + 1) & 0xffffffff
+        if self._waiters.value and _libc is not None:
+            _libc.syscall(_SYS_FUTEX, ctypes.c_void_p(self.addr), _FUTEX_WAKE, _INT_MAX, None, None, 0)
+
+    def wait(self, seen: int, timeout_s: float):
+        """seq 가 seen 인 동안 최대 timeout_s 대기 (GIL 해제 상태로 커널에서 block)"""
+        if _libc is None:
+            time.sleep(min(timeout_s, FALLBACK_SLEEP_S))
+            return
+        ts = _timespec(int(timeout_s), int((timeout_s % 1.0) * 1e9))
+        self._waiters.value = 1
+        try:
+            _libc.syscall(_SYS_FUTEX, ctypes.c_void_p(self.addr), _FUTEX_WAIT,
+                          ctypes.c_uint32(seen), ctypes.byref(ts), None, 0)
+        finally:
+            self._waiters.value = 0
+
+    def close(self):
+        # ctypes 뷰가 버퍼를 잡고 있으므로 먼저 해제
+        self._seq = self._waiters = None
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()
+
+
+def wait_readable(rings, spin: int, timeout_s: float) -> bool:
+    """
+    rings 중 하나라도 읽을 레코드가 생길 때까지 대기.
+    spin 회 polling → 그래도 비어 있으면 doorbell 에서 block (최대 timeout_s).
+    rings 는 같은 doorbell 을 공유해야 한다 (없으면 짧은 sleep 으로 대체).
+    반환: 읽을 게 있으면 True
+    """
+    for _ in range(spin):
+        for r in rings:
+            if len(r):
+                return True
+    bell = rings[0].bell
+    if bell is None:
+        time.sleep(min(timeout_s, FALLBACK_SLEEP_S))
+    else:
+        seen = bell.seq()
+        for r in rings:
+            if len(r):
+                return True
+        bell.wait(seen, timeout_s)
+    for r in rings:
+        if len(r):
+            return True
+    return False
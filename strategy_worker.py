@@ -1,9 +1,16 @@
 # strategy_worker.py
 import time, traceback, numpy as np
-from shm_ring import ShmRing
-from layouts import TRADE_DTYPE, BOOK_DTYPE
+try:
+    from shm_ring_fast import ShmRing      # 컴파일된 핫패스 (setup.py build_ext)
+except ImportError:
+    from shm_ring import ShmRing
+from shm_snapshot import ShmSnapshot
+from shm_registry import attach_ring, REGISTRY_NAME
+from shm_wakeup import wait_readable
+from shm_status import latency_stats
+from layouts import TRADE_DTYPE, TICKER_DTYPE, depth_dtype
 
-def strategy_worker(cfg, shared, shm_trades: str, shm_book: str, shm_bg_books: str):
+def strategy_worker(cfg, ring_trades: str, ring_bg_trades: str = None):
     print("[strat] importing cython bot…", flush=True)
     try:
         from qty_based_leverage_trading import Avellaneda_Stoikov_marketmaking as Bot
@@ -20,52 +27,93 @@ def strategy_worker(cfg, shared, shm_trades: str, shm_book: str, shm_bg_books: s
         bet_amount=float(cfg["bet_amount"]),
         minqty=int(cfg["minqty"]),
         numOrders=int(cfg["numOrders"]),
-        bitget_ticker=str(cfg["bitget_ticker"])
+        bitget_ticker=str(cfg["bitget_ticker"]),
+        ring_dir=str(cfg.get("ring_dir", REGISTRY_NAME)),
+        of_ring=str(cfg.get("of_ring", "OF")),
     )
 
-    ring_tr = ShmRing(shm_trades, TRADE_DTYPE, capacity=cfg.get("tr_capacity", 1_000), create=False)
-    ring_ob = ShmRing(shm_book,   BOOK_DTYPE,  capacity=cfg.get("ob_capacity",    1_000), create=False)
-    ring_bg = ShmRing(shm_bg_books, BOOK_DTYPE, capacity=cfg.get("bg_ob_capacity", 1_000), create=False)
+    ring_tr = attach_ring(cfg, ring_trades, TRADE_DTYPE, cls=ShmRing)
+    # Bitget 선물 체결 테이프 (같은 TRADE_DTYPE, 같은 doorbell) — 없으면 Binance 만
+    ring_bg = attach_ring(cfg, ring_bg_trades, TRADE_DTYPE, cls=ShmRing) if ring_bg_trades else None
+    rings = (ring_tr, ring_bg) if ring_bg is not None else (ring_tr,)
+    # 북은 링을 소비하지 않고 seqlock 스냅샷에서 상위 N 최신값만 읽는다 (찢어진 레코드 방지)
+    DEPTH_DTYPE = depth_dtype(cfg.get("depth_levels", 5))
+    snap_ob = ShmSnapshot(cfg["snap_ob_bi"], DEPTH_DTYPE, create=False)
+    snap_bg = ShmSnapshot(cfg["snap_ob_bg"], DEPTH_DTYPE, create=False)
+    EMPTY = np.zeros((), dtype=DEPTH_DTYPE)   # 아직 북이 없을 때 (가격 0 → bot 이 건너뜀)
+    # Bitget ticker (마크/인덱스/펀딩) — seq 가 바뀔 때만 복사
+    snap_tk = None
+    if cfg.get("snap_tk_bg"):
+        snap_tk = ShmSnapshot(f"{cfg['snap_tk_bg']}_{str(cfg['bitget_symbol']).upper()}", TICKER_DTYPE, create=False)
+    tk_seq = 0
 
     BATCH = 1024
+    spin    = int(cfg.get("strat_spin", 2000))
+    block_s = float(cfg.get("strat_block_s", 0.1))
     last_bg_px = 0.0
+    lat_every = float(cfg.get("strat_lat_report_s", 10.0))   # trade feed 지연 로그 주기 (0 = 끔)
+    next_lat = time.time() + lat_every
 
     while True:
         try:
-            # 최신 북 1장
-            ob = ring_ob.latest()
-            if ob is not None:
-                ob_ts, bbid, bqty, bask, aqty = ob
-                best_bid = bbid; best_ask = bask
-                best_bqty = bqty; best_aqty = aqty
-            else:
-                best_bid = best_ask = 0.0
-                best_bqty = best_aqty = 0.0
+            # 최신 북 (상위 N 레벨 배열, [0] = L1). 임밸런스/microprice 는 book_features 로 벡터 계산
+            ob = snap_ob.read()
+            if ob is None:
+                ob = EMPTY
+            bg = snap_bg.read()
+            if bg is None:
+                bg = EMPTY
+            bid_px, bid_qty, ask_px, ask_qty = ob["bid_px"], ob["bid_qty"], ob["ask_px"], ob["ask_qty"]
+            bg_bid_px, bg_bid_qty, bg_ask_px, bg_ask_qty = bg["bid_px"], bg["bid_qty"], bg["ask_px"], bg["ask_qty"]
+            if snap_tk is not None:
+                tk, tk_seq = snap_tk.read_newer(tk_seq)
+                if tk is not None:
+                    bot.feed_bg_ticker(float(tk["mark_px"]), float(tk["index_px"]),
+                                       float(tk["funding_rate"]), int(tk["next_funding_ms"]))
 
-            # 최신 Bitget book 가격
-            bg = ring_bg.latest()
-            if bg is not None:
-                bg_ob_ts, bg_bbid, bg_bqty, bg_bask, bg_aqty = bg
-                bg_best_bid = bg_bbid; bg_best_ask = bg_bask
-                bg_best_bqty = bg_bqty; bg_best_aqty = bg_aqty
-            else:
-                bg_best_bid = bg_best_ask = 0.0
-                bg_best_bqty = bg_best_aqty = 0.0
+            # Bitget 체결 먼저 반영 (Binance 체결로 호가 낼 때 Bitget 테이프 상태가 최신이도록)
+            got = False
+            if ring_bg is not None:
+                bgb = ring_bg.peek_batch(BATCH)
+                if bgb is not None:
+                    got = True
+                    if ring_bg.gap:
+                        print(f"[strat] bitget trade 링 gap={ring_bg.gap} (누적 lost={ring_bg.stats()['lost']})", flush=True)
+                    try:
+                        for seg in bgb:
+                            for ts, px, qty, sell, tid, recv_ns in seg:
+                                bot.feed_bg_trade(float(px), float(qty), bool(sell), int(ts))
+                    finally:
+                        ring_bg.commit(len(bgb[0]) + len(bgb[1]))
 
-            # Binance 트레이드 벌크 소비
-            chunk = ring_tr.pop_many(BATCH)
-            if chunk is None:
-                # 바쁜 대기 최소화
-                time.sleep(0.0001)
+            # Binance 트레이드 벌크 소비 (랩어라운드 포함 한 번에, 처리 후 commit)
+            batch = ring_tr.peek_batch(BATCH)
+            if batch is None:
+                if not got:
+                    # spin 후 생산자 doorbell 에서 block (두 링 공용 doorbell)
+                    wait_readable(rings, spin, block_s)
                 continue
+            if ring_tr.gap:
+                # 생산자 버림/랩으로 체결이 빠졌음 → 이 구간의 플로우 신호는 불완전
+                print(f"[strat] trade 링 gap={ring_tr.gap} (누적 lost={ring_tr.stats()['lost']})", flush=True)
+            if lat_every and time.time() >= next_lat:
+                # Binance 체결 시각 → 게이트웨이 수신 지연 (이번 배치 기준)
+                ls = latency_stats(batch[0])
+                if ls["n"]:
+                    print(f"[strat] trade feed 지연 p50={ls['p50']:.1f}ms p99={ls['p99']:.1f}ms "
+                          f"max={ls['max']:.1f}ms (n={ls['n']})", flush=True)
+                next_lat = time.time() + lat_every
 
-
-            for ts, px, qty, sell, tid in chunk:
-                bot.feed_trade(
-                    float(px), float(qty), bool(sell), int(ts),
-                    [best_bid], [best_bqty], [best_ask], [best_aqty],
-                    [bg_best_bid], [bg_best_bqty], [bg_best_ask], [bg_best_aqty],  # ← NEW: Bitget futures last trade price
-                )
+            try:
+                for seg in batch:
+                    for ts, px, qty, sell, tid, recv_ns in seg:
+                        bot.feed_trade(
+                            float(px), float(qty), bool(sell), int(ts),
+                            bid_px, bid_qty, ask_px, ask_qty,
+                            bg_bid_px, bg_bid_qty, bg_ask_px, bg_ask_qty,   # Bitget futures 상위 N
+                        )
+            finally:
+                ring_tr.commit(len(batch[0]) + len(batch[1]))
 
         except KeyboardInterrupt:
             print("[strat] ^C, exit.")
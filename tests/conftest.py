@@ -0,0 +1,15 @@
+# tests/conftest.py
+# 저장소 루트 모듈(shm_ring, layouts, ...)을 패키지 설치 없이 import
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def shm_name():
+    """테스트마다 겹치지 않는 공유메모리 이름 (동시 실행/이전 실패 잔여물과 충돌 방지)"""
+    return "T_" + uuid.uuid4().hex[:12]
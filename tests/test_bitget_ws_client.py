@@ -0,0 +1,137 @@
+# tests/test_bitget_ws_client.py
+# BitgetWsClient 의 증분 정렬 book/CRC 를 단순 참조 구현(dict 병합 + 정렬 + 문자열 CRC)과 대조
+import json
+import random
+from zlib import crc32
+
+import pytest
+
+pytest.importorskip("Crypto")       # bitget.utils (서명) 의존성
+from bitget.ws.bitget_ws_client import BitgetWsClient, BookSide, BooksInfo, SubscribeReq
+
+
+def _ref_merge(side: dict, levels):
+    for px, sz in levels:
+        if float(sz) == 0.0:
+            side.pop(px, None)
+        else:
+            side[px] = sz
+
+
+def _ref_levels(side: dict, is_bid: bool):
+    return [[p, side[p]] for p in sorted(side, key=float, reverse=is_bid)]
+
+
+def _ref_checksum(bids, asks) -> int:
+    parts = []
+    for x in range(25):
+        if x < len(bids):
+            parts += bids[x]
+        if x < len(asks):
+            parts += asks[x]
+    v = crc32(":".join(parts).encode())
+    return v - (1 << 32) if v >= (1 << 31) else v
+
+
+def _levels(rng, lo, n, zero_p):
+    out = []
+    for _ in range(n):
+        px = f"{lo + rng.randrange(400) * 0.01:.2f}"
+        sz = "0" if rng.random() < zero_p else f"{rng.uniform(0.001, 50):.4f}"
+        out.append([px, sz])
+    return out
+
+
+def test_incremental_book_and_checksum_match_reference():
+    rng = random.Random(7)
+    asks = _levels(rng, 101.0, 60, 0.0)
+    bids = _levels(rng, 97.0, 60, 0.0)
+    ref_a, ref_b = {}, {}
+    _ref_merge(ref_a, asks)
+    _ref_merge(ref_b, bids)
+    book = BooksInfo(asks, bids, 0)
+    for _ in range(3000):
+        ua = _levels(rng, 101.0, rng.randrange(6), 0.35)
+        ub = _levels(rng, 97.0, rng.randrange(6), 0.35)
+        _ref_merge(ref_a, ua)
+        _ref_merge(ref_b, ub)
+        book.merge(ua, ub)
+        ra, rb = _ref_levels(ref_a, False), _ref_levels(ref_b, True)
+        assert book.ask_side.levels() == ra
+        assert book.bid_side.levels() == rb
+        cs = _ref_checksum(rb, ra)
+        assert book.check_sum(cs)
+        assert book.check_sum(str(cs))            # 거래소는 문자열로 줄 때도 있음
+
+
+def test_checksum_mismatch_is_reported():
+    book = BooksInfo([["101", "1"]], [["100", "2"]], 0)
+    cs = _ref_checksum([["100", "2"]], [["101", "1"]])
+    assert book.check_sum(cs)
+    assert not book.check_sum(cs + 1)
+
+
+def test_book_side_keeps_exchange_strings_and_ignores_unknown_delete():
+    s = BookSide([["100.10", "1.50"], ["100.2", "3"]], is_bid=True)
+    s.update([["99.9", "0"], ["100.10", "2.000"]])
+    assert s.levels() == [["100.2", "3"], ["100.10", "2.000"]]
+    assert len(s) == 2
+
+
+class _Sent:
+    """BitgetWsClient 송신 기록용 (연결 없이 on_message 경로만 시험)"""
+    def __init__(self):
+        self.msgs = []
+
+    def send(self, text):
+        self.msgs.append(json.loads(text))
+
+
+def _client():
+    c = BitgetWsClient("wss://example.invalid/ws")
+    sent = _Sent()
+    c._BitgetWsClient__ws_client = sent
+    return c, sent
+
+
+def _on_message(c, obj):
+    c._BitgetWsClient__on_message(None, json.dumps(obj))
+
+
+def test_route_key_matches_subscribe_req_key():
+    rk = BitgetWsClient._BitgetWsClient__route_key
+    req = SubscribeReq("USDT-FUTURES", "trade", "SOLUSDT")
+    assert rk({"instType": "USDT-FUTURES", "channel": "trade", "instId": "SOLUSDT"}) == req.key()
+    assert rk({"instType": "SPOT", "channel": "account", "coin": "USDT"}) == ("SPOT", "account", "USDT")
+    assert rk(None) is None
+
+
+def test_messages_go_to_channel_listener_else_default():
+    c, sent = _client()
+    got, default = [], []
+    c.listener(default.append)
+    c.subscribe([SubscribeReq("USDT-FUTURES", "trade", "SOLUSDT")], got.append)
+    assert sent.msgs[-1]["op"] == "subscribe"
+    _on_message(c, {"arg": {"instType": "USDT-FUTURES", "channel": "trade", "instId": "SOLUSDT"},
+                    "data": [{"tradeId": "1"}]})
+    _on_message(c, {"arg": {"instType": "USDT-FUTURES", "channel": "trade", "instId": "BTCUSDT"},
+                    "data": [{"tradeId": "2"}]})
+    assert len(got) == 1 and json.loads(got[0])["data"][0]["tradeId"] == "1"
+    assert len(default) == 1
+
+
+def test_checksum_failure_resubscribes_with_same_listener():
+    c, sent = _client()
+    got = []
+    c.subscribe([SubscribeReq("USDT-FUTURES", "books", "SOLUSDT")], got.append)
+    arg = {"instType": "USDT-FUTURES", "channel": "books", "instId": "SOLUSDT"}
+    bids, asks = [["100", "2"]], [["101", "1"]]
+    _on_message(c, {"arg": arg, "action": "snapshot",
+                    "data": [{"asks": asks, "bids": bids, "checksum": _ref_checksum(bids, asks)}]})
+    _on_message(c, {"arg": arg, "action": "update",
+                    "data": [{"asks": [], "bids": [["99", "1"]], "checksum": 12345}]})
+    assert len(got) == 1                        # 깨진 update 는 전달 안 함
+    assert [m["op"] for m in sent.msgs[-2:]] == ["unsubscribe", "subscribe"]
+    _on_message(c, {"arg": arg, "action": "snapshot",
+                    "data": [{"asks": asks, "bids": bids, "checksum": _ref_checksum(bids, asks)}]})
+    assert len(got) == 2                        # 재구독 후에도 같은 listener
@@ -0,0 +1,66 @@
+# tests/test_bitget_ws_workers.py
+import pytest
+
+import bitget_ws_workers as bw
+from layouts import TRADE_DTYPE
+from shm_ring import ShmRing
+
+
+class _St:
+    def __init__(self):
+        self.errors = 0
+        self.ticks = []
+
+    def state(self, s):
+        pass
+
+    def tick(self, exch_ts, recv_ns=0):
+        self.ticks.append(exch_ts)
+
+    def error(self, code=0):
+        self.errors += 1
+
+
+@pytest.fixture
+def trade_handle(shm_name, monkeypatch):
+    ring = ShmRing(shm_name, TRADE_DTYPE, 16, True)
+    st = _St()
+    got = {}
+    monkeypatch.setattr(bw, "attach_ring", lambda *a, **kw: ring)
+    monkeypatch.setattr(bw, "status_slot", lambda cfg, key: st)
+    monkeypatch.setattr(bw, "run_public", lambda cfg, args, handle, st: got.update(handle=handle))
+    bw.bitget_futures_trade_ws_worker({"bitget_symbol": "SOLUSDT"}, "TR_BG")
+    yield got["handle"], ring, st
+    ring.close()
+    ring.unlink()
+
+
+def _row(tid, ts, px="10", side="buy"):
+    return {"tradeId": tid, "ts": ts, "price": px, "size": "1", "side": side}
+
+
+def _tids(ring):
+    recs = ring.pop_many(100)
+    return [] if recs is None else [int(x) for x in recs["tid"]]
+
+
+def test_trade_rows_are_sorted_and_deduped(trade_handle):
+    handle, ring, st = trade_handle
+    handle([_row("3", "1002"), _row("2", "1001"), _row("1", "1001")], 5, {})
+    handle([_row("3", "1002"), _row("4", "1003", side="sell")], 6, {})     # 3 은 재전송
+    assert _tids(ring) == [1, 2, 3, 4]
+    assert st.ticks == [1002, 1003]
+
+
+def test_malformed_row_does_not_claim_its_trade_id(trade_handle):
+    handle, ring, st = trade_handle
+    handle([_row("7", "1000", px="x"), _row("6", "999")], 5, {})
+    assert _tids(ring) == [6] and st.errors == 1
+    handle([_row("7", "1000")], 6, {})                 # 같은 id 가 정상으로 다시 오면 넣는다
+    assert _tids(ring) == [7]
+
+
+def test_rows_without_trade_id_are_skipped(trade_handle):
+    handle, ring, st = trade_handle
+    handle([_row("", "1000"), _row(None, "1000"), _row("8", "1001")], 5, {})
+    assert _tids(ring) == [8]
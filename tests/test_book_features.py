@@ -0,0 +1,56 @@
+# tests/test_book_features.py
+import numpy as np
+import pytest
+
+from book_features import fill_depth, depth_imbalance, microprice, parse_levels
+from layouts import depth_dtype
+
+
+def _book(n=5):
+    return np.zeros(2, dtype=depth_dtype(n))
+
+
+def test_fill_depth_pads_and_truncates_to_n():
+    arr = _book(3)
+    fill_depth(arr, 0, 7, [["100", "1"], ["99", "2"]], [["101", "3"], ["102", "4"], ["103", "5"], ["104", "6"]],
+               recv_ns=9)
+    r = arr[0]
+    assert int(r["recv_ns"]) == 9
+    assert int(r["ts"]) == 7 and int(r["nb"]) == 2 and int(r["na"]) == 3
+    assert list(r["bid_px"]) == [100.0, 99.0, 0.0] and list(r["bid_qty"]) == [1.0, 2.0, 0.0]
+    assert list(r["ask_px"]) == [101.0, 102.0, 103.0]
+    # 다시 채우면 이전 값이 남지 않음
+    fill_depth(arr, 0, 8, [], [["101", "1"]])
+    assert int(arr[0]["nb"]) == 0 and not arr[0]["bid_px"].any()
+    assert list(arr[0]["ask_qty"]) == [1.0, 0.0, 0.0]
+    assert int(arr[1]["ts"]) == 0                   # 다른 슬롯은 안 건드림
+
+
+def test_depth_imbalance_levels_and_batch():
+    arr = _book(3)
+    fill_depth(arr, 0, 1, [[100, 3], [99, 1]], [[101, 1], [102, 3]])
+    fill_depth(arr, 1, 2, [], [])
+    assert depth_imbalance(arr[0], 1) == pytest.approx(0.5)        # (3 - 1) / 4
+    assert depth_imbalance(arr[0]) == pytest.approx(0.0)           # 4 vs 4
+    assert list(depth_imbalance(arr, 1)) == pytest.approx([0.5, 0.0])   # 빈 책은 0
+
+
+def test_microprice_leans_toward_thin_side():
+    arr = _book(1)
+    fill_depth(arr, 0, 1, [[100, 3]], [[101, 1]])
+    fill_depth(arr, 1, 2, [[100, 0]], [[102, 0]])
+    mp = microprice(arr)
+    assert mp[0] == pytest.approx((100 * 1 + 101 * 3) / 4)          # 매도 쪽이 얇음 → ask 쪽으로
+    assert mp[1] == pytest.approx(101.0)                            # 수량 없으면 mid
+    assert microprice(arr[0]) == pytest.approx(mp[0])
+
+
+def test_parse_levels_rejects_malformed_levels():
+    with pytest.raises(ValueError):
+        parse_levels([["100.5", "x"]], 5)
+    with pytest.raises(ValueError):
+        parse_levels([["100.5"]], 5)
+    arr = _book(5)
+    fill_depth(arr, 0, 7, parse_levels([["100", "1"], ["99", "2"]], 5), parse_levels([["101", "3"]], 5))
+    assert int(arr[0]["nb"]) == 2 and int(arr[0]["na"]) == 1
+    assert list(arr[0]["bid_px"]) == [100.0, 99.0, 0.0, 0.0, 0.0]
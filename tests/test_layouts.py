@@ -0,0 +1,61 @@
+# tests/test_layouts.py
+import numpy as np
+import pytest
+
+import gen_layouts_c
+from layouts import (ORDER_FLAG_DTYPE, ORDER_REPORT_DTYPE, FILL_REPORT_DTYPE, PRIVATE_EXEC_DTYPE,
+                     V2_OF, SymbolTable, to_v2, from_v2)
+
+SYMS = SymbolTable(["SOLUSDT", "SOLUSDT_UMCBL", "BTCUSDT"])
+
+
+def _v1(dtype, n=3):
+    recs = np.zeros(n, dtype=dtype)
+    for i, r in enumerate(recs):
+        for f in dtype.names:
+            if f == "symbol":
+                r[f] = SYMS.names[1 + i % len(SYMS)]
+            elif f == "order_id":
+                r[f] = str(1234567890123456789 + i) if i else ""
+            elif dtype[f].kind == "f":
+                r[f] = 0.1 * (i + 1) + 1e-9
+            else:
+                r[f] = i + 1
+    return recs
+
+
+@pytest.mark.parametrize("dtype", [ORDER_FLAG_DTYPE, ORDER_REPORT_DTYPE, FILL_REPORT_DTYPE, PRIVATE_EXEC_DTYPE])
+def test_v2_round_trip_is_lossless(dtype):
+    recs = _v1(dtype)
+    v2 = to_v2(recs, SYMS)
+    assert v2.dtype == V2_OF[dtype]
+    assert v2.dtype.itemsize % 64 == 0
+    back = from_v2(v2, SYMS)
+    assert back.dtype == dtype
+    assert back.tobytes() == recs.tobytes()
+
+
+def test_suffixed_symbol_keeps_its_own_id():
+    assert SYMS.name(SYMS.id("SOLUSDT_UMCBL")) == "SOLUSDT_UMCBL"
+    assert SYMS.id("SOLUSDT_UMCBL") != SYMS.id("SOLUSDT")
+
+
+def test_to_v2_rejects_lossy_values():
+    recs = _v1(FILL_REPORT_DTYPE, 1)
+    recs[0]["symbol"] = "ETHUSDT"               # 테이블에 없음
+    with pytest.raises(ValueError):
+        to_v2(recs, SYMS)
+    recs = _v1(FILL_REPORT_DTYPE, 1)
+    recs[0]["order_id"] = "abc-1"               # 숫자 아님
+    with pytest.raises(ValueError):
+        to_v2(recs, SYMS)
+
+
+def test_symbol_table_dedups_and_reserves_zero():
+    t = SymbolTable(["SOLUSDT", "", "SOLUSDT", "BTCUSDT"])
+    assert t.names == ("", "SOLUSDT", "BTCUSDT")
+    assert t.id("XRPUSDT") == 0 and t.name(0) == ""
+
+
+def test_layouts_c_mirror_matches_dtypes():
+    assert gen_layouts_c.check()
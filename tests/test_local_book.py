@@ -0,0 +1,51 @@
+# tests/test_local_book.py
+import numpy as np
+
+from layouts import depth_dtype
+from local_book import LocalBook
+
+
+def _snap(uid):
+    return {"lastUpdateId": uid,
+            "bids": [["100", "1"], ["99", "2"], ["98", "0"]],
+            "asks": [["101", "1"], ["102", "3"]]}
+
+
+def _ev(U, u, b=(), a=()):
+    return {"e": "depthUpdate", "U": U, "u": u, "b": list(b), "a": list(a)}
+
+
+def test_bridge_event_then_contiguous_updates():
+    bk = LocalBook(4)
+    bk.load_snapshot(_snap(100))
+    assert not bk.synced
+    assert bk.apply_diff(_ev(90, 100)) == 0             # u <= lastUpdateId → 버림
+    assert bk.apply_diff(_ev(95, 105, b=[["100.5", "4"]])) == 1   # U <= 101 <= u 브리지
+    assert bk.synced and bk.last_id == 105
+    assert bk.best() == (100.5, 101.0)
+    assert bk.apply_diff(_ev(106, 107, a=[["101", "0"]])) == 1    # 삭제
+    assert bk.best() == (100.5, 102.0)
+    assert bk.apply_diff(_ev(106, 107)) == 0            # 중복 (다른 연결이 먼저 줌)
+
+
+def test_gap_requires_resync():
+    bk = LocalBook()
+    bk.load_snapshot(_snap(100))
+    assert bk.apply_diff(_ev(102, 103)) == -1           # 브리지 아님 (101 이 빠짐)
+    bk.apply_diff(_ev(101, 103))
+    assert bk.apply_diff(_ev(105, 106)) == -1           # U != 직전 u + 1
+
+
+def test_grows_past_capacity_and_writes_top_n():
+    bk = LocalBook(2)
+    bk.load_snapshot({"lastUpdateId": 1, "bids": [], "asks": []})
+    bk.apply_diff(_ev(1, 2, b=[[str(100 - i), "1"] for i in range(6)],
+                      a=[[str(101 + i), "1"] for i in range(6)]))
+    arr = np.zeros(1, dtype=depth_dtype(5))
+    bk.write_depth(arr, 0, 5, 6)
+    r = arr[0]
+    assert int(r["ts"]) == 5 and int(r["recv_ns"]) == 6
+    assert int(r["nb"]) == 5 and int(r["na"]) == 5
+    assert list(r["bid_px"]) == [100, 99, 98, 97, 96]
+    assert list(r["ask_px"]) == [101, 102, 103, 104, 105]
+    assert not bk.crossed()
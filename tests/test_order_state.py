@@ -0,0 +1,69 @@
+# tests/test_order_state.py
+from layouts import PRIVATE_EXEC_DTYPE
+from order_state import OrderStateNormalizer, S_NEW, S_PART, S_FILLED, S_CANCELED
+
+F = {n: i for i, n in enumerate(PRIVATE_EXEC_DTYPE.names)}
+
+
+def _order(status, acc="0", oid="1", coid="77", size="0.3", **kw):
+    d = {"orderId": oid, "clientOid": coid, "side": "buy", "size": size,
+         "status": status, "accBaseVolume": acc}
+    d.update(kw)
+    return d
+
+
+def _fill(tid, qty, px="10", oid="1"):
+    return {"orderId": oid, "tradeId": tid, "baseVolume": qty, "price": px, "side": "buy"}
+
+
+def test_event_matches_private_exec_layout():
+    ev = OrderStateNormalizer().on_order(_order("live"), 1, 2)
+    assert len(ev) == len(PRIVATE_EXEC_DTYPE.names)
+    assert ev[F["client_oid"]] == 77 and ev[F["status"]] == S_NEW and ev[F["side"]] == 1
+
+
+def test_fills_dedup_by_trade_id_and_accumulate_exactly():
+    n = OrderStateNormalizer()
+    n.on_order(_order("live"), 1, 1)
+    e1 = n.on_fill(_fill("a", "0.1"), 2, 2)
+    assert e1[F["status"]] == S_PART and e1[F["last_fill"]] == 0.1
+    assert n.on_fill(_fill("a", "0.1"), 3, 3) is None       # 같은 tradeId 재전송
+    n.on_fill(_fill("b", "0.1"), 4, 4)
+    e3 = n.on_fill(_fill("c", "0.1"), 5, 5)
+    assert e3[F["acc_fill"]] == 0.3                         # Decimal 누적 (0.1*3 float 오차 없음)
+    assert e3[F["status"]] == S_FILLED
+
+
+def test_status_never_goes_backwards():
+    n = OrderStateNormalizer()
+    n.on_order(_order("live"), 1, 1)
+    n.on_order(_order("partially_filled", acc="0.1"), 2, 2)
+    assert n.on_order(_order("live", acc="0.1"), 3, 3) is None      # 역행
+    ev = n.on_order(_order("canceled", acc="0.1"), 4, 4)
+    assert ev[F["status"]] == S_CANCELED and ev[F["last_fill"]] == 0.0
+    assert n.on_order(_order("partially_filled", acc="0.1"), 5, 5) is None   # 종결 후
+
+
+def test_late_channel_does_not_double_count():
+    n = OrderStateNormalizer()
+    n.on_order(_order("live"), 1, 1)
+    n.on_fill(_fill("a", "0.2"), 2, 2)
+    ev = n.on_order(_order("partially_filled", acc="0.2"), 3, 3)
+    assert ev is None                                       # fill 채널이 이미 반영
+
+
+def test_fills_before_first_order_row_are_held():
+    n = OrderStateNormalizer()
+    assert n.on_fill(_fill("a", "0.1"), 1, 1) is None       # clientOid 모름
+    ev = n.on_order(_order("partially_filled", acc="0"), 2, 2)
+    assert ev[F["client_oid"]] == 77 and ev[F["last_fill"]] == 0.1 and ev[F["acc_fill"]] == 0.1
+
+
+def test_state_is_bounded():
+    n = OrderStateNormalizer(keep=2, max_orders=4)
+    for i in range(10):
+        n.on_fill(_fill("t", "0.1", oid=str(i)), i, i)      # fill 만 오고 종결 안 됨
+    assert list(n.orders) == ["6", "7", "8", "9"]
+    for i in range(10, 14):
+        n.on_order(_order("filled", acc="0.3", oid=str(i)), i, i)
+    assert len(n.orders) <= 4
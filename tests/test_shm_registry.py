@@ -0,0 +1,104 @@
+# tests/test_shm_registry.py
+import os
+import struct
+import subprocess
+import sys
+from multiprocessing import resource_tracker
+
+import numpy as np
+import pytest
+
+from shm_ring import ShmRing, DROP_NEWEST, ShmLayoutError
+from shm_registry import ShmRegistry, attach_ring
+
+DT = np.dtype([("ts", "<i8"), ("v", "<f8")])
+
+
+@pytest.fixture
+def reg(shm_name):
+    r = ShmRegistry(shm_name + "_DIR", create=True, slots=4)
+    rings = []
+
+    def make(logical, cap=8, seg=None, **kw):
+        ring = ShmRing(seg or f"{shm_name}_{logical}", DT, cap, True, **kw)
+        rings.append(ring)
+        r.register(logical, ring)
+        return ring
+
+    r.make = make
+    yield r
+    for ring in rings:
+        ring.close()
+        try: ring.unlink()
+        except FileNotFoundError: pass
+    r.close()
+    r.unlink()
+
+
+def test_register_lookup_attach_round_trip(reg, shm_name):
+    w = reg.make("TR_BI", cap=16, policy=DROP_NEWEST)
+    e = reg.lookup("TR_BI")
+    assert e["name"] == shm_name + "_TR_BI" and e["cap"] == 16
+    assert e["item_size"] == DT.itemsize and e["policy"] == DROP_NEWEST
+    assert e["creator_pid"] == os.getpid() and e["producer_pid"] == 0
+    assert reg.lookup("nope") is None
+
+    w.push((3, 0.0))
+    r = reg.attach("TR_BI")                     # dtype 은 링 헤더에서
+    try:
+        assert r.item_dtype == DT and [int(x) for x in r.pop_many(10)["ts"]] == [3]
+    finally:
+        r.close()
+
+
+def test_attach_ring_from_cfg_records_producer(reg, shm_name):
+    reg.make("OF")
+    cfg = {"ring_dir": reg.name}
+    p = attach_ring(cfg, "OF", DT, producer=True)
+    try:
+        assert p.name == shm_name + "_OF"
+        assert reg.lookup("OF")["producer_pid"] == os.getpid()
+    finally:
+        p.close()
+    with pytest.raises(KeyError):
+        attach_ring(cfg, "NOPE")
+    with pytest.raises(ShmLayoutError):
+        attach_ring(cfg, "OF", np.dtype([("ts", "<i8")]))
+
+
+def test_reregister_replaces_entry_and_full_directory_raises(reg, shm_name):
+    for k in ("A", "B", "C"):
+        reg.make(k)
+    reg.make("A", cap=32, seg=shm_name + "_A2")     # 재생성된 링으로 교체
+    assert [e["logical"] for e in reg.entries()] == ["A", "B", "C"]
+    assert reg.lookup("A")["name"] == shm_name + "_A2" and reg.lookup("A")["cap"] == 32
+    reg.make("D")
+    with pytest.raises(ValueError):
+        reg.make("E")
+
+
+def test_live_skips_unlinked_and_dead_producer(reg):
+    reg.make("A")
+    b = reg.make("B")
+    reg.make("C")
+    b.close(); b.unlink()
+    p = subprocess.Popen([sys.executable, "-c", "pass"])
+    p.wait()
+    # 이미 끝난 프로세스 PID 를 생산자로 기록
+    i = [e["logical"] for e in reg.entries()].index("C")
+    struct.pack_into("<q", reg.buf, reg._off(i) + reg._E_PRODUCER, p.pid)
+    live = reg.live()
+    # live() 는 점검용 attach 를 resource_tracker 에서 빼므로, 이 프로세스가 만든 세그먼트는 다시 등록
+    for e in reg.entries():
+        if e["logical"] != "B":
+            resource_tracker.register("/" + e["name"], "shared_memory")
+    assert [e["logical"] for e in live] == ["A"]
+
+
+def test_attach_to_non_directory_is_rejected(shm_name):
+    ring = ShmRing(shm_name, DT, 4, True)
+    try:
+        with pytest.raises(ValueError):
+            ShmRegistry(shm_name, create=False)
+    finally:
+        ring.close(); ring.unlink()
@@ -0,0 +1,368 @@
+# tests/test_shm_ring.py
+# shm_ring.ShmRing 과 (빌드돼 있으면) shm_ring_fast.ShmRing 을 같은 시나리오로
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import shm_ring
+from shm_ring import OVERWRITE, DROP_NEWEST, BLOCK, ShmLayoutError
+
+DT = np.dtype([("ts", "<i8"), ("v", "<f8")])
+
+IMPLS = [pytest.param(shm_ring.ShmRing, id="py")]
+try:
+    import shm_ring_fast
+    IMPLS.append(pytest.param(shm_ring_fast.ShmRing, id="fast"))
+except ImportError:
+    IMPLS.append(pytest.param(None, id="fast", marks=pytest.mark.skip("shm_ring_fast 미빌드")))
+
+
+@pytest.fixture(params=IMPLS)
+def make_ring(request, shm_name):
+    cls = request.param
+    made = []
+
+    def make(cap=8, **kw):
+        r = cls(shm_name, DT, cap, True, **kw)
+        made.append(r)
+        return r
+
+    yield make
+    for r in made:
+        r.close()
+        r.unlink()
+
+
+def _vals(recs):
+    return [int(x) for x in recs["ts"]]
+
+
+def _peeked(r, maxn=0):
+    b = r.peek_batch(maxn)
+    if b is None:
+        return []
+    return _vals(b[0]) + _vals(b[1])
+
+
+# ---------- 헤더 ----------
+
+def test_head_and_tail_on_separate_cache_lines():
+    R = shm_ring.ShmRing
+    lines = {R.OFF_META // shm_ring.CACHE_LINE, R.OFF_HEAD // shm_ring.CACHE_LINE,
+             R.OFF_TAIL // shm_ring.CACHE_LINE}
+    assert len(lines) == 3
+    assert R.HEADER_SIZE % shm_ring.CACHE_LINE == 0
+
+
+def test_attach_reads_capacity_from_header(make_ring, shm_name):
+    w = make_ring(cap=16)
+    w.push((7, 0.0))
+    r = shm_ring.ShmRing(shm_name, DT, 0, False)
+    try:
+        assert r.capacity == 16 and len(r) == 1
+        assert _vals(r.pop_many(10)) == [7]
+        assert len(w) == 0
+    finally:
+        r.close()
+
+
+# ---------- push / pop_many / latest ----------
+
+def test_push_pop_in_order(make_ring):
+    r = make_ring(cap=5)
+    assert r.capacity == 8                  # 2의 거듭제곱으로 올림
+    assert r.pop_many(10) is None and r.latest() is None
+    for i in range(3):
+        r.push((i, 0.5 * i))
+    assert len(r) == 3 and int(r.latest()["ts"]) == 2
+    recs = r.pop_many(2)
+    assert _vals(recs) == [0, 1] and float(recs["v"][1]) == 0.5
+    assert _vals(r.pop_many(10)) == [2]
+    assert len(r) == 0
+
+
+# ---------- peek_batch / commit: 랩어라운드 두 구간 ----------
+
+def test_peek_batch_returns_both_segments_across_wrap(make_ring):
+    r = make_ring(cap=4)
+    for i in range(3):
+        r.push((i, 0.0))
+    r.commit(len(_peeked(r)))
+    for i in range(3, 7):
+        r.push((i, 0.0))
+    seg1, seg2 = r.peek_batch()
+    assert _vals(seg1) == [3] and _vals(seg2) == [4, 5, 6]
+    assert np.shares_memory(seg1, r.arr) and np.shares_memory(seg2, r.arr)   # zero-copy
+    assert len(r) == 4                      # commit 전에는 tail 그대로
+    r.commit(4)
+    assert len(r) == 0 and r.peek_batch() is None
+
+
+def test_peek_batch_without_wrap_has_empty_second_segment(make_ring):
+    r = make_ring(cap=8)
+    for i in range(3):
+        r.push((i, 0.0))
+    seg1, seg2 = r.peek_batch()
+    assert _vals(seg1) == [0, 1, 2] and len(seg2) == 0
+
+
+def test_peek_batch_maxn(make_ring):
+    r = make_ring(cap=8)
+    for i in range(5):
+        r.push((i, 0.0))
+    assert _peeked(r, 2) == [0, 1]
+    r.commit(2)
+    assert _peeked(r) == [2, 3, 4]
+
+
+# ---------- 가득 찼을 때 정책 ----------
+
+def test_overwrite_keeps_newest(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    assert all(r.push((i, 0.0)) for i in range(6))
+    # pop_many 는 연속 구간 하나 (버퍼 끝에서 끊김) → 랩된 나머지는 다음 호출
+    assert _vals(r.pop_many(10)) == [2, 3]
+    assert _vals(r.pop_many(10)) == [4, 5]
+    st = r.stats()
+    assert st["drops"] == 2 and st["pushes"] == 6 and st["max_occ"] == 4
+
+
+def test_drop_newest_rejects_when_full(make_ring):
+    r = make_ring(cap=4, policy=DROP_NEWEST)
+    assert [r.push((i, 0.0)) for i in range(6)] == [True] * 4 + [False] * 2
+    assert _vals(r.pop_many(10)) == [0, 1, 2, 3]
+    assert r.stats()["drops"] == 2
+
+
+def test_block_times_out_then_drops(make_ring):
+    r = make_ring(cap=2, policy=BLOCK, block_timeout_us=200)
+    assert r.push((0, 0.0)) and r.push((1, 0.0))
+    assert r.push((2, 0.0)) is False        # 소비자가 없으니 timeout 후 버림
+    assert r.stats()["drops"] == 1
+    assert _vals(r.pop_many(10)) == [0, 1]
+    assert r.push((3, 0.0))
+
+
+def test_policy_is_read_back_on_attach(make_ring, shm_name):
+    make_ring(cap=4, policy="drop_newest")
+    a = shm_ring.ShmRing(shm_name, DT, 0, create=False)
+    try:
+        assert a.policy == DROP_NEWEST and a.capacity == 4
+    finally:
+        a.close()
+
+
+# ---------- push_many: 배치 1회 publish ----------
+
+def test_push_many_wraps_across_buffer_end(make_ring):
+    r = make_ring(cap=4)
+    r.push((0, 0.0)); r.push((1, 0.0)); r.push((2, 0.0))
+    r.commit(len(_peeked(r)))
+    recs = np.array([(i, float(i)) for i in range(3, 6)], dtype=DT)
+    assert r.push_many(recs) == 3
+    seg1, seg2 = r.peek_batch()
+    assert _vals(seg1) == [3] and _vals(seg2) == [4, 5]
+    assert r.stats()["pushes"] == 6
+
+
+def test_push_many_larger_than_ring_keeps_tail_under_overwrite(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    recs = np.array([(i, 0.0) for i in range(10)], dtype=DT)
+    assert r.push_many(recs) == 4
+    assert _peeked(r) == [6, 7, 8, 9]
+    assert r.stats()["drops"] == 6
+
+
+def test_push_many_partial_fit_keeps_oldest_under_drop_newest(make_ring):
+    r = make_ring(cap=4, policy=DROP_NEWEST)
+    r.push((0, 0.0))
+    recs = np.array([(i, 0.0) for i in range(1, 6)], dtype=DT)
+    assert r.push_many(recs) == 3
+    assert _peeked(r) == [0, 1, 2, 3]
+    assert r.stats()["drops"] == 2
+
+
+# ---------- seq / gap / lost ----------
+
+def test_overwrite_gap_is_reported_and_counted_once(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    for i in range(6):
+        r.push((i, 0.0))
+    assert _peeked(r) == [2, 3, 4, 5]
+    assert r.gap == 2
+    # commit 전에 다시 peek → 같은 gap, lost 는 아직 0 (두 번 세지 않음)
+    assert _peeked(r) == [2, 3, 4, 5]
+    assert r.gap == 2
+    assert r.stats()["lost"] == 0
+    r.commit(4)
+    assert r.stats()["lost"] == 2
+    r.push((6, 0.0))
+    assert _peeked(r) == [6] and r.gap == 0
+    r.commit(1)
+    assert r.stats()["lost"] == 2
+
+
+def test_partial_commit_counts_loss_up_to_committed_record(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    for i in range(6):
+        r.push((i, 0.0))
+    assert _peeked(r) == [2, 3, 4, 5]
+    r.commit(1)
+    assert r.stats()["lost"] == 2
+    assert _peeked(r) == [3, 4, 5] and r.gap == 0
+    r.commit(3)
+    assert r.stats()["lost"] == 2
+
+
+def test_pop_many_counts_drop_newest_gap(make_ring):
+    r = make_ring(cap=4, policy=DROP_NEWEST)
+    for i in range(6):
+        r.push((i, 0.0))
+    assert _vals(r.pop_many(10)) == [0, 1, 2, 3]
+    assert r.gap == 0
+    r.push((6, 0.0))
+    assert _vals(r.pop_many(10)) == [6]
+    assert r.gap == 2                       # 4, 5 는 버려짐
+    st = r.stats()
+    assert st["lost"] == 2 and st["drops"] == 2
+
+
+def test_push_many_stamps_consecutive_seq(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    r.push((0, 0.0))
+    r.commit(len(_peeked(r)))
+    assert r.push_many(np.array([(i, 0.0) for i in range(1, 4)], dtype=DT)) == 3
+    assert _peeked(r) == [1, 2, 3] and r.gap == 0
+    r.commit(3)
+    assert r.push_many(np.array([(i, 0.0) for i in range(4, 14)], dtype=DT)) == 4
+    assert _peeked(r) == [10, 11, 12, 13] and r.gap == 6
+    assert r.stats()["seq"] == 14
+
+
+# ---------- attach 시 레이아웃 검사 ----------
+
+def test_open_rebuilds_dtype_and_capacity_from_header(make_ring, shm_name):
+    w = make_ring(cap=16)
+    w.push((5, 1.5))
+    a = type(w).open(shm_name)
+    try:
+        assert a.item_dtype == DT and a.capacity == 16
+        assert _peeked(a) == [5]
+    finally:
+        a.close()
+
+
+@pytest.mark.parametrize("dt", [
+    np.dtype([("ts", "<i8"), ("v", "<i8")]),        # 같은 크기, 다른 타입
+    np.dtype([("t", "<i8"), ("v", "<f8")]),         # 같은 크기, 다른 이름
+    np.dtype([("ts", "<i8"), ("v", "<f4")]),        # 다른 크기
+])
+def test_attach_with_other_dtype_is_rejected(make_ring, shm_name, dt):
+    w = make_ring(cap=4)
+    with pytest.raises(ShmLayoutError):
+        type(w)(shm_name, dt, 4, False)
+
+
+def test_attach_with_other_version_is_rejected(make_ring, shm_name):
+    w = make_ring(cap=4)
+    struct.pack_into("<q", w.shm.buf, shm_ring.ShmRing.OFF_META + 8, shm_ring.ShmRing.VERSION - 1)
+    with pytest.raises(ShmLayoutError, match="버전"):
+        type(w)(shm_name, DT, 4, False)
+
+
+@pytest.mark.parametrize("size", [64, shm_ring.ShmRing.HEADER_SIZE + 4096])
+def test_attach_to_foreign_segment_is_rejected(shm_name, size):
+    seg = shared_memory.SharedMemory(create=True, size=size, name=shm_name)
+    try:
+        with pytest.raises(ShmLayoutError):
+            shm_ring.ShmRing(shm_name, DT, 4, False)
+        with pytest.raises(ShmLayoutError):
+            shm_ring.ShmRing.open(shm_name)
+    finally:
+        seg.close()
+        seg.unlink()
+
+
+# ---------- claim / publish / discard: 슬롯 제자리 쓰기 ----------
+
+def test_claim_is_invisible_until_publish(make_ring):
+    r = make_ring(cap=8)
+    for i in range(3):
+        r.arr[r.claim()] = (i, 0.0)
+    assert len(r) == 0 and r.peek_batch() is None
+    assert r.publish() == 3
+    assert _peeked(r) == [0, 1, 2] and r.gap == 0
+
+
+def test_discard_drops_claims_without_gap(make_ring):
+    r = make_ring(cap=8)
+    r.arr[r.claim()] = (0, 0.0)
+    r.publish()
+    r.arr[r.claim()] = (99, 0.0)            # 반쯤 쓴 슬롯
+    r.claim()
+    assert r.discard() == 2
+    assert r.publish() == 0                 # 취소한 슬롯은 다음 publish 에 안 섞임
+    r.arr[r.claim()] = (1, 0.0)
+    r.publish()
+    assert _peeked(r) == [0, 1] and r.gap == 0
+    assert r.stats()["seq"] == 2
+
+
+def test_claim_on_full_overwrite_ring_hides_slot_being_written(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    for i in range(4):
+        r.push((i, 0.0))
+    r.arr[r.claim()] = (99, 0.0)            # 가장 오래된 0 의 슬롯을 덮어쓰는 중 (아직 publish 전)
+    assert _peeked(r) == [1, 2, 3] and r.gap == 1
+    r.arr[r.claim()] = (98, 0.0)            # peek 사이에 또 claim → 1 도 건너뜀
+    assert _peeked(r) == [2, 3] and r.gap == 2
+    r.commit(2)
+    assert r.peek_batch() is None           # 남은 건 claim 중인 슬롯뿐
+    assert r.publish() == 2
+    assert _peeked(r) == [99, 98] and r.gap == 0
+    assert r.stats()["lost"] == 2
+
+
+def test_discard_on_full_overwrite_ring_keeps_garbled_slots_hidden(make_ring):
+    r = make_ring(cap=4, policy=OVERWRITE)
+    for i in range(4):
+        r.push((i, 0.0))
+    r.arr[r.claim()] = (99, 0.0)            # 0 의 슬롯을 반쯤 쓰다가 취소
+    r.discard()
+    assert _peeked(r) == [1, 2, 3]
+    r.commit(3)
+    r.arr[r.claim()] = (4, 0.0)
+    r.publish()
+    assert _peeked(r) == [4] and r.gap == 0
+
+
+def test_claim_drop_newest_returns_minus_one_when_full(make_ring):
+    r = make_ring(cap=4, policy=DROP_NEWEST)
+    r.push((0, 0.0)); r.push((1, 0.0))
+    assert r.claim() >= 0 and r.claim() >= 0
+    assert r.claim() == -1                  # 자리 = 소비 안 된 2 + claim 2
+    assert r.publish() == 2
+    assert r.stats()["drops"] == 1
+
+
+def test_ring_sink_publishes_once_per_flush(make_ring):
+    from bitget_ws_loop import RingSink
+    r = make_ring(cap=8)
+    sink = RingSink(r)
+    assert sink.put((1, 0.0)) and sink.put((2, 0.0))
+    assert len(r) == 0
+    assert sink.flush() == 2
+    assert _peeked(r) == [1, 2]
+
+
+def test_ring_sink_discard_on_error(make_ring):
+    from bitget_ws_loop import RingSink
+    r = make_ring(cap=8)
+    sink = RingSink(r)
+    i = sink.claim()
+    sink.arr[i] = (2, 0.0)
+    sink.discard()
+    sink.flush()
+    assert len(r) == 0 and r.peek_batch() is None
@@ -0,0 +1,101 @@
+# tests/test_shm_snapshot.py
+import numpy as np
+import pytest
+
+from shm_snapshot import ShmSnapshot
+
+DT = np.dtype([("ts", "<i8"), ("px", "<f8")])
+
+
+def test_read_latest(shm_name):
+    s = ShmSnapshot(shm_name, DT, create=True)
+    try:
+        assert s.read() is None
+        s.write((1, 10.0))
+        s.write((2, 20.0))
+        r = s.read()
+        assert (int(r["ts"]), float(r["px"])) == (2, 20.0)
+        assert s.seq == 4
+    finally:
+        s.close(); s.unlink()
+
+
+def test_reader_gets_copy_not_view(shm_name):
+    w = ShmSnapshot(shm_name, DT, create=True)
+    r = ShmSnapshot(shm_name, DT, create=False)
+    try:
+        w.write((1, 10.0))
+        got = r.read()
+        w.write((2, 20.0))
+        assert int(got["ts"]) == 1              # 읽은 사본은 이후 write 에 안 바뀜
+        assert int(r.read()["ts"]) == 2 and r.seq == w.seq
+    finally:
+        r.close(); w.close(); w.unlink()
+
+
+def test_read_gives_up_when_writer_died_mid_write(shm_name):
+    s = ShmSnapshot(shm_name, DT, create=True, max_spins=1000)
+    try:
+        s.write((1, 10.0))
+        s.hdr[0] += 1           # 생산자가 seq 를 홀수로 올린 채 사망
+        assert s.read() is None
+    finally:
+        s.close(); s.unlink()
+
+
+# ---------- Bitget ticker 스냅샷 (TICKER_DTYPE) ----------
+
+# 워커는 스냅샷/상태 블록을 프로세스 수명 동안 잡고 닫지 않음 → GC 때 SharedMemory.__del__ 경고는 무시
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_ticker_worker_round_trips_rows_into_per_symbol_snapshot(shm_name, monkeypatch):
+    import bitget_ws_workers as bw
+    from layouts import TICKER_DTYPE, symbol_table
+    from shm_status import ShmStatus
+
+    cfg = {"snap_tk_bg": shm_name + "_TK", "bg_ticker_symbols": ["SOLUSDT", "BTCUSDT"],
+           "symbols": ["SOLUSDT", "BTCUSDT"], "status_name": shm_name + "_ST",
+           "status_slots": ["TK_BG"]}
+    status = ShmStatus(cfg["status_name"], cfg["status_slots"], create=True)
+    snaps = {s: ShmSnapshot(bw.ticker_snap_name(cfg, s), TICKER_DTYPE, create=True) for s in ("SOLUSDT", "BTCUSDT")}
+    got = {}
+    monkeypatch.setattr(bw, "run_public", lambda cfg, args, handle, st: got.update(args=args, handle=handle))
+    try:
+        assert TICKER_DTYPE.itemsize == 64
+        bw.bitget_futures_ticker_ws_worker(cfg, "TK_BG")
+        assert [a["instId"] for a in got["args"]] == ["SOLUSDT", "BTCUSDT"]
+        got["handle"]([{"instId": "SOLUSDT", "ts": "1700000000000", "markPrice": "101.5",
+                        "indexPrice": "101.4", "fundingRate": "0.0001", "nextFundingTime": "1700003600000",
+                        "holdingAmount": "12345.6"},
+                       {"instId": "ETHUSDT", "ts": "1700000000000", "markPrice": "1"}], 1_700_000_000_002_000_000, {})
+        r = snaps["SOLUSDT"].read()
+        assert int(r["ts"]) == 1_700_000_000_000 and int(r["recv_ns"]) == 1_700_000_000_002_000_000
+        assert float(r["mark_px"]) == 101.5 and float(r["index_px"]) == 101.4
+        assert float(r["funding_rate"]) == 0.0001 and int(r["next_funding_ms"]) == 1_700_003_600_000
+        assert float(r["open_interest"]) == 12345.6
+        assert int(r["symbol"]) == symbol_table(cfg).id("SOLUSDT") != 0
+        assert snaps["BTCUSDT"].read() is None          # 다른 심볼 스냅샷은 그대로
+        assert status.read()["TK_BG"]["msgs"] == 1
+    finally:
+        for s in snaps.values():
+            s.close(); s.unlink()
+        status.close(); status.unlink()
+
+
+def test_ticker_read_newer_copies_only_when_snapshot_changed(shm_name):
+    from layouts import TICKER_DTYPE
+    w = ShmSnapshot(shm_name, TICKER_DTYPE, create=True)
+    r = ShmSnapshot(shm_name, TICKER_DTYPE, create=False)
+    try:
+        assert r.read_newer(0) == (None, 0)             # 아직 안 써짐
+        rec = np.zeros((), dtype=TICKER_DTYPE)
+        rec["ts"], rec["mark_px"], rec["funding_rate"] = 1, 101.5, 0.0001
+        w.write(rec)
+        got, seen = r.read_newer(0)
+        assert got.tobytes() == rec.tobytes() and seen == w.seq
+        assert r.read_newer(seen) == (None, seen)       # 안 바뀌면 복사 없음
+        rec["ts"], rec["mark_px"] = 2, 102.0
+        w.write(rec)
+        got, seen2 = r.read_newer(seen)
+        assert float(got["mark_px"]) == 102.0 and seen2 == seen + 2
+    finally:
+        r.close(); w.close(); w.unlink()
@@ -0,0 +1,94 @@
+# tests/test_shm_status.py
+import os
+
+import numpy as np
+import pytest
+
+from layouts import TRADE_DTYPE
+from shm_status import ShmStatus, status_slot, ST_LIVE, latency_stats
+
+KEYS = ["TR_BI", "OB_BI", "TR_BG", "OB_BG"]
+
+
+def test_worker_slot_is_visible_to_reader(shm_name):
+    st = ShmStatus(shm_name, KEYS, create=True)
+    rd = ShmStatus(shm_name, KEYS, create=False)
+    try:
+        s = st.slot("OB_BG")
+        s.state(ST_LIVE)
+        s.tick(1_700_000_000_000)
+        s.tick(1_700_000_000_100)
+        s.error(7)
+        got = rd.read()["OB_BG"]
+        assert got["state"] == "live" and got["exch_ts"] == 1_700_000_000_100
+        assert got["msgs"] == 2 and got["errs"] == 1 and got["err_code"] == 7
+        assert got["pid"] == os.getpid() and got["age_ms"] is not None
+        assert rd.read()["TR_BI"]["msgs"] == 0 and rd.read()["TR_BI"]["age_ms"] is None
+        s.close()
+    finally:
+        rd.close(); st.close(); st.unlink()
+
+
+def test_slots_come_from_cfg(shm_name):
+    cfg = {"status_name": shm_name, "status_slots": ["TR_BI", "OB_BI", "TR_ETH", "OB_BG"]}
+    st = ShmStatus(shm_name, cfg["status_slots"], create=True)
+    try:
+        s = status_slot(cfg, "TR_ETH")
+        s.state(ST_LIVE)
+        s.tick(1_700_000_000_000, 1_700_000_000_005_000_000)
+        got = st.read()
+        assert list(got) == cfg["status_slots"]
+        assert got["TR_ETH"]["state"] == "live" and got["TR_ETH"]["msgs"] == 1
+        assert got["TR_BI"]["msgs"] == 0
+        s.close()
+        with pytest.raises(KeyError):
+            status_slot(cfg, "NOPE")
+    finally:
+        st.close(); st.unlink()
+
+
+def test_attach_to_foreign_block_is_rejected(shm_name):
+    from multiprocessing import shared_memory
+    seg = shared_memory.SharedMemory(create=True, size=4096, name=shm_name)
+    try:
+        with pytest.raises(ValueError):
+            ShmStatus(shm_name, KEYS, create=False)
+    finally:
+        seg.close(); seg.unlink()
+
+
+def test_attach_with_other_slot_layout_is_rejected(shm_name):
+    st = ShmStatus(shm_name, ["A", "B"], create=True)
+    try:
+        with pytest.raises(ValueError):
+            ShmStatus(shm_name, ["B", "A"], create=False)
+    finally:
+        st.close(); st.unlink()
+
+
+def test_tick_tracks_feed_latency_ewma(shm_name):
+    st = ShmStatus(shm_name, KEYS, create=True)
+    try:
+        s = st.slot("TR_BI")
+        ts = 1_700_000_000_000
+        for k in range(200):
+            s.tick(ts + k, (ts + k + 2) * 1_000_000)        # 항상 2ms 늦게 받음
+        got = st.read()["TR_BI"]
+        assert 1900 <= got["lat_us"] <= 2000
+        s.tick(0, (ts + 500) * 1_000_000)                   # 거래소 시각 없는 메시지
+        got = st.read()["TR_BI"]
+        assert got["exch_ts"] == ts + 199 and 1900 <= got["lat_us"] <= 2000
+        assert got["local_ns"] == (ts + 500) * 1_000_000
+        s.close()
+    finally:
+        st.close(); st.unlink()
+
+
+def test_latency_stats_skips_records_without_recv_ns():
+    recs = np.zeros(4, dtype=TRADE_DTYPE)
+    recs["ts"] = 1000
+    recs["recv_ns"] = [1_001_000_000, 1_003_000_000, 1_005_000_000, 0]
+    got = latency_stats(recs)
+    assert got["n"] == 3 and got["p50"] == pytest.approx(3.0)
+    assert got["min"] == pytest.approx(1.0) and got["max"] == pytest.approx(5.0)
+    assert latency_stats(recs[3:]) == {"n": 0}
@@ -0,0 +1,86 @@
+# tests/test_shm_wakeup.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import shm_wakeup
+from shm_ring import ShmRing
+from shm_wakeup import ShmDoorbell, wait_readable
+
+DT = np.dtype([("ts", "<i8"), ("v", "<f8")])
+
+needs_futex = pytest.mark.skipif(shm_wakeup._libc is None, reason="futex 없는 플랫폼")
+needs_atomic = pytest.mark.skipif(not shm_wakeup.atomic_ring_available(), reason="shm_ring_fast 미빌드")
+
+
+@pytest.fixture
+def bell(shm_name):
+    b = ShmDoorbell(shm_name + "_W", create=True)
+    yield b
+    b.close()
+    b.unlink()
+
+
+def test_ring_bumps_seq(bell):
+    s = bell.seq()
+    bell.ring()
+    bell.ring()
+    assert bell.seq() == s + 2
+
+
+@needs_atomic
+def test_shared_doorbell_counts_every_ring(bell, shm_name):
+    # 생산자 둘이 같은 doorbell (OF + BGPRV 처럼) — seq 증가가 하나도 안 빠져야 한다
+    other = ShmDoorbell(shm_name + "_W", create=False)
+    s = bell.seq()
+    ts = [threading.Thread(target=lambda b=b: [b.ring() for _ in range(20000)]) for b in (bell, other)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    other.close()
+    assert bell.seq() == s + 40000
+
+
+def test_wait_returns_at_once_if_seq_already_moved(bell):
+    seen = bell.seq()
+    bell.ring()
+    t0 = time.monotonic()
+    bell.wait(seen, 2.0)
+    assert time.monotonic() - t0 < 1.0
+
+
+@needs_futex
+def test_wait_is_woken_by_ring_from_another_thread(bell):
+    seen = bell.seq()
+    threading.Timer(0.05, bell.ring).start()
+    t0 = time.monotonic()
+    bell.wait(seen, 5.0)
+    assert time.monotonic() - t0 < 2.0
+    assert bell.seq() != seen
+
+
+def test_attached_ring_finds_doorbell_by_name(shm_name):
+    w = ShmRing(shm_name, DT, 4, True, wakeup=shm_name + "_W")
+    r = ShmRing(shm_name, DT, 0, False)
+    try:
+        assert r.bell is not None and r.bell.name == shm_name + "_W"
+        seen = r.bell.seq()
+        w.push((1, 0.0))
+        assert r.bell.seq() != seen
+    finally:
+        r.close(); w.close(); w.unlink()
+
+
+@needs_futex
+def test_wait_readable_times_out_then_sees_push(shm_name):
+    w = ShmRing(shm_name, DT, 4, True, wakeup=shm_name + "_W")
+    try:
+        assert wait_readable([w], spin=10, timeout_s=0.01) is False
+        threading.Timer(0.05, w.push, args=((1, 0.0),)).start()
+        assert wait_readable([w], spin=10, timeout_s=5.0)
+        assert len(w) == 1
+    finally:
+        w.close(); w.unlink()
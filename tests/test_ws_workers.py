@@ -0,0 +1,192 @@
+# tests/test_ws_workers.py
+import json
+
+import pytest
+
+import ws_workers
+from ws_workers import Feed, run_feeds
+from shm_status import ST_LIVE, ST_RESYNC, ST_IDLE_RESTART, ST_ERROR
+
+
+class _Stop(BaseException):
+    """run_feeds 의 무한 루프를 끝내는 용도 (except Exception 에 안 잡힘)"""
+
+
+class _Clock:
+    """ws_workers.time 대역: sleep 은 시계만 전진, 매 sleep 마다 on_sleep 호출"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def time(self):
+        return self.now
+
+    def time_ns(self):
+        return int(self.now * 1e9)
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, s):
+        self.sleeps.append(s)
+        self.now += s
+        if self.on_sleep is not None:
+            self.on_sleep()
+
+
+class _St:
+    def __init__(self):
+        self.states = []
+
+    def state(self, s):
+        self.states.append(s)
+
+    def tick(self, exch_ts, recv_ns=0):
+        pass
+
+    def error(self, code=0):
+        pass
+
+
+@pytest.fixture
+def wsenv(monkeypatch):
+    clock = _Clock()
+    clients = []
+
+    class FakeClient:
+        fail_subscribe = False
+
+        def __init__(self, stream_url, on_message, is_combined):
+            self.on_message = on_message
+            self.sent = []
+            self.stopped = False
+            clients.append(self)
+
+        def subscribe(self, streams):
+            if FakeClient.fail_subscribe:
+                raise RuntimeError("socket closed")
+            self.sent.append(("sub", list(streams)))
+
+        def unsubscribe(self, streams):
+            self.sent.append(("unsub", list(streams)))
+
+        def stop(self):
+            self.stopped = True
+
+        def deliver(self, stream):
+            self.on_message(None, json.dumps({"stream": stream, "data": {}}))
+
+    monkeypatch.setattr(ws_workers, "time", clock)
+    monkeypatch.setattr(ws_workers, "SpotWebsocketStreamClient", FakeClient)
+    return clock, clients, FakeClient
+
+
+def _feeds(*streams, idle_s=5):
+    got = []
+    feeds = [Feed(s, lambda d, ns, s=s: got.append(s), _St(), idle_s) for s in streams]
+    return feeds, got
+
+
+def test_single_quiet_feed_is_resubscribed_without_dropping_connection(wsenv):
+    clock, clients, _ = wsenv
+    feeds, got = _feeds("a@trade", "b@trade")
+
+    def on_sleep():
+        clients[-1].deliver("a@trade")          # a 만 계속 들어오고 b 는 조용
+        if clock.now > 1012:
+            raise _Stop
+
+    clock.on_sleep = on_sleep
+    with pytest.raises(_Stop):
+        run_feeds(feeds)
+    assert len(clients) == 1 and not clients[0].stopped
+    assert clients[0].sent[0] == ("sub", ["a@trade", "b@trade"])
+    assert clients[0].sent[1:3] == [("unsub", ["b@trade"]), ("sub", ["b@trade"])]
+    assert ST_RESYNC in feeds[1].st.states and ST_RESYNC not in feeds[0].st.states
+    assert set(got) == {"a@trade"}
+
+
+def test_silent_connection_is_stopped_and_reopened_after_backoff(wsenv):
+    clock, clients, _ = wsenv
+    feeds, _ = _feeds("a@trade", "b@trade")
+
+    def on_sleep():
+        if len(clients) == 3:
+            raise _Stop
+
+    clock.on_sleep = on_sleep
+    with pytest.raises(_Stop):
+        run_feeds(feeds)
+    assert clients[0].stopped and clients[1].stopped
+    assert feeds[0].st.states.count(ST_IDLE_RESTART) == 2
+    assert not any(op == "unsub" for c in clients for op, _ in c.sent)      # 재구독 아닌 재연결
+    # tick 1s × 6 → 무수신 재연결, backoff 1s / tick × 6, backoff 2s / 새 연결 tick
+    assert clock.sleeps == [1.0] * 6 + [1.0] + [1.0] * 6 + [2.0] + [1.0]
+
+
+def test_error_stops_old_client_before_retry(wsenv):
+    clock, clients, FakeClient = wsenv
+    feeds, _ = _feeds("a@trade")
+    FakeClient.fail_subscribe = True
+
+    def on_sleep():
+        if len(clients) == 2:
+            raise _Stop
+
+    clock.on_sleep = on_sleep
+    with pytest.raises(_Stop):
+        run_feeds(feeds)
+    assert clients[0].stopped
+    assert feeds[0].st.states[-1] == ST_ERROR and clock.sleeps[:2] == [1.0, 2.0]
+
+
+
+def test_diff_book_poll_backs_off_when_snapshot_is_stale(wsenv, monkeypatch):
+    clock, _, _ = wsenv
+    st = _St()
+    snaps = [{"lastUpdateId": 50}, {"lastUpdateId": 60},
+             {"lastUpdateId": 104, "bids": [["10", "1"]], "asks": [["11", "1"]]}]
+    calls = []
+
+    class FakeSpot:
+        def __init__(self, timeout):
+            pass
+
+        def depth(self, symbol, limit):
+            calls.append(clock.now)
+            return snaps[len(calls) - 1]
+
+    class FakeSink:
+        def __init__(self, *a, **kw):
+            self.recs = []
+
+        def push(self, rec):
+            self.recs.append(rec.copy())
+
+        write = push
+
+    ring = FakeSink()
+    monkeypatch.setattr(ws_workers, "Spot", FakeSpot)
+    monkeypatch.setattr(ws_workers, "attach_ring", lambda *a, **kw: ring)
+    monkeypatch.setattr(ws_workers, "ShmSnapshot", FakeSink)
+    monkeypatch.setattr(ws_workers, "status_slot", lambda cfg, key: st)
+    feed = ws_workers.diff_book_feed({"snap_ob_bi": "unused"}, "solusdt", "OB_BI")
+
+    feed.poll()
+    assert calls == []                          # 버퍼가 비었으면 REST 안 부름
+    feed.on_data({"e": "depthUpdate", "E": 1, "U": 100, "u": 105, "b": [], "a": []}, 7)
+    feed.poll()
+    feed.poll()
+    assert len(calls) == 1                      # 오래된 스냅샷 → 1s 동안 재요청 안 함
+    clock.now += 1.01
+    feed.poll()
+    assert len(calls) == 2                      # 또 오래됨 → 이번엔 2s
+    clock.now += 1.5
+    feed.poll()
+    assert len(calls) == 2
+    clock.now += 0.6
+    feed.poll()
+    assert len(calls) == 3 and st.states[-1] == ST_LIVE
+    assert len(ring.recs) == 1 and int(ring.recs[0]["recv_ns"]) == 7
@@ -1,9 +1,16 @@
 # ws_workers.py
-import time, json
+import time, json, threading
+from collections import deque
 import numpy as np
+from binance.spot import Spot
 from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient
-from shm_ring import ShmRing
-from layouts import TRADE_DTYPE, BOOK_DTYPE
+from shm_registry import attach_ring
+from shm_snapshot import ShmSnapshot
+from shm_status import (status_slot, ST_STARTING, ST_CONNECTED, ST_LIVE, ST_RESYNC,
+                        ST_IDLE_RESTART, ST_ERROR)
+from layouts import TRADE_DTYPE, depth_dtype
+from book_features import fill_depth
+from local_book import LocalBook
 
 def _now_ms() -> int:
     return int(time.time() * 1000)
@@ -14,77 +21,79 @@ def exponential_backoff(base=1.0, cap=30.0):
         yield t
         t = min(t*2.0, cap)
 
-# --- Binance Trade WS ---
-def trade_ws_worker(cfg, shm_name_trades: str, capacity: int, shared):
-    symbol = cfg["ticker"].upper()
-    ring = ShmRing(shm_name_trades, TRADE_DTYPE, capacity, create=False)
-    shared["tr_ws_state"] = "starting"
-    backoff = exponential_backoff()
 
-    last_msg = time.time()
+# ---------------------------------------------------------------------------
+# 스트림 피드: combined stream 이름 하나 ↔ 디코더 + 링
+#   on_data(d, recv_ns) : 소켓 스레드에서 "data" dict 하나 처리 (recv_ns = 프레임 수신 직후 time_ns)
+#   poll()     : 연결 루프 스레드에서 주기 호출 (diff 북 REST 동기화 등), 없으면 None
+#   st         : 상태 블록 슬롯 (링 논리 이름 = 슬롯 키), 전달한 메시지마다 st.tick(거래소 ts, recv_ns)
+# 워커 하나가 피드 하나를 돌리거나(아래 *_ws_worker) 게이트웨이가 여러 피드를 한 소켓에 묶는다.
+#
+# hot-hot 중복 연결 (md_redundancy > 1): 같은 피드를 연결 여러 개(md_urls 엔드포인트 순환)가
+# 동시에 받고, 피드가 먼저 도착한 것만 링에 넣는다 (trade id / 북 update id 로 중복 제거).
+# 연결 스레드가 여러 개이므로 피드의 dedup + 링 push 는 피드 락 안에서 (SPSC 생산자는 하나).
+# ---------------------------------------------------------------------------
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
 
-    def on_message(_unused, message):
-        nonlocal last_msg
+
+class Feed:
+    __slots__ = ("stream", "on_data", "poll", "st", "idle_s")
+
+    def __init__(self, stream, on_data, st, idle_s, poll=None):
+        self.stream = stream
+        self.on_data = on_data
+        self.poll = poll
+        self.st = st
+        self.idle_s = idle_s
+
+
+# --- Binance Trade ---
+def trade_feed(cfg, symbol: str, ring_key: str) -> Feed:
+    ring = attach_ring(cfg, ring_key, TRADE_DTYPE, producer=True)
+    st = status_slot(cfg, ring_key)
+    lock = threading.Lock()
+    last_tid = -1
+
+    def on_data(d, recv_ns):
+        nonlocal last_tid
         try:
-            md = json.loads(message) if isinstance(message, (str, bytes)) else (message or {})
-            d = md.get("data") if isinstance(md, dict) else md
-            if not isinstance(d, dict):
-                return
             # 필요한 키 존재?
             if not all(k in d for k in ("p","q","T","m","t")):
                 return
 
-            ts  = int(d["T"])
-            px  = float(d["p"])
-            qty = float(d["q"])
-            sell= 1 if bool(d["m"]) else 0
             tid = int(d["t"])
-            ring.push((ts, px, qty, sell, tid))
-
-            shared["last_trade_ts"] = ts
-            last_msg = time.time()
+            with lock:
+                # trade id 는 심볼별 단조 증가 → 이미 넘긴 id 는 다른 연결이 먼저 준 것 (또는 재연결 중복)
+                if tid <= last_tid:
+                    return
+                last_tid = tid
+                ts  = int(d["T"])
+                px  = float(d["p"])
+                qty = float(d["q"])
+                sell= 1 if bool(d["m"]) else 0
+                ring.push((ts, px, qty, sell, tid, recv_ns))
+            st.tick(ts, recv_ns)
         except Exception:
-            return
+            st.error()
 
-    while True:
-        try:
-            ws = SpotWebsocketStreamClient(on_message=on_message, is_combined=True)
-            ws.trade(symbol=symbol.lower())
-            shared["tr_ws_state"] = "connected"
-            last_msg = time.time()
-
-            while True:
-                time.sleep(1.0)
-                if time.time() - last_msg > 30:
-                    shared["tr_ws_state"] = "idle-restart"
-                    try: ws.stop()
-                    except: pass
-                    break
+    return Feed(f"{symbol.lower()}@trade", on_data, st, 30)
 
-        except Exception:
-            shared["tr_ws_state"] = "error"
-            time.sleep(next(backoff))
-            continue
 
-# --- Binance Partial Book Depth WS ---
-def book_ws_worker(cfg, shm_name_book: str, capacity: int, shared):
-    symbol = cfg["ticker"].upper()
-    ring = ShmRing(shm_name_book, BOOK_DTYPE, capacity, create=False)
+# --- Binance Partial Book Depth ---
+def partial_book_feed(cfg, symbol: str, ring_key: str) -> Feed:
     levels   = int(cfg.get("depth_levels", 5))
     speed_ms = int(cfg.get("depth_speed_ms", 100))
-    shared["ob_ws_state"] = "starting"
-    backoff = exponential_backoff()
-
-    last_msg = time.time()
+    DEPTH_DTYPE = depth_dtype(levels)
+    ring = attach_ring(cfg, ring_key, DEPTH_DTYPE, producer=True)
+    snap = ShmSnapshot(cfg["snap_" + ring_key.lower()], DEPTH_DTYPE, create=False)  # 상위 N 최신값 (seqlock)
+    rec = np.zeros(1, dtype=DEPTH_DTYPE)   # 메시지마다 재사용
+    st = status_slot(cfg, ring_key)
+    lock = threading.Lock()
+    last_id = -1
 
-    def on_message(_unused, message):
-        nonlocal last_msg
+    def on_data(d, recv_ns):
+        nonlocal last_id
         try:
-            md = json.loads(message) if isinstance(message,(str,bytes)) else (message or {})
-            d = md.get("data") if isinstance(md, dict) else md
-            if not isinstance(d, dict):
-                return
-
             # keys: 'bids'/'asks' 또는 'b'/'a' 둘 다 대비
             bids = d.get("bids") or d.get("b")
             asks = d.get("asks") or d.get("a")
@@ -93,46 +102,250 @@ def book_ws_worker(cfg, shm_name_book: str, capacity: int, shared):
             if not bids or not asks:
                 return
 
-            b0 = bids[0]
-            a0 = asks[0]
-            # (가격/수량 문자열일 수 있음 → float 변환)
-            bbid = float(b0[0]); bqty = float(b0[1])
-            bask = float(a0[0]); aqty = float(a0[1])
+            # partial depth 는 거래소 시각이 없음 → ts = 수신 ms (지연 집계 제외)
+            ts = recv_ns // 1_000_000
+            uid = int(d.get("lastUpdateId") or 0)
 
-            # TS 우선순위: T → E → now
-            ts = _now_ms()
+            with lock:
+                if uid and uid <= last_id:
+                    return                       # 같은/더 오래된 북 (다른 연결이 먼저 줌)
+                last_id = uid
+                # 상위 N 레벨 전부 (가격/수량 문자열 → float 는 fill_depth 에서)
+                fill_depth(rec, 0, ts, bids, asks, recv_ns)
+                ring.push(rec[0])
+                snap.write(rec[0])
+            st.tick(0, recv_ns)
+        except Exception:
+            st.error()
 
-            # ★ 단일 튜플로 push (이전 1-엘리먼트 ndarray는 비권장)
-            ring.push((ts, bbid, bqty, bask, aqty))
+    return Feed(depth_stream(symbol, speed_ms, levels), on_data, st, 10)
 
-            shared["last_book_ts"] = ts
-            last_msg = time.time()
 
+# --- Binance Diff Depth + REST 스냅샷 → 로컬 L2 북 ---
+def diff_book_feed(cfg, symbol: str, ring_key: str) -> Feed:
+    symbol = symbol.upper()
+    levels   = int(cfg.get("depth_levels", 5))
+    speed_ms = int(cfg.get("depth_speed_ms", 100))
+    limit    = int(cfg.get("depth_snapshot_limit", 1000))
+    DEPTH_DTYPE = depth_dtype(levels)
+    ring = attach_ring(cfg, ring_key, DEPTH_DTYPE, producer=True)
+    snap = ShmSnapshot(cfg["snap_" + ring_key.lower()], DEPTH_DTYPE, create=False)
+    rec = np.zeros(1, dtype=DEPTH_DTYPE)
+    st = status_slot(cfg, ring_key)
+    rest = Spot(timeout=5)
+    book = LocalBook(cfg.get("ob_book_cap", 4096))
+    buf = deque(maxlen=1000)     # 스냅샷 전 이벤트 버퍼
+    lock = threading.Lock()      # on_data(소켓 스레드들) ↔ 스냅샷 적용(연결 루프 스레드)
+    sync_lock = threading.Lock() # 중복 연결이면 poll 이 여러 스레드에서 옴 → REST 는 하나만
+    need_sync = True
+    retry_at = 0.0               # REST 실패 후 다음 시도 시각 (monotonic) — 연결 루프를 재우지 않는다
+    retry_wait = exponential_backoff(1.0, 30.0)
+    # 재연결/중복 연결: 이미 적용한 u 이하 이벤트는 apply_diff 가 버리고(0), 이어지지 않으면 gap(-1) → 재동기.
+    # 연결마다 이벤트는 순서대로 오므로 먼저 온 연결이 적용하고 늦은 쪽은 중복으로 버려진다.
+
+    def publish(ts, recv_ns):
+        book.write_depth(rec, 0, ts, recv_ns)
+        ring.push(rec[0])
+        snap.write(rec[0])
+
+    def on_data(d, recv_ns):
+        nonlocal need_sync
+        try:
+            if d.get("e") != "depthUpdate":
+                return
+            d["_recv_ns"] = recv_ns          # 버퍼링 후 적용될 때도 원래 수신 시각으로 발행
+            with lock:
+                if need_sync:
+                    if not buf or int(d["u"]) > int(buf[-1]["u"]):
+                        buf.append(d)
+                    return
+                r = book.apply_diff(d)
+                if r == 0:
+                    return                   # 중복 (다른 연결이 먼저 줌)
+                if r < 0 or book.crossed():
+                    # gap(U != 직전 u + 1) 또는 꼬인 북 → 이 이벤트부터 다시 버퍼링하고 스냅샷 재요청
+                    need_sync = True
+                    book.reset()
+                    buf.clear()
+                    buf.append(d)
+                    st.state(ST_RESYNC)
+                    return
+                if r > 0 and book.synced:
+                    publish(int(d["E"]), recv_ns)
+            st.tick(int(d["E"]), recv_ns)
         except Exception:
+            st.error()
+
+    def sync() -> bool:
+        nonlocal need_sync
+        if not buf:
+            return False
+        s = rest.depth(symbol, limit=limit)      # 락 밖에서 REST (수백 ms)
+        with lock:
+            if not buf or int(s["lastUpdateId"]) < int(buf[0]["U"]):
+                return False                    # 스냅샷이 버퍼보다 오래됨 → 다시 받기
+            book.load_snapshot(s)
+            ts = recv_ns = 0
+            while buf:
+                ev = buf.popleft()
+                r = book.apply_diff(ev)
+                if r < 0:
+                    book.reset()
+                    buf.clear()
+                    return False
+                if r > 0:
+                    ts, recv_ns = int(ev["E"]), ev["_recv_ns"]
+            need_sync = False                   # 브리지 이벤트가 아직이면 apply_diff 가 이어서 확인
+            if book.synced:
+                publish(ts, recv_ns)
+            st.state(ST_LIVE)
+            return True
+
+    def poll():
+        nonlocal retry_at, retry_wait
+        # buf 가 비었으면 아직 받을 이벤트가 없음 (REST 안 부름 → backoff 도 안 씀)
+        if not need_sync or not buf or time.monotonic() < retry_at:
             return
+        if sync_lock.acquire(blocking=False):
+            try:
+                if sync():
+                    retry_wait = exponential_backoff(1.0, 30.0)
+                else:                           # 스냅샷이 버퍼보다 오래됨/브리지 실패 → 바로 재요청하지 않음
+                    retry_at = time.monotonic() + next(retry_wait)
+            except Exception:
+                st.error()
+                retry_at = time.monotonic() + next(retry_wait)
+            finally:
+                sync_lock.release()
+
+    return Feed(depth_stream(symbol, speed_ms), on_data, st, 10, poll)
+
+
+def depth_stream(symbol: str, speed_ms: int, levels: int = 0) -> str:
+    """
+    Binance depth 스트림 이름 (levels 0 = diff depth, 5/10/20 = partial).
+    갱신 주기는 1000ms(기본, 접미사 없음)와 100ms 둘뿐 → 1000ms 에 @1000ms 를 붙이면 거부된다.
+    """
+    name = f"{symbol.lower()}@depth{int(levels) or ''}"
+    return name if int(speed_ms) >= 1000 else name + "@100ms"
+
+
+FEEDS = {"trade": trade_feed, "partial": partial_book_feed, "diff": diff_book_feed}
 
-    def subscribe(ws):
+
+# ---------------------------------------------------------------------------
+# 연결 루프: 피드 여러 개를 combined stream 소켓 하나로, stream 이름으로 디스패치
+# idle 판정은 연결별 (중복 연결 중 하나가 죽어도 다른 연결의 메시지로 가려지지 않게)
+#   - 피드 전부 idle_s 넘게 조용함 → 연결이 죽은 것: 끊고 backoff 후 재연결
+#   - 일부 피드만 조용함 → 연결은 살아 있음: 그 stream 만 재구독 (다른 피드는 안 끊김)
+# ---------------------------------------------------------------------------
+def _stop(ws):
+    if ws is None:
+        return
+    try: ws.stop()
+    except: pass
+
+
+def run_feeds(feeds, url: str = BINANCE_WS_URL):
+    routes = {f.stream: i for i, f in enumerate(feeds)}
+    last_msg = [time.time()] * len(feeds)
+    resub = set()                                # 재구독 후 아직 메시지 없는 피드
+    tick = 0.1 if any(f.poll for f in feeds) else 1.0
+    backoff = exponential_backoff()
+
+    def set_state(s):
+        for f in feeds:
+            f.st.state(s)
+
+    def on_message(_unused, message):
+        recv_ns = time.time_ns()                 # 프레임 수신 직후 (파싱 전)
         try:
-            ws.partial_book_depth(symbol=symbol.lower(), level=levels, speed=speed_ms)
+            md = json.loads(message) if isinstance(message, (str, bytes)) else (message or {})
+            if not isinstance(md, dict):
+                return
+            i = routes.get(md.get("stream"))     # 구독 응답({"result":..,"id":..}) 은 stream 없음
+            d = md.get("data")
+            if i is None or not isinstance(d, dict):
+                return
+            last_msg[i] = time.time()
+            if i in resub:
+                resub.discard(i)
+                feeds[i].st.state(ST_CONNECTED)
+            feeds[i].on_data(d, recv_ns)
         except Exception:
-            pass
+            return
 
+    set_state(ST_STARTING)
     while True:
+        ws = None
         try:
-            ws = SpotWebsocketStreamClient(on_message=on_message, is_combined=True)
-            subscribe(ws)
-            shared["ob_ws_state"] = "connected"
-            last_msg = time.time()
+            ws = SpotWebsocketStreamClient(stream_url=url, on_message=on_message, is_combined=True)
+            ws.subscribe([f.stream for f in feeds])
+            set_state(ST_CONNECTED)
+            resub.clear()
+            opened = now = time.time()
+            for i in range(len(feeds)):
+                last_msg[i] = now
 
             while True:
-                time.sleep(1.0)
-                if time.time() - last_msg > 10:
-                    shared["ob_ws_state"] = "idle-restart"
-                    try: ws.stop()
-                    except: pass
+                time.sleep(tick)
+                for f in feeds:
+                    if f.poll: f.poll()
+                now = time.time()
+                if opened and max(last_msg) > opened:
+                    backoff = exponential_backoff()      # 새 연결로 데이터가 들어옴 → backoff 초기화
+                    opened = 0
+                idle = [i for i, f in enumerate(feeds) if now - last_msg[i] > f.idle_s]
+                if len(idle) == len(feeds):
                     break
+                for i in idle:
+                    f = feeds[i]
+                    f.st.state(ST_RESYNC)
+                    resub.add(i)
+                    ws.unsubscribe([f.stream])
+                    ws.subscribe([f.stream])
+                    last_msg[i] = now                    # 다음 판정까지 idle_s 다시 기다림
+
+            set_state(ST_IDLE_RESTART)
+            _stop(ws)
+            time.sleep(next(backoff))
 
         except Exception:
-            shared["ob_ws_state"] = "error"
+            set_state(ST_ERROR)
+            _stop(ws)
             time.sleep(next(backoff))
             continue
+
+
+def run_redundant(cfg, shards):
+    """
+    샤드마다 md_redundancy 개 연결 (엔드포인트는 md_urls 순환). 마지막 연결은 이 스레드에서.
+    """
+    urls = list(cfg.get("md_urls") or [BINANCE_WS_URL])
+    red = max(1, int(cfg.get("md_redundancy", 1)))
+    conns = [(sh, urls[r % len(urls)]) for sh in shards for r in range(red)]
+    for sh, url in conns[:-1]:
+        threading.Thread(target=run_feeds, args=(sh, url), daemon=True).start()
+    run_feeds(*conns[-1])
+
+
+# --- 단일 스트림 워커 (피드 1개, 연결 md_redundancy 개) ---
+def trade_ws_worker(cfg, ring_key: str):
+    run_redundant(cfg, [[trade_feed(cfg, cfg["ticker"], ring_key)]])
+
+def book_ws_worker(cfg, ring_key: str):
+    run_redundant(cfg, [[partial_book_feed(cfg, cfg["ticker"], ring_key)]])
+
+def book_diff_ws_worker(cfg, ring_key: str):
+    run_redundant(cfg, [[diff_book_feed(cfg, cfg["ticker"], ring_key)]])
+
+
+# --- Binance 마켓데이터 게이트웨이: 프로세스 1개, combined stream 연결 md_conns × md_redundancy 개 ---
+def binance_md_gateway(cfg):
+    """
+    cfg["md_feeds"]: [(kind, symbol, ring_key), ...]  kind = trade / partial / diff
+    피드를 md_conns 개 샤드에 라운드로빈 분배, 샤드마다 md_redundancy 개 중복 연결.
+    """
+    feeds = [FEEDS[kind](cfg, sym, key) for kind, sym, key in cfg["md_feeds"]]
+    n = max(1, min(int(cfg.get("md_conns", 1)), len(feeds)))
+    run_redundant(cfg, [feeds[i::n] for i in range(n)])